@@ -0,0 +1,394 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  ControlServer.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file lets scripts drive the player through a local Unix socket. An
+#   asyncio server runs on its own thread next to the tkinter main loop and
+#   takes one command per line from any number of clients:
+#
+#     play | pause | stop | next | prev | volume <0-10> | load <path> | status
+#
+#   Each command is answered with "ok", "error <reason>" or, for status, one
+#   line of JSON. Commands are not run one by one: they are gathered into a
+#   batch, and the main loop is asked once to apply the whole batch. A burst
+#   of next presses becomes a number of steps, only the last volume and the
+#   last play, pause or stop are kept, and a load drops whatever came before
+#   it, so hundreds of commands a second still cost the window only a few
+#   updates. Status requests in the same batch all share one answer.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import json
+import socket
+import threading
+import tkinter
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# commands a client can send, and the ones that take an argument
+COMMANDS = ('play', 'pause', 'stop', 'next', 'prev', 'volume', 'load', 'status')
+ARGUMENT_COMMANDS = ('volume', 'load')
+
+# range of the volume command, the same as the volume box
+MIN_VOLUME = 0.0
+MAX_VOLUME = 10.0
+
+# only the user running the player may connect
+SOCKET_MODE = 0o600
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class gathers commands until the main loop applies them, keeping
+#   only what still matters once they have all run
+# -----------------------------------------------------------------------------
+class CommandBatch:
+
+  def __init__(self):
+
+    self.load = None
+    self.steps = 0
+    self.transport = None
+    self.volume = None
+    self.count = 0
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds one command to the batch
+  #
+  # INPUT PARAMETERS:
+  #   name - name of the command
+  #   argument - its argument, or None
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def add(self, name, argument):
+
+    self.count += 1
+
+    # a new list makes earlier moves and play state changes pointless
+    if name == 'load':
+      self.load = argument
+      self.steps = 0
+      self.transport = None
+
+    # moving to another song starts it playing, like the buttons do
+    elif name == 'next' or name == 'prev':
+      self.steps += 1 if name == 'next' else -1
+      self.transport = None
+
+    elif name == 'volume':
+      self.volume = argument
+
+    else:
+      self.transport = name
+
+    return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class runs the control socket and hands its commands to the main
+#   loop
+# -----------------------------------------------------------------------------
+class ControlServer:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates a server that isn't listening yet
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window, used to reach the main loop
+  #   socket_path - path of the Unix socket to listen on
+  #   on_commands - called in the main loop with each CommandBatch
+  #   on_status - called in the main loop to get the player's state as a
+  #               dictionary
+  # ---------------------------------------------------------------------------
+  def __init__(self, root, socket_path, on_commands, on_status):
+
+    self.root = root
+    self.socket_path = socket_path
+    self.on_commands = on_commands
+    self.on_status = on_status
+    self._batch = CommandBatch()
+    self._waiting = []
+    self._scheduled = False
+    self._lock = threading.Lock()
+    self._loop = None
+    self._closed = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts listening on its own thread. Nothing is started where Unix
+  #   sockets aren't available, or if another player already owns the socket.
+  #
+  # RETURN:
+  #   True if the server was started
+  # ---------------------------------------------------------------------------
+  def start(self):
+
+    if not hasattr(socket, 'AF_UNIX'):
+      return False
+
+    # a socket left behind by a player that didn't close can be replaced, one
+    # that still answers can't
+    probe = socket.socket(socket.AF_UNIX)
+    try:
+      probe.connect(self.socket_path)
+      return False
+    except OSError:
+      pass
+    finally:
+      probe.close()
+
+    try: # folder might not be writable...
+      os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+      if os.path.exists(self.socket_path):
+        os.remove(self.socket_path)
+    except OSError:
+      return False
+
+    server = threading.Thread(target=self._run, daemon=True)
+    server.start()
+
+    return True
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Stops listening and removes the socket
+  # ---------------------------------------------------------------------------
+  def stop(self):
+
+    if self._loop is not None:
+      try:
+        self._loop.call_soon_threadsafe(self._close)
+      except RuntimeError:
+        pass
+      self._loop = None
+
+      try:
+        os.remove(self.socket_path)
+      except OSError:
+        pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Server thread: runs the asyncio loop until stop() is called
+  # ---------------------------------------------------------------------------
+  def _run(self):
+
+    import asyncio
+
+    try:
+      asyncio.run(self._serve())
+
+    # the socket couldn't be opened; the player simply can't be scripted
+    except OSError:
+      self._loop = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Listens for clients until the server is closed
+  # ---------------------------------------------------------------------------
+  async def _serve(self):
+
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    self._closed = loop.create_future()
+    server = await asyncio.start_unix_server(self._client, self.socket_path)
+    os.chmod(self.socket_path, SOCKET_MODE)
+    self._loop = loop
+
+    async with server:
+      await self._closed
+
+  def _close(self):
+    if not self._closed.done():
+      self._closed.set_result(None)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Answers one client, a line at a time, until it disconnects
+  #
+  # INPUT PARAMETERS:
+  #   reader - stream the client's commands come in on
+  #   writer - stream the answers go out on
+  # ---------------------------------------------------------------------------
+  async def _client(self, reader, writer):
+
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+
+        reply = self._handle(line.decode('utf-8', 'replace').strip())
+        if reply is None:
+          reply = await self._status()
+
+        writer.write(reply.encode('utf-8') + b'\n')
+        await writer.drain()
+
+    # the client went away or sent a line too long to be a command
+    except (ConnectionError, ValueError):
+      pass
+
+    finally:
+      writer.close()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Checks one command and adds it to the batch
+  #
+  # INPUT PARAMETERS:
+  #   line - the command line, without its line ending
+  #
+  # RETURN:
+  #   the answer for the client, or None for a status request
+  # ---------------------------------------------------------------------------
+  def _handle(self, line):
+
+    # local variables
+    name, _, argument = line.partition(' ')
+    argument = argument.strip()
+
+    if name not in COMMANDS:
+      return 'error unknown command'
+
+    if (name in ARGUMENT_COMMANDS) != (len(argument) > 0):
+      return 'error wrong number of arguments'
+
+    if name == 'status':
+      return None
+
+    if name == 'volume':
+      try:
+        argument = float(argument)
+      except ValueError:
+        return 'error volume must be a number'
+      argument = min(max(argument, MIN_VOLUME), MAX_VOLUME)
+
+    elif name == 'load' and not os.path.exists(argument):
+      return 'error no such file or folder'
+
+    with self._lock:
+      self._batch.add(name, argument)
+      self._schedule()
+
+    return 'ok'
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Waits for the state of the player once the batch has been applied
+  # ---------------------------------------------------------------------------
+  async def _status(self):
+
+    future = self._loop.create_future()
+    with self._lock:
+      self._waiting.append(future)
+      self._schedule()
+
+    return await future
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Asks the main loop to apply the batch, unless it has been asked already.
+  #   If it can't be asked, the status requests waiting are answered with an
+  #   error. Must be called holding the lock.
+  # ---------------------------------------------------------------------------
+  def _schedule(self):
+
+    if self._scheduled:
+      return
+
+    try:
+      self.root.after_idle(self._apply)
+      self._scheduled = True
+
+    # the main window has been closed
+    except (RuntimeError, tkinter.TclError):
+      waiting, self._waiting = self._waiting, []
+      self._reply(waiting, 'error player is closing')
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Main loop: applies everything gathered since the last time and answers
+  #   the status requests waiting for it, even if applying the batch fails
+  # ---------------------------------------------------------------------------
+  def _apply(self):
+
+    # local variables
+    reply = 'error status unavailable'
+
+    with self._lock:
+      batch, self._batch = self._batch, CommandBatch()
+      waiting, self._waiting = self._waiting, []
+      self._scheduled = False
+
+    try:
+      if batch.count > 0:
+        self.on_commands(batch)
+
+    finally:
+      if len(waiting) > 0:
+        try:
+          reply = json.dumps(self.on_status())
+        finally:
+          self._reply(waiting, reply)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Hands the same answer to status requests on the server thread
+  #
+  # INPUT PARAMETERS:
+  #   waiting - list of the futures of the requests
+  #   reply - the answer
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _reply(self, waiting, reply):
+
+    # local variables
+    loop = self._loop
+
+    if len(waiting) == 0 or loop is None:
+      return
+
+    try:
+      for future in waiting:
+        loop.call_soon_threadsafe(_answer, future, reply)
+
+    # the server has stopped; its clients are gone with it
+    except RuntimeError:
+      pass
+
+    return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   Answers a status request, unless its client has gone away meanwhile
+# -----------------------------------------------------------------------------
+def _answer(future, reply):
+
+  if not future.done():
+    future.set_result(reply)
+
+  return
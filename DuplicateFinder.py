@@ -0,0 +1,345 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  DuplicateFinder.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file finds songs that are loaded more than once: the same file
+#   listed twice, or the same song copied into several folders. Files are
+#   only compared as far as needed to tell them apart:
+#
+#     1. files are grouped by size; a file with a size of its own has no copy
+#     2. files that share a size have their first and last 64 KB hashed,
+#        read through mmap
+#     3. only files whose samples also match are hashed in full
+#
+#   so a large library is sorted out without reading most of its bytes. The
+#   hashing is done in a pool of processes through the same machinery as the
+#   tag reader, and the hashes are kept in the library index so files that
+#   haven't changed are never hashed again.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import mmap
+import queue
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from TrackMetadata import MetadataReader
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# bytes hashed from each end of a file for its sample hash
+SAMPLE_BYTES = 64 * 1024
+
+# bytes read at a time for a full hash
+READ_BYTES = 1024 * 1024
+
+# size of the hashes in bytes
+DIGEST_SIZE = 16
+
+# songs hashed per job
+CHUNK_SIZE = 64
+
+# columns of the values kept for each song
+SAMPLE_COLUMN = 0
+FULL_COLUMN = 1
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function hashes the first and last part of a file. A file small
+#   enough to be covered by the sample is hashed whole.
+#
+# INPUT PARAMETERS:
+#   path - path of the file
+#
+# RETURN:
+#   sample hash, full hash or None if the file is bigger than the sample
+# -----------------------------------------------------------------------------
+def hash_sample(path):
+
+  # local variables
+  digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+  with open(path, 'rb') as song_file:
+    with mmap.mmap(song_file.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+      if len(contents) <= 2 * SAMPLE_BYTES:
+        digest.update(contents)
+        return digest.hexdigest(), digest.hexdigest()
+
+      digest.update(contents[:SAMPLE_BYTES])
+      digest.update(contents[-SAMPLE_BYTES:])
+
+  return digest.hexdigest(), None
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function hashes a whole file
+# -----------------------------------------------------------------------------
+def hash_full(path):
+
+  # local variables
+  digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+  with open(path, 'rb') as song_file:
+    for block in iter(lambda: song_file.read(READ_BYTES), b''):
+      digest.update(block)
+
+  return digest.hexdigest()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   These functions hash one chunk of songs inside a worker process, by
+#   sample or in full
+#
+# INPUT PARAMETERS:
+#   songs - list of (path, size, mtime_ns), plus the sample hash for a full
+#           hash
+#
+# RETURN:
+#   list of (path, size, mtime_ns, sample_hash, full_hash) for every song
+#   that could be read
+# -----------------------------------------------------------------------------
+def hash_sample_chunk(songs):
+
+  # local variables
+  rows = []
+
+  for path, size, mtime_ns in songs:
+    try:
+      rows.append((path, size, mtime_ns) + hash_sample(path))
+
+    # songs that can't be read are never taken for copies
+    except (OSError, ValueError):
+      pass
+
+  return rows
+
+def hash_full_chunk(songs):
+
+  # local variables
+  rows = []
+
+  for path, size, mtime_ns, sample_hash in songs:
+    try:
+      rows.append((path, size, mtime_ns, sample_hash, hash_full(path)))
+    except OSError:
+      pass
+
+  return rows
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class finds the copies in a list of songs in the background and
+#   keeps the hashes in the library index
+# -----------------------------------------------------------------------------
+class DuplicateFinder(MetadataReader):
+
+  read_chunk = staticmethod(hash_sample_chunk)
+  row_column = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle finder
+  #
+  # INPUT PARAMETERS:
+  #   index - LibraryIndex the hashes are kept in, or None
+  #   max_workers - number of processes, or None for one per CPU
+  #   chunk_size - number of songs sent to a process at once
+  # ---------------------------------------------------------------------------
+  def __init__(self, index=None, max_workers=None, chunk_size=CHUNK_SIZE):
+
+    MetadataReader.__init__(self, index, max_workers, chunk_size)
+    self.copies = {}
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts looking for copies in a list of songs. Once poll() says it has
+  #   finished, copies maps the index of every song that is a copy of an
+  #   earlier one to the index of the first song.
+  #
+  # INPUT PARAMETERS:
+  #   paths - iterable of full song paths, in list order, gone through on the
+  #           background thread
+  #
+  # RETURN:
+  #   id of the new search, to be passed back in to poll()
+  # ---------------------------------------------------------------------------
+  def start(self, paths):
+
+    self.copies = {}
+
+    return MetadataReader.start(self, paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads and saves hashes instead of tags
+  # ---------------------------------------------------------------------------
+  def _load_cache(self, paths):
+
+    return self.index.load_hashes(paths)
+
+  def _save_cache(self, rows):
+
+    self.index.save_hashes(rows)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Background thread that narrows the songs down by size, then by sample
+  #   hash, then by full hash
+  #
+  # INPUT PARAMETERS:
+  #   paths - iterable of full song paths
+  #   results - queue poll() reads progress from
+  #   cancel - event set when this search should stop early
+  #   row_values - not used, nothing is kept in list order
+  # ---------------------------------------------------------------------------
+  def _read(self, paths, results, cancel, row_values=None):
+
+    # local variables
+    first = {}
+    copies = {}
+    sizes = {}
+    by_size = {}
+    songs_seen = 0
+
+    try:
+
+      # the same path listed again is a copy without looking at the file
+      for index, path in enumerate(paths):
+        if cancel.is_set():
+          return
+
+        songs_seen += 1
+
+        if path in first:
+          copies[index] = first[path]
+          continue
+        first[path] = index
+
+        try:
+          size = os.path.getsize(path)
+        except OSError:
+          continue
+
+        if size > 0:
+          sizes[path] = size
+          by_size.setdefault(size, []).append(path)
+
+      # hash the samples of files that share a size, from the index where it
+      # can
+      candidates = [path for group in by_size.values() if len(group) > 1 for path in group]
+      if len(candidates) > 0:
+        MetadataReader._read(self, candidates, queue.Queue(), cancel)
+
+      # hash in full only the files whose samples match as well
+      groups = self._group(candidates, sizes, SAMPLE_COLUMN)
+      self._hash_in_full([path for group in groups for path in group
+                          if self.cache[path][FULL_COLUMN] is None], cancel)
+
+      if cancel.is_set():
+        return
+
+      # every file after the first with the same contents is a copy of it
+      for group in self._group([path for group in groups for path in group], sizes,
+                               FULL_COLUMN):
+        for path in group[1:]:
+          copies[first[path]] = first[group[0]]
+
+      # a path listed again may itself be listed after a copy of its file
+      for index, kept in copies.items():
+        copies[index] = copies.get(kept, kept)
+
+    # the search always finishes, with the copies found before anything went
+    # wrong, so the GUI stops polling
+    finally:
+      if not cancel.is_set():
+        self.copies = copies
+        results.put((songs_seen, True))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Groups hashed files by size and one of their hashes
+  #
+  # INPUT PARAMETERS:
+  #   paths - paths of the files, in list order
+  #   sizes - dictionary of path -> size
+  #   column - SAMPLE_COLUMN or FULL_COLUMN
+  #
+  # RETURN:
+  #   list of the groups of more than one file, each in list order
+  # ---------------------------------------------------------------------------
+  def _group(self, paths, sizes, column):
+
+    # local variables
+    groups = {}
+
+    for path in paths:
+      values = self.cache.get(path)
+      if values is not None and values[column] is not None:
+        groups.setdefault((sizes[path], values[column]), []).append(path)
+
+    return [group for group in groups.values() if len(group) > 1]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Hashes files in full in the process pool and keeps the hashes
+  #
+  # INPUT PARAMETERS:
+  #   paths - paths of the files
+  #   cancel - event set when the search should stop early
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _hash_in_full(self, paths, cancel):
+
+    # local variables
+    songs = []
+
+    for path in paths:
+      try:
+        info = os.stat(path)
+      except OSError:
+        continue
+      songs.append((path, info.st_size, info.st_mtime_ns, self.cache[path][SAMPLE_COLUMN]))
+
+    if len(songs) == 0 or cancel.is_set():
+      return
+
+    chunks = [songs[start:start + self.chunk_size]
+              for start in range(0, len(songs), self.chunk_size)]
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+      for future in [pool.submit(hash_full_chunk, chunk) for chunk in chunks]:
+        if cancel.is_set():
+          pool.shutdown(cancel_futures=True)
+          break
+
+        # files of a chunk that fails are left without a full hash, so they
+        # are never reported as copies
+        try:
+          rows = future.result()
+        except Exception:
+          continue
+
+        for row in rows:
+          self.cache[row[0]] = row[3:]
+        if self._has_cache() and len(rows) > 0:
+          self._save_cache(rows)
+
+    return
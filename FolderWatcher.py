@@ -0,0 +1,589 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  FolderWatcher.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file keeps watching the loaded folder after it has been scanned, so
+#   songs copied in or deleted show up in the list without opening the folder
+#   again. On Linux every folder in the tree is watched with inotify, called
+#   through ctypes, and the kernel reports each change as it happens.
+#   Anywhere else, or if inotify runs out of watches, the tree is compared
+#   with the last look at it every so often instead; folders whose
+#   modification time hasn't changed are skipped without being read.
+#
+#   Changes are collected on a background thread and only passed to the main
+#   loop once things have been quiet for a moment, so copying thousands of
+#   songs in at once gives a single update. A song added and removed again
+#   before then is never reported at all.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+import tkinter
+import ctypes
+import ctypes.util
+from TrackTable import song_path
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# seconds without a change before changes are passed on, and the longest
+# changes are held back while they keep coming
+QUIET_TIME = 1.0
+MAX_DELAY = 30.0
+
+# seconds between looks at the tree when inotify isn't used
+RESCAN_INTERVAL = 15.0
+
+# longest the inotify thread waits before checking whether it was stopped
+STOP_CHECK = 1.0
+
+# inotify flags, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# changes each folder is watched for. A new song is only reported once it
+# has been written and closed, not when copying it starts
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+# layout of one inotify event: watch, mask, cookie, name length, then name
+EVENT_HEADER = struct.Struct('iIII')
+
+# most bytes of events read at once
+READ_SIZE = 64 * 1024
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function opens an inotify instance through the C library
+#
+# RETURN:
+#   the C library and the inotify file descriptor, or None if inotify can't be
+#   used on this system
+# -----------------------------------------------------------------------------
+def open_inotify():
+
+  if not sys.platform.startswith('linux'):
+    return None
+
+  try:
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+  # a C library without inotify
+  except (OSError, AttributeError):
+    return None
+
+  if fd < 0:
+    return None
+
+  return libc, fd
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class watches one folder tree at a time on a background thread and
+#   passes batches of added and removed songs to the main loop
+# -----------------------------------------------------------------------------
+class FolderWatcher:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle watcher
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window, used to pass changes to the main loop
+  #   on_change - called in the main loop with a sorted list of [folder, song]
+  #               rows that were added and a set of paths of removed songs
+  #   suffix - file ending of the songs to watch for (ex. '.mp3')
+  # ---------------------------------------------------------------------------
+  def __init__(self, root, on_change, suffix):
+
+    self.root = root
+    self.on_change = on_change
+    self.suffix = suffix
+    self.watch_id = 0
+    self.uses_inotify = False
+    self._stop_event = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts watching a folder tree, replacing any folder watched before
+  #
+  # INPUT PARAMETERS:
+  #   folder_name - top folder of the tree
+  #   mp3_list - the TrackTable of songs already loaded from it
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def start(self, folder_name, mp3_list):
+
+    # local variables
+    songs = {}
+
+    self.stop()
+    self.watch_id += 1
+    self._stop_event = threading.Event()
+
+    # the watcher starts from the songs the list has, so anything that changed
+    # since they were scanned is reported by the first look at the tree
+    for folder, name in mp3_list:
+      names = songs.get(folder)
+      if names is None:
+        names = set()
+        songs[folder] = names
+      names.add(name)
+
+    watcher = threading.Thread(target=self._watch,
+                               args=(folder_name, songs, self.watch_id, self._stop_event),
+                               daemon=True)
+    watcher.start()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Stops watching; changes not passed on yet are dropped
+  # ---------------------------------------------------------------------------
+  def stop(self):
+
+    if self._stop_event is not None:
+      self._stop_event.set()
+      self._stop_event = None
+      self.watch_id += 1
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Passes one batch of changes on, in the main loop, unless the watch it
+  #   came from has been stopped since
+  # ---------------------------------------------------------------------------
+  def _deliver(self, watch_id, added, removed):
+
+    if watch_id == self.watch_id:
+      self.on_change(added, removed)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Background thread for one watch: uses inotify if it can, otherwise looks
+  #   at the tree every RESCAN_INTERVAL seconds
+  # ---------------------------------------------------------------------------
+  def _watch(self, folder_name, songs, watch_id, stop_event):
+
+    # local variables
+    state = _TreeState(folder_name, self.suffix, songs)
+    inotify = open_inotify()
+    first_change = None
+    last_change = None
+
+    # the first look at the tree also puts a watch on every folder
+    if inotify is not None:
+      state.libc, state.fd = inotify
+    if state.rescan():
+      first_change = time.monotonic()
+      last_change = first_change
+
+    self.uses_inotify = state.fd is not None
+
+    try:
+      while not stop_event.is_set():
+
+        # wait less while changes are waiting to be passed on
+        if last_change is not None:
+          timeout = QUIET_TIME
+        elif state.fd is not None:
+          timeout = STOP_CHECK
+        else:
+          timeout = RESCAN_INTERVAL
+
+        if state.fd is not None:
+          ready, unused, unused = select.select([state.fd], [], [], timeout)
+          changed = state.read_events() if ready else False
+        else:
+          stop_event.wait(timeout)
+          changed = not stop_event.is_set() and state.rescan()
+
+        # hold changes back until things have been quiet for a moment, but not
+        # forever while they keep coming
+        now = time.monotonic()
+        if changed:
+          last_change = now
+          if first_change is None:
+            first_change = now
+
+        if last_change is not None and (
+           now - last_change >= QUIET_TIME or now - first_change >= MAX_DELAY):
+          added, removed = state.flush()
+          first_change = None
+          last_change = None
+
+          if len(added) > 0 or len(removed) > 0:
+            self.root.after_idle(self._deliver, watch_id, added, removed)
+
+    # the main window has been closed
+    except (RuntimeError, tkinter.TclError):
+      pass
+
+    finally:
+      if state.fd is not None:
+        os.close(state.fd)
+
+    return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is what one watch knows about its folder tree: the songs the
+#   main loop has been told about, the songs there are now and the changes
+#   between the two, and the inotify watches or folder modification times
+#   used to spot changes. It is only used from the watch's own thread.
+# -----------------------------------------------------------------------------
+class _TreeState:
+
+  def __init__(self, folder_name, suffix, songs):
+
+    self.folder_name = folder_name
+    self.suffix = suffix
+    self.songs = songs
+    self.found = {folder: set(names) for folder, names in songs.items()}
+    self.pending = {}
+    self.mtimes = {}
+    self.children = {}
+    self.libc = None
+    self.fd = None
+    self.watches = {}
+    self.watched = {}
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Notes that a song is now there or gone
+  #
+  # RETURN:
+  #   True if that is a change from what was found before
+  # ---------------------------------------------------------------------------
+  def note(self, folder, name, present):
+
+    # local variables
+    names = self.found.get(folder)
+
+    if present == (names is not None and name in names):
+      return False
+
+    if present:
+      if names is None:
+        names = set()
+        self.found[folder] = names
+      names.add(name)
+    else:
+      names.discard(name)
+
+    self.pending[(folder, name)] = present
+
+    return True
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Turns the noted changes into added and removed songs, leaving out those
+  #   that ended up back the way they were
+  #
+  # RETURN:
+  #   sorted list of added [folder, song] rows, set of removed song paths
+  # ---------------------------------------------------------------------------
+  def flush(self):
+
+    # local variables
+    added = []
+    removed = set()
+
+    for (folder, name), present in self.pending.items():
+      names = self.songs.get(folder)
+      known = names is not None and name in names
+
+      if present and not known:
+        if names is None:
+          names = set()
+          self.songs[folder] = names
+        names.add(name)
+        added.append([folder, name])
+
+      elif known and not present:
+        names.discard(name)
+        removed.add(song_path(folder, name))
+
+    self.pending = {}
+    added.sort()
+
+    return added, removed
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Looks at every folder of the tree and notes songs that appeared or went
+  #   away. Folders whose modification time hasn't changed are skipped, and
+  #   with inotify each folder gets a watch.
+  #
+  # RETURN:
+  #   True if anything was noted
+  # ---------------------------------------------------------------------------
+  def rescan(self):
+
+    # local variables
+    folders = [self.folder_name]
+    seen = set()
+    changed = False
+
+    while len(folders) > 0:
+      folder = folders.pop()
+      seen.add(folder)
+
+      # a folder must be watched before it is read, or songs added in between
+      # would be missed. Without enough watches, fall back to looking again
+      # every so often
+      if self.fd is not None and folder not in self.watched:
+        if not self.add_watch(folder):
+          self.remove_all_watches()
+
+      try:
+        mtime_ns = os.stat(folder).st_mtime_ns
+        if self.fd is None and self.mtimes.get(folder) == mtime_ns:
+          folders.extend(self.children.get(folder, ()))
+          continue
+        self.mtimes[folder] = mtime_ns
+
+        names = set()
+        sub_folders = []
+        with os.scandir(folder) as entries:
+          for entry in entries:
+            try:
+              if entry.is_dir(follow_symlinks=False):
+                sub_folders.append(entry.path)
+              elif entry.name.lower().endswith(self.suffix):
+                names.add(entry.name)
+            except OSError:
+              pass
+        self.children[folder] = sub_folders
+        folders.extend(sub_folders)
+
+      # a folder that can't be read any more has no songs
+      except OSError:
+        names = set()
+
+      changed = self.compare(folder, names) or changed
+
+    # folders that are gone took their songs with them
+    for folder in [folder for folder in self.mtimes if folder not in seen]:
+      del self.mtimes[folder]
+      self.children.pop(folder, None)
+
+    for folder in [folder for folder in self.found if folder not in seen]:
+      changed = self.compare(folder, set()) or changed
+
+    return changed
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Notes the differences between the songs found in a folder before and
+  #   the songs found in it now
+  # ---------------------------------------------------------------------------
+  def compare(self, folder, names):
+
+    # local variables
+    known = self.found.get(folder, set())
+    changed = False
+
+    for name in names - known:
+      changed = self.note(folder, name, True) or changed
+
+    for name in known - names:
+      changed = self.note(folder, name, False) or changed
+
+    return changed
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Puts an inotify watch on one folder
+  #
+  # RETURN:
+  #   False if the system limit on watches has been reached
+  # ---------------------------------------------------------------------------
+  def add_watch(self, folder):
+
+    watch = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+
+    if watch < 0:
+      return ctypes.get_errno() != errno.ENOSPC
+
+    self.watches[watch] = folder
+    self.watched[folder] = watch
+
+    return True
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes the watches off a folder and everything under it
+  # ---------------------------------------------------------------------------
+  def remove_watches(self, folder):
+
+    # local variables
+    prefix = folder + "/"
+
+    for path in [path for path in self.watched if path == folder or path.startswith(prefix)]:
+      watch = self.watched.pop(path)
+      self.watches.pop(watch, None)
+      self.libc.inotify_rm_watch(self.fd, watch)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Gives up on inotify, so the tree is looked at every so often instead
+  # ---------------------------------------------------------------------------
+  def remove_all_watches(self):
+
+    os.close(self.fd)
+    self.fd = None
+    self.watches = {}
+    self.watched = {}
+    self.mtimes = {}
+    self.children = {}
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Notes every song under a folder as gone
+  # ---------------------------------------------------------------------------
+  def forget_folder(self, folder):
+
+    # local variables
+    prefix = folder + "/"
+
+    for known in [known for known in self.found if known == folder or known.startswith(prefix)]:
+      self.compare(known, set())
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Reads the waiting inotify events and notes the songs they add or remove
+  #
+  # RETURN:
+  #   True if anything was noted
+  # ---------------------------------------------------------------------------
+  def read_events(self):
+
+    # local variables
+    changed = False
+
+    try:
+      data = os.read(self.fd, READ_SIZE)
+    except BlockingIOError:
+      return False
+
+    offset = 0
+    while offset < len(data):
+      watch, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+      offset += EVENT_HEADER.size
+      name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+      offset += length
+      folder = self.watches.get(watch)
+
+      # inotify was given up on while reading these events
+      if self.fd is None:
+        changed = True
+        break
+
+      # the kernel dropped events, so look at the whole tree again
+      if mask & IN_Q_OVERFLOW:
+        self.rescan()
+        changed = True
+
+      # the folder was deleted or moved; its songs are reported with it
+      elif mask & IN_IGNORED:
+        if folder is not None:
+          self.watches.pop(watch, None)
+          self.watched.pop(folder, None)
+
+      elif folder is None:
+        pass
+
+      elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+        if folder == self.folder_name:
+          self.forget_folder(folder)
+          changed = True
+
+      elif mask & IN_ISDIR:
+        path = folder + "/" + name
+
+        # a new folder is watched and read, since songs may already be in it
+        if mask & (IN_CREATE | IN_MOVED_TO):
+          self.rescan_folder(path)
+          changed = True
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+          self.remove_watches(path)
+          self.forget_folder(path)
+          changed = True
+
+      elif name.lower().endswith(self.suffix):
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+          changed = self.note(folder, name, True) or changed
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+          changed = self.note(folder, name, False) or changed
+
+    return changed
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Watches and reads a folder that was just created or moved in, with
+  #   everything under it
+  # ---------------------------------------------------------------------------
+  def rescan_folder(self, folder):
+
+    # local variables
+    folders = [folder]
+
+    while len(folders) > 0:
+      folder = folders.pop()
+
+      if folder not in self.watched and not self.add_watch(folder):
+        self.remove_all_watches()
+        return
+
+      try:
+        with os.scandir(folder) as entries:
+          for entry in entries:
+            try:
+              if entry.is_dir(follow_symlinks=False):
+                folders.append(entry.path)
+              elif entry.name.lower().endswith(self.suffix):
+                self.note(folder, entry.name, True)
+            except OSError:
+              pass
+      except OSError:
+        pass
+
+    return
@@ -0,0 +1,682 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  LibraryIndex.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file keeps a persistent index of every folder and mp3 file that has
+#   been scanned, stored in a small SQLite database. For each folder the index
+#   holds its modification time and its sub folders, and for each song its
+#   size and modification time. When a known folder is opened again only the
+#   folders whose modification time changed have to be read again; every
+#   other folder is answered straight from the index without touching its
+#   songs.
+#   The index also keeps the tags, loudness gain and content hashes worked out
+#   for each song, under the song's size and modification time so they are
+#   worked out again when the file changes, the rating given to each song,
+#   and the play history folded into totals per song and per month.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import sqlite3
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# columns of a folder record returned by load()
+MTIME_COLUMN = 0
+SONGS_COLUMN = 1
+SUB_FOLDERS_COLUMN = 2
+PARENT_COLUMN = 3
+
+# columns of a song inside a folder record
+NAME_COLUMN = 0
+SIZE_COLUMN = 1
+SONG_MTIME_COLUMN = 2
+
+# seconds to wait on a locked database before giving up
+LOCK_TIMEOUT = 30
+
+# most song paths looked up by one query
+PATHS_PER_QUERY = 500
+
+# table layout of the index
+SCHEMA = '''
+  CREATE TABLE IF NOT EXISTS folders (
+    path     TEXT PRIMARY KEY,
+    parent   TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+  ) WITHOUT ROWID;
+  CREATE INDEX IF NOT EXISTS folders_parent ON folders (parent);
+  CREATE TABLE IF NOT EXISTS tracks (
+    folder   TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (folder, name)
+  ) WITHOUT ROWID;
+  CREATE TABLE IF NOT EXISTS metadata (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    artist      TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL
+  ) WITHOUT ROWID;
+  CREATE TABLE IF NOT EXISTS gains (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    gain_db  REAL NOT NULL
+  ) WITHOUT ROWID;
+  CREATE TABLE IF NOT EXISTS hashes (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    sample_hash TEXT NOT NULL,
+    full_hash   TEXT
+  ) WITHOUT ROWID;
+  CREATE TABLE IF NOT EXISTS ratings (
+    path   TEXT PRIMARY KEY,
+    rating INTEGER NOT NULL
+  ) WITHOUT ROWID;
+  CREATE TABLE IF NOT EXISTS play_totals (
+    path        TEXT PRIMARY KEY,
+    plays       INTEGER NOT NULL,
+    skips       INTEGER NOT NULL,
+    last_played REAL NOT NULL,
+    listened_ms INTEGER NOT NULL
+  ) WITHOUT ROWID;
+  CREATE TABLE IF NOT EXISTS monthly_plays (
+    month       TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    plays       INTEGER NOT NULL,
+    skips       INTEGER NOT NULL,
+    listened_ms INTEGER NOT NULL,
+    PRIMARY KEY (month, path)
+  ) WITHOUT ROWID;
+  CREATE INDEX IF NOT EXISTS monthly_plays_top ON monthly_plays (month, plays);
+  CREATE TABLE IF NOT EXISTS history_state (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+  ) WITHOUT ROWID;
+'''
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the SQL where clause and values that select a
+#   folder and everything below it, using a range so the primary key index
+#   is used instead of a LIKE scan
+#
+# INPUT PARAMETERS:
+#   column - name of the path column to match
+#   folder_name - top folder of the subtree
+#
+# RETURN:
+#   where clause, tuple of values for it
+# -----------------------------------------------------------------------------
+def subtree_clause(column, folder_name):
+
+  # every path below folder_name sorts between "folder_name/" and "folder_name0"
+  prefix = folder_name.rstrip('/')
+  clause = '(' + column + ' = ? OR (' + column + ' >= ? AND ' + column + ' < ?))'
+
+  return clause, (folder_name, prefix + '/', prefix + '0')
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class reads and writes the library index. A new connection is made
+#   for every call so the index can be used from any thread.
+# -----------------------------------------------------------------------------
+class LibraryIndex:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an index stored in the given file
+  #
+  # INPUT PARAMETERS:
+  #   index_file - path of the SQLite database file
+  # ---------------------------------------------------------------------------
+  def __init__(self, index_file):
+
+    self.index_file = index_file
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Opens the database, creating its folder and tables the first time
+  #
+  # RETURN:
+  #   open sqlite3 connection
+  # ---------------------------------------------------------------------------
+  def _connect(self):
+
+    os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+    connection = sqlite3.connect(self.index_file, timeout=LOCK_TIMEOUT)
+    connection.executescript(SCHEMA)
+
+    return connection
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Looks up the rows of some songs in a table keyed by song path, a few
+  #   hundred songs per query
+  #
+  # INPUT PARAMETERS:
+  #   columns - columns to select, the path first
+  #   table - name of the table
+  #   paths - list of song paths
+  #
+  # RETURN:
+  #   dictionary of song path -> the other columns, for the songs found
+  # ---------------------------------------------------------------------------
+  def _load_paths(self, columns, table, paths):
+
+    # local variables
+    cached = {}
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        for start in range(0, len(paths), PATHS_PER_QUERY):
+          batch = paths[start:start + PATHS_PER_QUERY]
+          for row in connection.execute(
+              'SELECT ' + columns + ' FROM ' + table + ' WHERE path IN (' +
+              ', '.join('?' * len(batch)) + ')', batch):
+            cached[row[0]] = row[1:]
+
+      finally:
+        connection.close()
+
+    # an unreadable index just means those songs get worked out again
+    except sqlite3.Error:
+      cached = {}
+
+    return cached
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads every indexed folder at or below a folder
+  #
+  # INPUT PARAMETERS:
+  #   folder_name - top folder of the library
+  #
+  # RETURN:
+  #   dictionary of folder path -> [mtime_ns, songs, sub folders, parent],
+  #   where songs is a list of (name, size, mtime_ns) in name order
+  # ---------------------------------------------------------------------------
+  def load(self, folder_name):
+
+    # local variables
+    known = {}
+    folder_clause, folder_args = subtree_clause('path', folder_name)
+    track_clause, track_args = subtree_clause('folder', folder_name)
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        # one record per folder, then hook each folder up to its parent
+        for path, parent, mtime_ns in connection.execute(
+            'SELECT path, parent, mtime_ns FROM folders WHERE ' + folder_clause,
+            folder_args):
+          known[path] = [mtime_ns, [], [], parent]
+
+        # older indexes stored the top folder of each scan without a parent
+        for path, record in known.items():
+          parent = record[PARENT_COLUMN] or os.path.dirname(path)
+          if parent != path and parent in known:
+            known[parent][SUB_FOLDERS_COLUMN].append(path)
+
+        # add the songs of each folder, already sorted by the primary key
+        for folder, name, size, mtime_ns in connection.execute(
+            'SELECT folder, name, size, mtime_ns FROM tracks WHERE ' + track_clause +
+            ' ORDER BY folder, name', track_args):
+          if folder in known:
+            known[folder][SONGS_COLUMN].append((name, size, mtime_ns))
+
+      finally:
+        connection.close()
+
+    # an unreadable index just means everything gets scanned again
+    except sqlite3.Error:
+      known = {}
+
+    return known
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes the result of a finished scan back to the index. Folders that
+  #   changed are replaced and folders that were not seen again are removed.
+  #
+  # INPUT PARAMETERS:
+  #   known - dictionary returned by load() before the scan
+  #   visited - set of every folder reached by the scan
+  #   changed - dictionary of folder path -> new folder record for every
+  #             folder that had to be read again
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save(self, known, visited, changed):
+
+    # folders that disappeared or changed lose their old rows
+    stale = [(path,) for path in known if path not in visited or path in changed]
+
+    # nothing to do if every folder was unchanged
+    if len(stale) == 0 and len(changed) == 0:
+      return
+
+    try: # index might be locked by another scan or damaged...
+      connection = self._connect()
+
+      try:
+        with connection:
+          connection.executemany('DELETE FROM folders WHERE path = ?', stale)
+          connection.executemany('DELETE FROM tracks WHERE folder = ?', stale)
+          connection.executemany('DELETE FROM tracks WHERE folder = ?',
+                                 [(path,) for path in changed if path not in known])
+          connection.executemany(
+            'INSERT OR REPLACE INTO folders (path, parent, mtime_ns) VALUES (?, ?, ?)',
+            [(path, record[PARENT_COLUMN], record[MTIME_COLUMN])
+             for path, record in changed.items()])
+          connection.executemany(
+            'INSERT OR REPLACE INTO tracks (folder, name, size, mtime_ns) VALUES (?, ?, ?, ?)',
+            [(path,) + song for path, record in changed.items()
+             for song in record[SONGS_COLUMN]])
+
+      finally:
+        connection.close()
+
+    # a failed write only costs a full read of those folders next time
+    except sqlite3.Error:
+      pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads the tags of some songs, for those that have been read before
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of song paths
+  #
+  # RETURN:
+  #   dictionary of song path -> (size, mtime_ns, artist, title, duration_ms)
+  # ---------------------------------------------------------------------------
+  def load_metadata(self, paths):
+
+    return self._load_paths('path, size, mtime_ns, artist, title, duration_ms', 'metadata', paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes newly read tags to the index, replacing older ones for the same
+  #   songs
+  #
+  # INPUT PARAMETERS:
+  #   rows - list of (path, size, mtime_ns, artist, title, duration_ms)
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save_metadata(self, rows):
+
+    try: # index might be locked by a scan or damaged...
+      connection = self._connect()
+
+      try:
+        with connection:
+          connection.executemany(
+            'INSERT OR REPLACE INTO metadata (path, size, mtime_ns, artist, title, ' +
+            'duration_ms) VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+      finally:
+        connection.close()
+
+    # a failed write only means those songs get read again next time
+    except sqlite3.Error:
+      pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads the loudness gain of some songs, for those analysed before
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of song paths
+  #
+  # RETURN:
+  #   dictionary of song path -> (size, mtime_ns, gain_db)
+  # ---------------------------------------------------------------------------
+  def load_gains(self, paths):
+
+    return self._load_paths('path, size, mtime_ns, gain_db', 'gains', paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes newly worked out gains to the index, replacing older ones for
+  #   the same songs
+  #
+  # INPUT PARAMETERS:
+  #   rows - list of (path, size, mtime_ns, gain_db)
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save_gains(self, rows):
+
+    try: # index might be locked by a scan or damaged...
+      connection = self._connect()
+
+      try:
+        with connection:
+          connection.executemany(
+            'INSERT OR REPLACE INTO gains (path, size, mtime_ns, gain_db) VALUES (?, ?, ?, ?)',
+            rows)
+
+      finally:
+        connection.close()
+
+    # a failed write only means those songs get analysed again next time
+    except sqlite3.Error:
+      pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads the content hashes of some songs, for those hashed before
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of song paths
+  #
+  # RETURN:
+  #   dictionary of song path -> (size, mtime_ns, sample_hash, full_hash),
+  #   where full_hash is None if only the sample was hashed
+  # ---------------------------------------------------------------------------
+  def load_hashes(self, paths):
+
+    return self._load_paths('path, size, mtime_ns, sample_hash, full_hash', 'hashes', paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes newly worked out hashes to the index, replacing older ones for
+  #   the same songs
+  #
+  # INPUT PARAMETERS:
+  #   rows - list of (path, size, mtime_ns, sample_hash, full_hash)
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save_hashes(self, rows):
+
+    try: # index might be locked by a scan or damaged...
+      connection = self._connect()
+
+      try:
+        with connection:
+          connection.executemany(
+            'INSERT OR REPLACE INTO hashes (path, size, mtime_ns, sample_hash, full_hash) ' +
+            'VALUES (?, ?, ?, ?, ?)', rows)
+
+      finally:
+        connection.close()
+
+    # a failed write only means those songs get hashed again next time
+    except sqlite3.Error:
+      pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads the rating of every song that has been rated
+  #
+  # RETURN:
+  #   dictionary of song path -> rating
+  # ---------------------------------------------------------------------------
+  def load_ratings(self):
+
+    # local variables
+    ratings = {}
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        ratings = dict(connection.execute('SELECT path, rating FROM ratings'))
+
+      finally:
+        connection.close()
+
+    # an unreadable index just means no song is rated
+    except sqlite3.Error:
+      ratings = {}
+
+    return ratings
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes ratings to the index, replacing older ones for the same songs
+  #
+  # INPUT PARAMETERS:
+  #   rows - list of (path, rating), where a rating of None takes the rating
+  #          away
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save_ratings(self, rows):
+
+    try: # index might be locked by a scan or damaged...
+      connection = self._connect()
+
+      try:
+        with connection:
+          connection.executemany('DELETE FROM ratings WHERE path = ?',
+                                 [(path,) for path, rating in rows if rating is None])
+          connection.executemany('INSERT OR REPLACE INTO ratings (path, rating) VALUES (?, ?)',
+                                 [row for row in rows if row[1] is not None])
+
+      finally:
+        connection.close()
+
+    # a failed write only loses the rating when the player is closed
+    except sqlite3.Error:
+      pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the number of the last play history segment folded into the
+  #   totals, or 0 if none has been
+  # ---------------------------------------------------------------------------
+  def folded_segment(self):
+
+    # local variables
+    number = 0
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        row = connection.execute(
+          "SELECT value FROM history_state WHERE name = 'folded_segment'").fetchone()
+        if row is not None:
+          number = row[0]
+
+      finally:
+        connection.close()
+
+    except sqlite3.Error:
+      number = 0
+
+    return number
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds the totals of one play history segment to the totals per song and
+  #   per month, and notes the segment as folded, all in one transaction. A
+  #   segment that has been folded already is left out.
+  #
+  # INPUT PARAMETERS:
+  #   number - number of the segment
+  #   totals - list of (path, plays, skips, last_played, listened_ms)
+  #   months - list of (month, path, plays, skips, listened_ms)
+  #
+  # RETURN:
+  #   True if the segment has been folded, now or before
+  # ---------------------------------------------------------------------------
+  def fold_history(self, number, totals, months):
+
+    try: # index might be locked by a scan or damaged...
+      connection = self._connect()
+
+      try:
+        with connection:
+          row = connection.execute(
+            "SELECT value FROM history_state WHERE name = 'folded_segment'").fetchone()
+          if row is not None and row[0] >= number:
+            return True
+
+          connection.executemany(
+            'INSERT INTO play_totals (path, plays, skips, last_played, listened_ms) ' +
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (path) DO UPDATE SET ' +
+            'plays = plays + excluded.plays, skips = skips + excluded.skips, ' +
+            'last_played = max(last_played, excluded.last_played), ' +
+            'listened_ms = listened_ms + excluded.listened_ms', totals)
+          connection.executemany(
+            'INSERT INTO monthly_plays (month, path, plays, skips, listened_ms) ' +
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (month, path) DO UPDATE SET ' +
+            'plays = plays + excluded.plays, skips = skips + excluded.skips, ' +
+            'listened_ms = listened_ms + excluded.listened_ms', months)
+          connection.execute(
+            "INSERT OR REPLACE INTO history_state (name, value) VALUES ('folded_segment', ?)",
+            (number,))
+
+      finally:
+        connection.close()
+
+    # the segment is kept, and the ones after it wait for it
+    except sqlite3.Error:
+      return False
+
+    return True
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads the play totals of every song that has been played
+  #
+  # RETURN:
+  #   dictionary of song path -> (plays, skips, last_played, listened_ms)
+  # ---------------------------------------------------------------------------
+  def load_play_totals(self):
+
+    # local variables
+    totals = {}
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        for row in connection.execute(
+            'SELECT path, plays, skips, last_played, listened_ms FROM play_totals'):
+          totals[row[0]] = row[1:]
+
+      finally:
+        connection.close()
+
+    except sqlite3.Error:
+      totals = {}
+
+    return totals
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the most played songs of a range of months. A single month is
+  #   read straight off the index in play order.
+  #
+  # INPUT PARAMETERS:
+  #   first_month - first month as YYYY-MM
+  #   last_month - last month as YYYY-MM
+  #   limit - most songs returned
+  #
+  # RETURN:
+  #   list of (path, plays), most played first
+  # ---------------------------------------------------------------------------
+  def top_plays(self, first_month, last_month, limit):
+
+    # local variables
+    rows = []
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        if first_month == last_month:
+          rows = connection.execute(
+            'SELECT path, plays FROM monthly_plays WHERE month = ? ' +
+            'ORDER BY plays DESC LIMIT ?', (first_month, limit)).fetchall()
+        else:
+          rows = connection.execute(
+            'SELECT path, SUM(plays) AS total FROM monthly_plays ' +
+            'WHERE month BETWEEN ? AND ? GROUP BY path ORDER BY total DESC LIMIT ?',
+            (first_month, last_month, limit)).fetchall()
+
+      finally:
+        connection.close()
+
+    except sqlite3.Error:
+      rows = []
+
+    return rows
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns how many times some songs were played in a range of months
+  #
+  # INPUT PARAMETERS:
+  #   first_month - first month as YYYY-MM
+  #   last_month - last month as YYYY-MM
+  #   paths - paths of the songs
+  #
+  # RETURN:
+  #   dictionary of song path -> plays, for the songs played in those months
+  # ---------------------------------------------------------------------------
+  def plays_of(self, first_month, last_month, paths):
+
+    # local variables
+    plays = {}
+
+    if len(paths) == 0:
+      return plays
+
+    try: # index might be missing or damaged...
+      connection = self._connect()
+
+      try:
+        for path in paths:
+          row = connection.execute(
+            'SELECT SUM(plays) FROM monthly_plays WHERE month BETWEEN ? AND ? AND path = ?',
+            (first_month, last_month, path)).fetchone()
+          if row[0] is not None:
+            plays[path] = row[0]
+
+      finally:
+        connection.close()
+
+    except sqlite3.Error:
+      plays = {}
+
+    return plays
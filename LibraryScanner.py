@@ -0,0 +1,285 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  LibraryScanner.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file walks a music folder and all of its sub folders looking for mp3
+#   files. Each folder is read with os.scandir inside a bounded pool of worker
+#   threads, so deep artist/album trees on slow network drives are read in
+#   parallel. Songs are handed back in batches through a queue that the GUI
+#   polls, which lets the first songs be loaded and played while the rest of
+#   the library is still being scanned. With a library index attached, folders
+#   that have not changed since the last scan are not read again or looked
+#   into at all. Songs edited in place are caught later, in the background, by
+#   the tag reader comparing each song's size and modification time.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from LibraryIndex import MTIME_COLUMN, SONGS_COLUMN, SUB_FOLDERS_COLUMN, NAME_COLUMN
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# number of folders read at the same time and number of songs sent per batch
+SCAN_WORKERS = 8
+BATCH_SIZE = 500
+
+# message types placed on the results queue
+SCAN_BATCH = 0
+SCAN_DONE = 1
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads a single folder and splits its entries into the mp3
+#   files it holds and the sub folders that still need to be read. When a
+#   library index is in use, a folder whose modification time has not changed
+#   is answered from the index without being read. Adding, removing or
+#   renaming a song changes its folder's time; editing one in place doesn't,
+#   and is left to the tag reader's size and modification time check.
+#
+# INPUT PARAMETERS:
+#   folder_name - path of the folder to read
+#   suffix - file ending of the songs to keep (ex. '.mp3')
+#   known - folder records loaded from the library index, or None
+#   parent - path of the folder this one was found in
+#
+# RETURN:
+#   list of [folder, song] entries sorted by song name, list of sub folders,
+#   new folder record for the index (None if unchanged or not indexing)
+# -----------------------------------------------------------------------------
+def scan_folder(folder_name, suffix, known=None, parent=''):
+
+  # local variables
+  songs = []
+  sub_folders = []
+  record = None
+
+  try: # folder might be unreadable or removed while scanning...
+
+    # an unchanged folder only costs the stat call on the folder itself
+    if known is not None:
+      mtime_ns = os.stat(folder_name).st_mtime_ns
+      cached = known.get(folder_name)
+
+      if cached is not None and cached[MTIME_COLUMN] == mtime_ns:
+        songs = [[folder_name, song[NAME_COLUMN]] for song in cached[SONGS_COLUMN]]
+        return songs, cached[SUB_FOLDERS_COLUMN], None
+
+      record = [mtime_ns, [], sub_folders, parent]
+
+    # keep sub folders for later and any file that ends in the song suffix
+    with os.scandir(folder_name) as entries:
+      for entry in entries:
+        try:
+          if entry.is_dir(follow_symlinks=False):
+            sub_folders.append(entry.path)
+          elif entry.name.lower().endswith(suffix):
+            songs.append([folder_name, entry.name])
+
+            # remember size and modification time of each song in the index
+            if record is not None:
+              info = entry.stat()
+              record[SONGS_COLUMN].append((entry.name, info.st_size, info.st_mtime_ns))
+        except OSError:
+          pass
+
+  # skip folders that can't be read instead of stopping the whole scan
+  except OSError:
+    return [], [], None
+
+  # keep songs of one folder in name order
+  songs.sort(key=lambda song: song[1])
+  if record is not None:
+    record[SONGS_COLUMN].sort()
+
+  return songs, sub_folders, record
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class runs a recursive scan of a folder on a background thread. Only
+#   one scan runs at a time; starting a new one cancels the last one.
+# -----------------------------------------------------------------------------
+class LibraryScanner:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle scanner
+  #
+  # INPUT PARAMETERS:
+  #   suffix - file ending of the songs to keep (ex. '.mp3')
+  #   index - LibraryIndex used to skip unchanged folders, or None
+  #   max_workers - number of folders read at the same time
+  #   batch_size - number of songs sent to the GUI at once
+  # ---------------------------------------------------------------------------
+  def __init__(self, suffix, index=None, max_workers=SCAN_WORKERS, batch_size=BATCH_SIZE):
+
+    self.suffix = suffix
+    self.index = index
+    self.max_workers = max_workers
+    self.batch_size = batch_size
+    self.folder_name = ''
+    self.songs_found = 0
+    self.folders_scanned = 0
+    self.scan_id = 0
+    self._results = queue.Queue()
+    self._cancel = threading.Event()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Cancels any running scan and starts scanning a new folder
+  #
+  # INPUT PARAMETERS:
+  #   folder_name - top folder of the library to scan
+  #
+  # RETURN:
+  #   id of the new scan, to be passed back in to poll()
+  # ---------------------------------------------------------------------------
+  def start(self, folder_name):
+
+    # stop the last scan, then give the new one its own queue and cancel flag
+    self.cancel()
+    self.folder_name = folder_name
+    self.songs_found = 0
+    self.folders_scanned = 0
+    self._results = queue.Queue()
+    self._cancel = threading.Event()
+
+    walker = threading.Thread(target=self._walk, daemon=True,
+                              args=(folder_name, self._results, self._cancel))
+    walker.start()
+
+    return self.scan_id
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Stops the running scan. Any poll() for the old scan id returns None.
+  # ---------------------------------------------------------------------------
+  def cancel(self):
+
+    self._cancel.set()
+    self.scan_id += 1
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Collects the song batches that have arrived since the last poll. Never
+  #   blocks, so it is safe to call from the tkinter main loop.
+  #
+  # INPUT PARAMETERS:
+  #   scan_id - id returned by start()
+  #
+  # RETURN:
+  #   (list of song batches, True if the scan is finished), or None if the
+  #   scan has been cancelled or replaced by a newer one
+  # ---------------------------------------------------------------------------
+  def poll(self, scan_id):
+
+    # local variables
+    batches = []
+    finished = False
+
+    # stale poll from an older scan
+    if scan_id != self.scan_id:
+      return None
+
+    # drain whatever the walker thread has sent so far
+    try:
+      while not finished:
+        kind, songs, songs_found, folders_scanned = self._results.get_nowait()
+        self.songs_found = songs_found
+        self.folders_scanned = folders_scanned
+        finished = (kind == SCAN_DONE)
+        if len(songs) > 0:
+          batches.append(songs)
+    except queue.Empty:
+      pass
+
+    return batches, finished
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Background thread that hands folders to the worker pool as they are
+  #   found and streams the songs back through the results queue
+  #
+  # INPUT PARAMETERS:
+  #   folder_name - top folder of the library to scan
+  #   results - queue the GUI reads batches from
+  #   cancel - event set when this scan should stop early
+  # ---------------------------------------------------------------------------
+  def _walk(self, folder_name, results, cancel):
+
+    # local variables
+    batch = []
+    songs_found = 0
+    folders_scanned = 0
+    first_sent = False
+    known = None
+    folder_of = {}
+    changed = {}
+
+    # load what the index already knows about this folder
+    if self.index is not None:
+      known = self.index.load(folder_name)
+
+    # the top folder keeps its real parent, so a scan of a sub folder on its
+    # own doesn't cut it off from a later scan of the whole library
+    with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+      job = pool.submit(scan_folder, folder_name, self.suffix, known,
+                        os.path.dirname(folder_name.rstrip(os.sep)))
+      pending = {job}
+
+      # remember which folder each job is reading
+      folder_of[job] = folder_name
+
+      # each finished folder adds its songs to the batch and its sub folders
+      # to the pool
+      while len(pending) > 0 and not cancel.is_set():
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future in done:
+          songs, sub_folders, record = future.result()
+          folders_scanned += 1
+          batch.extend(songs)
+          for sub_folder in sub_folders:
+            job = pool.submit(scan_folder, sub_folder, self.suffix, known, folder_of[future])
+            folder_of[job] = sub_folder
+            pending.add(job)
+
+          # folders that had to be read again get written back to the index
+          if record is not None:
+            changed[folder_of[future]] = record
+
+        # send the very first songs right away so playback can start early
+        if len(batch) >= self.batch_size or (len(batch) > 0 and not first_sent):
+          songs_found += len(batch)
+          results.put((SCAN_BATCH, batch, songs_found, folders_scanned))
+          batch = []
+          first_sent = True
+
+      # drop folders that were queued but never started
+      for future in pending:
+        future.cancel()
+
+    # send any leftover songs along with the finished message, then update
+    # the index now that the whole folder has been seen
+    if not cancel.is_set():
+      songs_found += len(batch)
+      results.put((SCAN_DONE, batch, songs_found, folders_scanned))
+
+      if self.index is not None:
+        self.index.save(known, set(folder_of.values()), changed)
+
+    return
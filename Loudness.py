@@ -0,0 +1,248 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  Loudness.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file works out how much louder or quieter each song should be played
+#   so every song sounds about as loud as the last one, in the style of
+#   ReplayGain. Each song is decoded by the pygame mixer and its samples are
+#   cut into 50 ms windows with NumPy. The loudness of the song is the 95th
+#   percentile of the window energies, and the gain is the difference
+#   between that and a target level, limited so the loudest sample never
+#   clips. The samples are looked at where the mixer decoded them and
+#   processed a few seconds at a time, so only the decoded song itself has to
+#   fit in memory. Files too big for that to be reasonable, such as whole
+#   albums or long mixes in one file, aren't decoded and are played without
+#   a gain.
+#
+#   Songs are analysed in a pool of processes through the same machinery as
+#   the tag reader, and the gains are kept in the library index so each song
+#   is only analysed once. If NumPy isn't installed, songs are simply played
+#   without a gain. pygame and NumPy are only imported inside the worker
+#   processes, so loading this file costs the player nothing at start up.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import math
+import importlib.util
+from TrackMetadata import MetadataReader
+
+# NumPy is only needed for loudness analysis, which is skipped without it
+HAVE_NUMPY = importlib.util.find_spec('numpy') is not None
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# format songs are decoded to: 16 bit signed stereo at 44.1 kHz
+SAMPLE_RATE = 44100
+SAMPLE_SIZE = -16
+CHANNELS = 2
+FULL_SCALE = 32768.0
+
+# length of one loudness window and of the blocks samples are processed in
+WINDOW_MS = 50
+BLOCK_SECONDS = 10
+
+# percentile of the window energies taken as the loudness of the song
+LOUDNESS_PERCENTILE = 95
+
+# loudness every song is brought to, in dB below full scale, and the most a
+# song is turned up or down
+TARGET_DB = -18.0
+MAX_GAIN_DB = 12.0
+
+# energy used for silence, so its loudness isn't minus infinity
+SILENCE = 1e-10
+
+# songs analysed per job; songs are much slower to decode than to tag
+CHUNK_SIZE = 4
+
+# largest file decoded, about 20 minutes at 160 kbps. Decoded, a song takes
+# about nine times as much memory as its file
+MAX_SONG_BYTES = 24 * 1024 * 1024
+
+# column of the gain in the values kept for each song
+GAIN_COLUMN = 0
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function starts the mixer inside a worker process, on SDL's dummy
+#   audio driver so it never opens the sound card
+# -----------------------------------------------------------------------------
+def init_worker():
+
+  from pygame import mixer
+
+  os.environ['SDL_AUDIODRIVER'] = 'dummy'
+  mixer.init(frequency=SAMPLE_RATE, size=SAMPLE_SIZE, channels=CHANNELS)
+
+  return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out the gain of one song
+#
+# INPUT PARAMETERS:
+#   path - path of the song
+#
+# RETURN:
+#   gain in dB that brings the song to the target loudness
+# -----------------------------------------------------------------------------
+def measure_gain(path):
+
+  import numpy
+  from pygame import mixer, sndarray
+
+  # local variables
+  window = SAMPLE_RATE * WINDOW_MS // 1000
+  block = window * (SAMPLE_RATE * BLOCK_SECONDS // window)
+  energies = []
+  peak = 0.0
+
+  # decode the song and look at its samples in the mixer's own buffer, as
+  # one row of CHANNELS samples per frame
+  samples = sndarray.samples(mixer.Sound(path))
+
+  # mean energy of each window, worked out one block at a time so only one
+  # block is ever converted to floating point
+  for start in range(0, len(samples), block):
+    part = samples[start:start + block].astype(numpy.float32) / FULL_SCALE
+    peak = max(peak, float(numpy.abs(part).max()))
+    windows = len(part) // window
+    if windows > 0:
+      squares = numpy.square(part[:windows * window]).reshape(windows, window * CHANNELS)
+      energies.append(squares.mean(axis=1))
+
+  if len(energies) == 0:
+    return 0.0
+
+  # loudness is set by the loud parts of the song, not its quiet passages
+  energy = float(numpy.percentile(numpy.concatenate(energies), LOUDNESS_PERCENTILE))
+  gain = TARGET_DB - 10 * math.log10(max(energy, SILENCE))
+  gain = max(-MAX_GAIN_DB, min(gain, MAX_GAIN_DB))
+
+  # never turn a song up so far that its loudest sample clips
+  if peak > 0:
+    gain = min(gain, -20 * math.log10(peak))
+
+  return round(gain, 2)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function analyses one chunk of songs inside a worker process
+#
+# INPUT PARAMETERS:
+#   songs - list of (path, size, mtime_ns)
+#
+# RETURN:
+#   list of (path, size, mtime_ns, gain_db) for every song that could be
+#   decoded, or is too big to be
+# -----------------------------------------------------------------------------
+def measure_gain_chunk(songs):
+
+  import pygame
+
+  # local variables
+  rows = []
+
+  for path, size, mtime_ns in songs:
+
+    # kept with no gain, so they aren't tried again every time
+    if size > MAX_SONG_BYTES:
+      rows.append((path, size, mtime_ns, 0.0))
+      continue
+
+    try:
+      rows.append((path, size, mtime_ns, measure_gain(path)))
+
+    # songs that can't be decoded are just played without a gain
+    except (pygame.error, OSError, MemoryError):
+      pass
+
+  return rows
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function turns a gain in dB into a volume multiplier
+# -----------------------------------------------------------------------------
+def gain_factor(gain_db):
+
+  return 10 ** (gain_db / 20)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class analyses the loudness of a list of songs in the background and
+#   keeps the gains in the library index
+# -----------------------------------------------------------------------------
+class LoudnessAnalyzer(MetadataReader):
+
+  read_chunk = staticmethod(measure_gain_chunk)
+  worker_init = staticmethod(init_worker)
+  row_column = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle analyzer
+  #
+  # INPUT PARAMETERS:
+  #   index - LibraryIndex the gains are kept in, or None
+  #   max_workers - number of processes, or None for one per CPU
+  #   chunk_size - number of songs sent to a process at once
+  # ---------------------------------------------------------------------------
+  def __init__(self, index=None, max_workers=None, chunk_size=CHUNK_SIZE):
+
+    MetadataReader.__init__(self, index, max_workers, chunk_size)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts analysing a list of songs, unless NumPy is missing
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of full song paths
+  #
+  # RETURN:
+  #   id of the new analysis, to be passed back in to poll()
+  # ---------------------------------------------------------------------------
+  def start(self, paths):
+
+    if not HAVE_NUMPY:
+      self.cancel()
+      return self.job_id
+
+    return MetadataReader.start(self, paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the gain of a song in dB, or 0.0 if it hasn't been analysed
+  # ---------------------------------------------------------------------------
+  def gain(self, path):
+
+    values = self.cache.get(path)
+
+    if values is None:
+      return 0.0
+
+    return values[GAIN_COLUMN]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads and saves gains instead of tags
+  # ---------------------------------------------------------------------------
+  def _load_cache(self, paths):
+
+    return self.index.load_gains(paths)
+
+  def _save_cache(self, rows):
+
+    self.index.save_gains(rows)
+
+    return
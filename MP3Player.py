@@ -21,14 +21,36 @@
 
 # modules used by this file
 import os
-import random
-import pickle
+import time
+import bisect
 from os.path import join
 import tkinter as TK
 import tkinter.filedialog
 import tkinter.messagebox
 import tkinter.font
-from pygame import mixer
+from LibraryScanner import LibraryScanner
+from LibraryIndex import LibraryIndex
+from SmartShuffle import SmartShuffle, MIN_RATING, MAX_RATING
+from TrackTable import TrackTable
+from TrackMetadata import MetadataReader, DURATION_COLUMN
+from Loudness import LoudnessAnalyzer, gain_factor, HAVE_NUMPY
+from SearchIndex import SearchIndex
+from TrackListView import TrackListView
+from SeekBar import SeekBar
+from Waveform import WaveformReader
+from TrackEvents import TrackEndWatcher
+from SessionSnapshot import SessionSnapshot
+from FolderWatcher import FolderWatcher
+from DuplicateFinder import DuplicateFinder
+from ControlServer import ControlServer
+from PlaybackWorker import playback
+from PlayerState import PlayerState
+from PlayHistory import history
+from PlaybackMetrics import metrics, PROMETHEUS_SUFFIX
+from PlaylistFile import (PlaylistReader, PlaylistError, PLAYLIST_SUFFIX,
+                          is_playlist_file, read_legacy_playlist, write_playlist)
+from PlaylistText import (PlaylistImport, is_text_playlist, write_text_playlist, M3U_SUFFIXES,
+                          PLS_SUFFIX, UNKNOWN_LENGTH)
 
 #---------------------------------------------------
 # Global constants to be used in program
@@ -42,17 +64,40 @@ VOLUME_SCALE = 0.1
 FIRST_SONG = 0
 LIMIT_SET = 1
 MIN_SONGS = 2
-CALLBACK_DELAY = 500
+NO_QUEUE = -1
+START_POSITION = 0
+SCAN_POLL_DELAY = 100
+TAGS_POLL_DELAY = 500
+RESTORE_WORK_DELAY = 1000
+SETTLE_DELAY = 20
 MP3_SUFFIX = '.mp3'
 
+# folder and files where the player keeps its data between runs
+DATA_FOLDER = join(os.path.expanduser('~'), '.mp3player')
+LIBRARY_INDEX_FILE = join(DATA_FOLDER, 'library.db')
+HISTORY_FOLDER = join(DATA_FOLDER, 'history')
+WAVEFORM_FOLDER = join(DATA_FOLDER, 'waveforms')
+
+# socket scripts control the player through, unless MP3PLAYER_CONTROL_SOCKET
+# names another one
+CONTROL_SOCKET = os.environ.get('MP3PLAYER_CONTROL_SOCKET', join(DATA_FOLDER, 'control.sock'))
+
 # dimensions and padding
 FRAME_PAD = 5
 WIDTH = 300
 HEIGHT = 25
+SEARCH_WIDTH = 60
+RESULT_ROWS = 5
+TOP_ROWS = 20
 
-# song column and path/location column constant
-SONG_COLUMN = 1
-PATH_COLUMN = 0
+# most played songs listed
+TOP_SONGS = 100
+
+# kinds of playlist offered when opening and saving one
+OPEN_PLAYLIST_TYPES = [('Playlists', (PLAYLIST_SUFFIX,) + M3U_SUFFIXES + (PLS_SUFFIX,)),
+                       ('All Files', '*')]
+SAVE_PLAYLIST_TYPES = [('Playlist', PLAYLIST_SUFFIX), ('M3U', M3U_SUFFIXES[0]),
+                       ('M3U UTF-8', M3U_SUFFIXES[1]), ('PLS', PLS_SUFFIX)]
 
 # random box constants
 RANDOM = 1
@@ -76,25 +121,82 @@ QUIT_BTN_ICON   = u"\u274C"
 # -----------------------------------------------------------------------------
 def create_gui_window():
 
+  # time start up takes, recorded once the window is ready
+  started = time.perf_counter()
+
   # create main window with title "MP3 Player"
   root = TK.Tk()
-  root.geometry("450x200")
+  root.geometry("500x610")
   root.title("Python MP3 Player")
-  mp3_list = []
+  mp3_list = TrackTable()
+
+  # background scanner used when opening a folder, backed by the library index
+  library_index = LibraryIndex(LIBRARY_INDEX_FILE)
+
+  # list and song of the last session, saved when quitting
+  snapshot = SessionSnapshot(DATA_FOLDER)
+  scanner = LibraryScanner(MP3_SUFFIX, library_index)
+
+  # show songs by artist and title once their tags have been read
+  metadata = MetadataReader(library_index)
+
+  # even out the volume of songs once their loudness has been analysed
+  loudness = LoudnessAnalyzer(library_index)
+
+  # take the copies out of a folder or playlist with songs in it more than once
+  duplicates = DuplicateFinder(library_index)
+
+  # read M3U and PLS playlists in the background, checking their songs are there
+  playlist_import = PlaylistImport()
+
+  # index of the loaded songs for the search box
+  search_index = SearchIndex(root, mp3_list, metadata)
+
+  # column view of the list used to sort and filter it, kept between sorts
+  columns = None
+  if HAVE_NUMPY:
+    from PlaylistColumns import TrackColumns
+    columns = TrackColumns(root, mp3_list, history, metadata)
+
+  # waveforms of the songs for the seek bar, kept on disk once worked out
+  waveforms = WaveformReader(WAVEFORM_FOLDER)
+
+  # shuffle order used when the random box is checked, drawn by the weight of
+  # each song when smart shuffle is on. The weights come from the play history
+  shuffle = SmartShuffle(library_index, history.counts)
 
   # dynamic variables for random box, song index and volume
   random_var         = tkinter.IntVar()
-  song_index         = tkinter.IntVar()
+  song_number        = tkinter.IntVar()
   vol_var            = tkinter.DoubleVar()
 
   # dynamic boolean variables for paused and stopped
   pause_boolean      = tkinter.BooleanVar()
   stop_boolean       = tkinter.BooleanVar()
 
+  # dynamic variables for gapless box, queued song index and last play position
+  gapless_var        = tkinter.BooleanVar()
+  queued_index       = tkinter.IntVar(value=NO_QUEUE)
+  song_position      = tkinter.IntVar(value=START_POSITION)
+
   # dynamic variables for folder path, now playing, and MP3 status
-  display_path       = tkinter.StringVar(value='Select folder to load') 
-  playing_var        = tkinter.StringVar(value='*** NONE ***')
-  player_status_info = tkinter.StringVar(value='STOPPED')
+  folder_text        = tkinter.StringVar(value='Select folder to load') 
+  playing_text       = tkinter.StringVar(value='*** NONE ***')
+  status_text        = tkinter.StringVar(value='STOPPED')
+
+  # what the window shows about the player. Handlers change it through the
+  # state, which updates the window once the main loop is idle, and only with
+  # what has changed. The current song is one of its fields, so whatever
+  # follows it runs once per update however many songs were skipped; it is
+  # handed on even when it is the same, which redraws the list of songs
+  state              = PlayerState(root)
+  song_index         = state.variable('song_index', song_number, repeat=True)
+  display_path       = state.variable('folder', folder_text)
+  playing_var        = state.variable('playing', playing_text)
+  player_status_info = state.variable('status', status_text)
+
+  # dynamic variable for the text typed in the search box
+  search_var         = tkinter.StringVar()
 
   # set initial index, volume, and pause/stop booleans
   song_index.set(FIRST_SONG)
@@ -102,9 +204,13 @@ def create_gui_window():
   pause_boolean.set(False)
   stop_boolean.set(True)
 
-  # initialize mixer and set volume to mid
-  mixer.init()
-  mixer.music.set_volume(MID_VOLUME*VOLUME_SCALE) 
+  # run mixer commands on a background thread and hear back when they are done.
+  # The worker opens the mixer itself while the rest of the window is built
+  playback.start(root, lambda command, error: playback_changed(command, error, pause_play,
+                 player_status_info, pause_boolean, stop_boolean, queued_index))
+
+  # set volume to mid
+  playback.set_volume(MID_VOLUME*VOLUME_SCALE) 
 
   # create bold font type
   bold_font = tkinter.font.Font(family='Helvetica', size='8', weight='bold')
@@ -130,51 +236,131 @@ def create_gui_window():
 
   # create button for opening folder and labels for "now playing" and mp3 status
   folder_button = tkinter.Button(labels_frame, text = 'FOLDER', fg='black', font=bold_font,
-                                 command = lambda: [open_folder(mp3_list, display_path, playing_var), 
-                                 stop_audio(pause_play, player_status_info, pause_boolean, stop_boolean)])
+                                 command = lambda: [open_folder(root, scanner, search_index,
+                                 folder_watcher, duplicates, playlist_import, columns,
+                                 metadata, loudness, mp3_list, song_index, display_path,
+                                 playing_var, queued_index),
+                                 stop_audio(pause_play, player_status_info, pause_boolean, stop_boolean,
+                                 queued_index)])
   playing_label = tkinter.Label(labels_frame, text = 'Now Playing:', font=bold_font)
   status_label  = tkinter.Label(labels_frame, text = 'MP3 Player Status:', font=bold_font)
 
   # create frames for dynamic variables of folder path, now playing, and mp3 status
-  folder_var_frame   = tkinter.Label(folder_name_frame, textvariable=display_path)
-  playing_var_frame  = tkinter.Label(playing_info_frame, textvariable=playing_var)
-  status_var_frame   = tkinter.Label(status_info_frame, textvariable=player_status_info)
-
-  # create random button for deciding if songs will play sequentially of randomly
-  random_button = tkinter.Checkbutton(mp3_control_frame, text="Random ", variable=random_var)
+  folder_var_frame   = tkinter.Label(folder_name_frame, textvariable=folder_text)
+  playing_var_frame  = tkinter.Label(playing_info_frame, textvariable=playing_text)
+  status_var_frame   = tkinter.Label(status_info_frame, textvariable=status_text)
+
+  # create random button for deciding if songs will play sequentially of randomly. changing
+  # it while playing picks the queued song again
+  random_button = tkinter.Checkbutton(mp3_control_frame, text="Random ", variable=random_var,
+                                      command = lambda: requeue_next_song(mp3_list, song_index,
+                                      random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                                      song_position))
+
+  # create gapless button for queueing the next song ahead of time
+  gapless_button = tkinter.Checkbutton(mp3_control_frame, text="Gapless ", variable=gapless_var,
+                                       command = lambda: requeue_next_song(mp3_list, song_index,
+                                       random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                                       song_position))
   
   # create volume control spinbox and label for volume
   volume_control = tkinter.Spinbox(mp3_control_frame, from_=MIN_VOLUME, to=MAX_VOLUME,
                                    width=2, textvariable = vol_var, state='readonly',
-                                   command= lambda: adjust_volume(vol_var))  
+                                   command= lambda: adjust_volume(vol_var, loudness, mp3_list,
+                                                                 song_index))  
   volume_label = tkinter.Label(mp3_control_frame, text = 'Volume  ') 
 
   # create button for going back a song
   last_song = tkinter.Button(mp3_control_frame, text = PREV_BTN_ICON, fg='black',
-                             command = lambda: last_song_func(mp3_list, song_index,
-                             playing_var, random_var, pause_boolean, stop_boolean,
-                             pause_play, player_status_info)) 
+                             command = lambda: last_song_func(metadata, mp3_list, song_index,
+                             playing_var, random_var, shuffle, pause_boolean, stop_boolean,
+                             pause_play, player_status_info, gapless_var, queued_index,
+                             song_position, watcher))
 
   # create button for going forwards a song
   next_song = tkinter.Button(mp3_control_frame, text = NEXT_BTN_ICON, fg='black',
-                             command = lambda: next_song_func(mp3_list, song_index,
-                             playing_var, random_var, pause_boolean, stop_boolean,
-                             pause_play, player_status_info))
+                             command = lambda: next_song_func(metadata, mp3_list, song_index,
+                             playing_var, random_var, shuffle, pause_boolean, stop_boolean,
+                             pause_play, player_status_info, gapless_var, queued_index,
+                             song_position, watcher))
 
-  # create a button for pausing/playing
-  pause_play = tkinter.Button(mp3_control_frame, text = PLAY_BTN_ICON, fg='black',
+  # create a button for pausing/playing, whose icon is set through the state
+  pause_play_button = tkinter.Button(mp3_control_frame, text = PLAY_BTN_ICON, fg='black',
                              command = lambda: pause_play_func(pause_play, player_status_info,
-                                                               pause_boolean, stop_boolean))
+                                                               pause_boolean, stop_boolean, mp3_list,
+                                                               song_index, random_var, shuffle,
+                                                               gapless_var, queued_index,
+                                                               song_position, watcher))
+  pause_play = state.widget('pause_play', pause_play_button)
   
   # create a button for stopping the music
   stop_song = tkinter.Button(mp3_control_frame, text = STOP_BTN_ICON, fg='black',
                              command = lambda: stop_audio(pause_play, player_status_info, 
-                                                          pause_boolean, stop_boolean))
+                                                          pause_boolean, stop_boolean, queued_index))
 
   # create a button for stopping the program
   quit_prog = tkinter.Button(mp3_control_frame, text = QUIT_BTN_ICON, fg='red',
-                             command = root.destroy)                                                                                                                                                  
-  
+                             command = lambda: quit_player(root, snapshot, control, mp3_list,
+                             song_index, display_path, vol_var, random_var, gapless_var,
+                             stop_boolean))
+
+  # closing the window quits the same way
+  root.protocol('WM_DELETE_WINDOW', quit_prog.invoke)
+
+  # create seek bar showing the waveform of the current song and how far into it
+  # the player is; clicking it jumps there
+  seek_frame = tkinter.LabelFrame(root, text="Position", fg="blue",
+                                  padx = FRAME_PAD, pady = FRAME_PAD)
+  seek_bar = SeekBar(seek_frame, playback.position,
+                     lambda position: seek_song(position, mp3_list, song_index, stop_boolean,
+                     queued_index, seek_bar))
+
+  # create search box that shows matching songs as the user types; double
+  # clicking a song or pressing enter on it jumps to it
+  search_frame = tkinter.LabelFrame(root, text="Search", fg="blue",
+                                    padx = FRAME_PAD, pady = FRAME_PAD)
+  search_entry = tkinter.Entry(search_frame, textvariable=search_var, width=SEARCH_WIDTH)
+  results_box  = tkinter.Listbox(search_frame, width=SEARCH_WIDTH, height=RESULT_ROWS)
+  search_entry.bind('<KeyRelease>', lambda event: update_search(search_index, search_var,
+                                                                 results_box, metadata,
+                                                                 mp3_list))
+  pick_result = lambda event: play_search_result(search_index, results_box, metadata, mp3_list,
+                              song_index, playing_var, random_var, shuffle, pause_boolean,
+                              stop_boolean, pause_play, player_status_info, gapless_var,
+                              queued_index, song_position, watcher)
+  results_box.bind('<Double-Button-1>', pick_result)
+  results_box.bind('<Return>', pick_result)
+
+  # create list of every loaded song, only the rows in view are drawn. Double
+  # clicking a song jumps to it
+  tracks_frame = tkinter.LabelFrame(root, text="Songs", fg="blue",
+                                    padx = FRAME_PAD, pady = FRAME_PAD)
+  track_view = TrackListView(tracks_frame, mp3_list, metadata,
+                             lambda index: jump_to_song(index, metadata, mp3_list, song_index,
+                             playing_var, random_var, shuffle, pause_boolean, stop_boolean,
+                             pause_play, player_status_info, gapless_var, queued_index,
+                             song_position, watcher))
+  current_button = tkinter.Button(tracks_frame, text = 'Show Current', fg='black',
+                                  command = track_view.show_current)
+
+  # keep the list in step with the player: follow the current song, and redraw
+  # whenever the folder display (scan progress, new playlist, clearing) or the
+  # now playing display (tags read) changes. The song number only changes
+  # once the state updates the window
+  song_number.trace_add('write', lambda *args: track_view.set_current(song_index.get()))
+
+  # apply the loudness gain of each new song
+  song_number.trace_add('write', lambda *args: adjust_volume(vol_var, loudness, mp3_list,
+                                                             song_index))
+  folder_text.trace_add('write', lambda *args: track_view.refresh())
+
+  # show the waveform of each new song, and follow its position while it plays
+  song_number.trace_add('write', lambda *args: show_waveform(root, waveforms, metadata,
+                                                              mp3_list, song_index, seek_bar))
+  status_text.trace_add('write', lambda *args: follow_status(player_status_info,
+                                                            seek_bar))
+  playing_text.trace_add('write', lambda *args: track_view.refresh())
+
   # pack folder button, "now playing" and mp3 status labels
   mp3_status_frame.pack()
   folder_button.pack(side = 'top')
@@ -198,382 +384,2063 @@ def create_gui_window():
   # pack mp3 control frame
   mp3_control_frame.pack()
   random_button.pack(side = 'left')
+  gapless_button.pack(side = 'left')
   volume_control.pack(side = 'left')
   volume_label.pack(side = 'left')
 
   # pack mp3 controls 
   last_song.pack(side = 'left')
   next_song.pack(side = 'left')
-  pause_play.pack(side = 'left')
+  pause_play_button.pack(side = 'left')
   stop_song.pack(side = 'left')
   quit_prog.pack(side = 'left')
 
-  # create an options/help menu attached to the main window
+  # pack seek bar
+  seek_frame.pack()
+  seek_bar.frame.pack(side = 'top')
+
+  # pack search box and results
+  search_frame.pack()
+  search_entry.pack(side = 'top')
+  results_box.pack(side = 'top')
+
+  # pack list of songs
+  tracks_frame.pack()
+  track_view.frame.pack(side = 'top')
+  current_button.pack(side = 'top')
+
+  # create an options/help menu attached to the main window. The drop-down
+  # items are only added the first time each menu is opened
+  metrics_var = TK.BooleanVar(value=metrics.enabled)
+  cache_var = TK.BooleanVar(value=playback.cache.enabled)
+  smart_var = TK.BooleanVar(value=shuffle.weighted)
   menu = tkinter.Menu(root)
   root.config(menu=menu)
-  options_menu = tkinter.Menu(menu, tearoff=False)
-  help_menu = tkinter.Menu(menu, tearoff=False)
+  options_menu = tkinter.Menu(menu, tearoff=False,
+                              postcommand=lambda: build_options_menu(options_menu, root,
+                              scanner, search_index, folder_watcher, duplicates,
+                              playlist_import, columns, metadata, loudness, mp3_list,
+                              playing_var, display_path, song_index, pause_play,
+                              player_status_info, pause_boolean, stop_boolean, queued_index,
+                              metrics_var, cache_var, random_var, shuffle, gapless_var,
+                              song_position, smart_var))
+  help_menu = tkinter.Menu(menu, tearoff=False,
+                           postcommand=lambda: build_help_menu(help_menu))
 
   # add the options and help drop-down labels to the menu
   menu.add_cascade(label="Options", menu=options_menu)
   menu.add_cascade(label="Help", menu=help_menu)
 
-  # add "Open playlist", "Save playlist", and "Clear playlist" drop down options
-  options_menu.add_command(label="Open Playlist", command=lambda: [open_playlist(
-                           mp3_list, playing_var, display_path, song_index), 
-                           stop_audio(pause_play, player_status_info, pause_boolean,
-                           stop_boolean)])
-  options_menu.add_command(label="Save Playlist", command=lambda: save_playlist(
-                           mp3_list))
-  options_menu.add_command(label="Clear Playlist", command=lambda: clear_playlist(
-                           display_path, playing_var, player_status_info, mp3_list, 
-                           pause_play))
-
-  # add a "help" and "about" info dialogue box within the help drop-down
-  help_menu.add_command(label="Help", command=help_info)
-  help_menu.add_command(label="About", command=about_info)
+  # report the end of each song from mixer events, polling only while playing if
+  # events can't be used. Nothing is set up until the first song plays
+  watcher = TrackEndWatcher(root,
+                            lambda generation: track_ended(metadata, mp3_list, song_index,
+                            playing_var, random_var, shuffle, pause_boolean, stop_boolean,
+                            pause_play, player_status_info, gapless_var, queued_index,
+                            song_position, watcher, generation),
+                            lambda: check_event(metadata, mp3_list, song_index, playing_var,
+                            random_var, shuffle, pause_boolean, stop_boolean, pause_play,
+                            player_status_info, gapless_var, queued_index, song_position,
+                            watcher))
+
+  # add and remove songs as they are copied into or deleted from the loaded folder
+  folder_watcher = FolderWatcher(root,
+                   lambda added, removed: apply_folder_changes(added, removed, root,
+                   search_index, track_view, columns, metadata, loudness, mp3_list, song_index,
+                   playing_var, random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                   song_position),
+                   MP3_SUFFIX)
+
+  # let scripts drive the player through a local socket, applying each burst of
+  # commands in one go. It is opened once start up is out of the way
+  control = ControlServer(root, CONTROL_SOCKET,
+                          lambda batch: apply_remote_commands(batch, root, scanner,
+                          search_index, folder_watcher, duplicates, playlist_import,
+                          columns, metadata, loudness, mp3_list, song_index, display_path,
+                          playing_var, vol_var, pause_boolean, stop_boolean, random_var,
+                          shuffle, pause_play, stop_song, player_status_info, gapless_var,
+                          queued_index, song_position, watcher),
+                          lambda: player_status(mp3_list, song_index, display_path,
+                          playing_var, player_status_info, vol_var, stop_boolean))
+  root.after(RESTORE_WORK_DELAY, control.start)
+
+  # record what is played; the history folds its old log and loads its totals
+  # once start up is out of the way
+  root.after(RESTORE_WORK_DELAY, history.start, HISTORY_FOLDER, library_index)
+
+  # bring back the list and song of the last session without scanning again
+  restore_session(root, snapshot, search_index, folder_watcher, columns, metadata, loudness,
+                  mp3_list, song_index, playing_var, display_path, vol_var, random_var,
+                  gapless_var)
+
+  # record how long start up took once the window is ready
+  root.after_idle(lambda: metrics.observe('startup_ms', (time.perf_counter() - started) * 1000))
 
   # enter the tkinter main loop
-  check_event(root, mp3_list, song_index, playing_var, random_var, pause_boolean, 
-              stop_boolean, pause_play, player_status_info)
 
   root.mainloop()
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function opens a folder of the user's choice and appends the mp3 files
-#   to a list
+#   This function brings back the list, current song and settings of the last
+#   session. The songs are read straight from the snapshot, so even a large
+#   library is back at once; the current song is loaded to carry on from
+#   where it was. Reading tags and watching the folder again wait until the
+#   window is up.
 #
 # INPUT PARAMETERS:
+#   root - the main window
+#   snapshot - snapshot of the last session
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
 #   mp3_list - the list of mp3 files
-#   display_path - the path displayed in the GUI
+#   song_index - index of current song
 #   playing_var - the song displayed in the GUI
+#   display_path - the path displayed in the GUI
+#   vol_var - volume control variable
+#   random_var - variable to tell if random box is checked or not
+#   gapless_var - variable to tell if gapless box is checked or not
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def open_folder(mp3_list, display_path, playing_var):
-
-  # clear list incase it had contents before opening folder
-  mp3_list.clear()
+def restore_session(root, snapshot, search_index, folder_watcher, columns, metadata, loudness,
+                    mp3_list, song_index, playing_var, display_path, vol_var, random_var,
+                    gapless_var):
+
+  # start empty if there is no snapshot
+  state = snapshot.restore(mp3_list)
+  if state is None:
+    return
+
+  try: # snapshot might hold values of the wrong type...
+    index = min(max(int(state['song_index']), FIRST_SONG), len(mp3_list) - LIMIT_SET)
+    position = max(int(state['position_ms']), START_POSITION)
+    volume = min(max(float(state['volume']), MIN_VOLUME), MAX_VOLUME)
+    source = str(state['source'])
+    folder_name = state['folder']
+    random_var.set(RANDOM if state['random'] else NOT_RAND)
+    gapless_var.set(bool(state['gapless']))
+
+  # start empty instead
+  except (KeyError, TypeError, ValueError):
+    mp3_list.clear()
+    return
+
+  # set the volume first, the song index applies it with the song's gain
+  vol_var.set(volume)
+  song_index.set(index)
+  playing_var.set(mp3_list.title(index, metadata))
+  display_path.set(source)
+  playback.load(mp3_list.path(index), position / 1000)
+  search_index.catch_up()
+  if columns is not None:
+    columns.catch_up()
+
+  root.after(RESTORE_WORK_DELAY, finish_restore, root, search_index, folder_watcher,
+             mp3_list.generation, metadata, loudness, mp3_list, song_index, playing_var,
+             folder_name)
 
-  # have user browse directory and choose folder to open. join path together
-  folder_name = tkinter.filedialog.askdirectory()
-  os.path.join(folder_name)
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads the tags of a restored list and starts watching its
+#   folder again, unless another list has been loaded since
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the tag reader
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   generation - generation of the list when it was restored
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   folder_name - folder the list was scanned from, or None for a playlist
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def finish_restore(root, search_index, folder_watcher, generation, metadata, loudness,
+                   mp3_list, song_index, playing_var, folder_name):
 
-  # if file is an MP3, append the path and song name to the mp3 list
-  for file in os.listdir(folder_name):
+  if mp3_list.generation != generation:
+    return
 
-    if file.endswith(MP3_SUFFIX):
-      song_info = [folder_name, file]
-      mp3_list.append(song_info)      
+  read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var)
 
-  # clear list and display error if less than two mp3 files
-  if len(mp3_list) < MIN_SONGS:
-    mp3_list.clear()
-    tkinter.messagebox.showinfo('ERROR', 'Please choose a folder or ' +
-    'playlist with at least two songs in it.')
-  
-  # load first song and display on GUI if there are two or more mp3 files in folder
-  else:
-    display_path.set(folder_name)
-    mixer.music.load(mp3_list[FIRST_SONG][PATH_COLUMN] + "/" + mp3_list[FIRST_SONG][SONG_COLUMN])
-    playing_var.set(mp3_list[FIRST_SONG][SONG_COLUMN])
+  # changes made while the player was closed are found by the watcher's first
+  # look at the folder
+  if folder_name is not None:
+    folder_watcher.start(folder_name, mp3_list)
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function pauses or plays the mixer depending on the variables passed in
+#   This function saves the session and closes the player. Only a list that
+#   has finished loading (a scanned folder or an opened playlist) is saved;
+#   otherwise the next start is empty.
 #
 # INPUT PARAMETERS:
-#   pause_play - button for pausing and playing
-#   player_status_info - status of if mixer is playing, stopped, or paused
-#   pause_boolean - returns true if mixer is paused
-#   stop_boolean - returns true if mixer is stopped
+#   root - the main window
+#   snapshot - snapshot the session is saved to
+#   control - control socket server, closed on the way out
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   display_path - the path displayed in the GUI
+#   vol_var - volume control variable
+#   random_var - variable to tell if random box is checked or not
+#   gapless_var - variable to tell if gapless box is checked or not
+#   stop_boolean - true if mixer is stopped
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def pause_play_func(pause_play, player_status_info, pause_boolean, stop_boolean):
-
-  # local variables. Set stop to False, get pause boolean result 
-  stop_boolean.set(False)
-  pause_bool = pause_boolean.get()
+def quit_player(root, snapshot, control, mp3_list, song_index, display_path, vol_var,
+                random_var, gapless_var, stop_boolean):
 
-  try: # might throw exception
+  # local variables
+  source = display_path.get()
 
-    # if mixer is paused, unpause, set pause bool to false and change icon to pause
-    if pause_bool == True:
-      mixer.music.unpause()
-      pause_boolean.set(False)
-      pause_play['text'] = PAUSE_BTN_ICON
-      player_status_info.set('PLAYING')  
-    
-    # if mixer is playing, pause, set pause bool to true and change icon to play
-    elif mixer.music.get_busy() == True:
-      mixer.music.pause()
-      pause_boolean.set(True)
-      pause_play['text'] = PLAY_BTN_ICON
-      player_status_info.set('PAUSED') 
-    
-    # if neither the above... play mixer, set pause bool to false and change icon to pause
+  # the folder display holds a folder or playlist path once loading is done
+  if len(mp3_list) >= MIN_SONGS and os.path.exists(source):
+    if stop_boolean.get() == True:
+      position = START_POSITION
     else:
-      mixer.music.play() 
-      pause_play['text'] = PAUSE_BTN_ICON 
-      player_status_info.set('PLAYING')
-      pause_boolean.set(False)
+      position = playback.position()
 
-  # print error message if there is not a song loaded in to play
-  except:
-    tkinter.messagebox.showinfo('No song to play', 'Please choose a folder or ' +
-    'playlist with at least two songs in it.')  
+    try:
+      snapshot.save(mp3_list, {'source': source,
+                               'folder': source if os.path.isdir(source) else None,
+                               'song_index': song_index.get(),
+                               'position_ms': position,
+                               'volume': vol_var.get(),
+                               'random': random_var.get() == RANDOM,
+                               'gapless': gapless_var.get()})
+
+    # a session that can't be saved just isn't restored
+    except OSError:
+      pass
+
+  else:
+    snapshot.discard()
+
+  control.stop()
+  history.close()
+  root.destroy()
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function stops audio when called
+#   This function applies a batch of commands from the control socket, the
+#   same way pressing the buttons would. A run of next or prev commands moves
+#   that many songs at once, and only the last song of the run is opened.
 #
 # INPUT PARAMETERS:
+#   batch - the CommandBatch to apply
+#   root - the main window
+#   scanner - background library scanner
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   duplicates - background finder of songs in the list more than once
+#   playlist_import - background reader of M3U and PLS playlists
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   display_path - the path displayed in the GUI
+#   playing_var - the song displayed in the GUI
+#   vol_var - volume control variable
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
 #   pause_play - button for pausing and playing
+#   stop_song - button for stopping the music
 #   player_status_info - status of if mixer is playing, stopped, or paused
-#   pause_boolean - returns true if mixer is paused
-#   stop_boolean - returns true if mixer is stopped
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def stop_audio(pause_play, player_status_info, pause_boolean, stop_boolean):
-  
-  # stop mixer, change pause bool to false, stop bool to true and change icons
-  mixer.music.stop()
-  pause_boolean.set(False)
-  stop_boolean.set(True)
-  player_status_info.set('STOPPED')
-  pause_play['text'] = PLAY_BTN_ICON 
+@metrics.timed
+def apply_remote_commands(batch, root, scanner, search_index, folder_watcher, duplicates,
+                          playlist_import, columns, metadata, loudness, mp3_list, song_index,
+                          display_path, playing_var, vol_var, pause_boolean, stop_boolean,
+                          random_var, shuffle, pause_play, stop_song, player_status_info,
+                          gapless_var, queued_index, song_position, watcher):
+
+  # open a folder or playlist, like the folder button and options menu do
+  if batch.load is not None:
+    if os.path.isdir(batch.load):
+      open_folder(root, scanner, search_index, folder_watcher, duplicates, playlist_import,
+                  columns, metadata, loudness, mp3_list, song_index, display_path, playing_var,
+                  queued_index, batch.load)
+    else:
+      open_playlist(root, scanner, search_index, folder_watcher, duplicates, playlist_import,
+                    columns, metadata, loudness, mp3_list, playing_var, display_path,
+                    song_index, queued_index, batch.load, ask_user=False)
+    stop_audio(pause_play, player_status_info, pause_boolean, stop_boolean, queued_index)
+
+  # work out where the run of steps ends and open only that song; moving on
+  # from a song that is still playing skips it, like the next button does
+  if batch.steps != 0 and len(mp3_list) > EMPTY:
+    if batch.steps > 0 and stop_boolean.get() == False and playback.get_busy() == True:
+      shuffle.rest(mp3_list, song_index.get())
+    jump_to_song(step_index(batch.steps, mp3_list, song_index, random_var, shuffle),
+                 metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                 pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+                 queued_index, song_position, watcher)
+
+  # play and pause only press the play/pause button if it changes something
+  playing = pause_boolean.get() == False and stop_boolean.get() == False
+  if batch.transport == 'stop':
+    stop_song.invoke()
+  elif batch.transport == 'play' and not playing or batch.transport == 'pause' and playing:
+    pause_play.invoke()
+
+  if batch.volume is not None:
+    vol_var.set(batch.volume)
+    adjust_volume(vol_var, loudness, mp3_list, song_index)
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function opens a playlist that has been previously saved on your computer
+#   This function returns the state of the player for the control socket
+#
+# INPUT PARAMETERS:
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   display_path - the path displayed in the GUI
+#   playing_var - the song displayed in the GUI
+#   player_status_info - status of if mixer is playing, stopped, or paused
+#   vol_var - volume control variable
+#   stop_boolean - true if mixer is stopped
+#
+# RETURN:
+#   dictionary of the player's state
+# -----------------------------------------------------------------------------
+def player_status(mp3_list, song_index, display_path, playing_var, player_status_info,
+                  vol_var, stop_boolean):
+
+  if stop_boolean.get() == True:
+    position = START_POSITION
+  else:
+    position = playback.position()
+
+  return {'status': player_status_info.get(),
+          'song': playing_var.get(),
+          'song_index': song_index.get(),
+          'songs': len(mp3_list),
+          'position_ms': position,
+          'volume': vol_var.get(),
+          'source': display_path.get()}
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adds the items of the options menu the first time it is
+#   opened
 #
 # INPUT PARAMETERS:
+#   options_menu - the options drop-down menu
+#   root - the main window
+#   scanner - background library scanner
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   duplicates - background finder of songs in the list more than once
+#   playlist_import - background reader of M3U and PLS playlists
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
 #   mp3_list - the list of mp3 files
 #   playing_var - the song displayed in the GUI
 #   display_path - the path displayed in the GUI
-#   song_index - index of current song being played
+#   song_index - index of current song
+#   pause_play - button for pausing/playing mixer
+#   player_status_info - status of player (playing, paused, stopped)
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   queued_index - index of the song waiting in the mixer queue
+#   metrics_var - variable to tell if metrics are being recorded
+#   cache_var - variable to tell if decoded songs are kept in memory
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   gapless_var - variable to tell if gapless box is checked or not
+#   song_position - last play position read from the mixer, in ms
+#   smart_var - variable to tell if random mode draws songs by weight
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def open_playlist(mp3_list, playing_var, display_path, song_index):
+def build_options_menu(options_menu, root, scanner, search_index, folder_watcher, duplicates,
+                       playlist_import, columns, metadata, loudness, mp3_list, playing_var,
+                       display_path, song_index, pause_play, player_status_info, pause_boolean,
+                       stop_boolean, queued_index, metrics_var, cache_var, random_var, shuffle,
+                       gapless_var, song_position, smart_var):
 
   # local variables
-  playlist_open = ''
-  written_list = []
-
-  # clear mp3 list when opening a new playlist
-  mp3_list.clear()
-
-  # have user browse directory for file to open
-  playlist_name = tkinter.filedialog.askopenfilename()
+  sort_menu = tkinter.Menu(options_menu, tearoff=False)
+  rating_menu = tkinter.Menu(options_menu, tearoff=False)
 
-  try: # code might throw exception...
-  
-    # if file has at least two songs, open for reading and load to list
-    if os.path.getsize(playlist_name) > LIMIT_SET:
-      playlist_open = open(playlist_name, 'rb')
-      written_list = pickle.load(playlist_open)
+  # the items are already there if the menu has been opened before
+  if options_menu.index('end') is not None:
+    return
 
-      # append each item to the mp3 list
-      for item in written_list:
-        mp3_list.append(item)
+  # add "Open playlist", "Save playlist", and "Clear playlist" drop down options
+  options_menu.add_command(label="Open Playlist", command=lambda: [open_playlist(
+                           root, scanner, search_index, folder_watcher, duplicates,
+                           playlist_import, columns, metadata, loudness, mp3_list, playing_var,
+                           display_path, song_index, queued_index),
+                           stop_audio(pause_play, player_status_info, pause_boolean,
+                           stop_boolean, queued_index)])
+  options_menu.add_command(label="Save Playlist", command=lambda: save_playlist(
+                           metadata, mp3_list))
+  options_menu.add_command(label="Clear Playlist", command=lambda: clear_playlist(
+                           scanner, folder_watcher, duplicates, playlist_import, display_path,
+                           playing_var, player_status_info, metadata, loudness, mp3_list,
+                           pause_play))
 
-      # close file
-      playlist_open.close()
+  # add "Merge playlists", a "Sort playlist" drop down and "Only current
+  # folder" options, which rearrange the whole list at once
+  options_menu.add_separator()
+  options_menu.add_command(label="Merge Playlists", command=lambda: merge_playlists(
+                           root, search_index, duplicates, columns, metadata, loudness,
+                           mp3_list, song_index, playing_var, display_path, queued_index))
+  for label, key, descending in (("By Folder", 'folder', False), ("By Name", 'name', False),
+                                 ("By Length", 'duration', False),
+                                 ("By Plays", 'plays', True)):
+    sort_menu.add_command(label=label, command=lambda key=key, descending=descending:
+                          sort_playlist(key, descending, search_index, columns, metadata,
+                          mp3_list, song_index, playing_var, random_var, shuffle, stop_boolean,
+                          gapless_var, queued_index, song_position))
+  options_menu.add_cascade(label="Sort Playlist", menu=sort_menu)
+  options_menu.add_command(label="Only Current Folder", command=lambda: keep_current_folder(
+                           search_index, columns, metadata, mp3_list, song_index, playing_var,
+                           random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                           song_position))
+
+  # add "Most played this month" option, listing songs from the play history
+  options_menu.add_command(label="Most Played This Month", command=lambda: show_top_songs(
+                           root))
+
+  # add "Record metrics" check box and "Export metrics" drop down options
+  options_menu.add_separator()
+  options_menu.add_checkbutton(label="Record Metrics", variable=metrics_var,
+                               command=lambda: setattr(metrics, 'enabled', metrics_var.get()))
+  options_menu.add_command(label="Export Metrics", command=export_metrics)
+
+  # add "Cache decoded songs" check box
+  options_menu.add_separator()
+  options_menu.add_checkbutton(label="Cache Decoded Songs", variable=cache_var,
+                               command=lambda: playback.cache.set_enabled(cache_var.get()))
+
+  # add "Smart shuffle" check box and a "Rate current song" drop down. The
+  # queued song is picked again the new way
+  options_menu.add_separator()
+  options_menu.add_checkbutton(label="Smart Shuffle", variable=smart_var,
+                               command=lambda: [shuffle.set_weighted(smart_var.get()),
+                               requeue_next_song(mp3_list, song_index, random_var, shuffle,
+                               stop_boolean, gapless_var, queued_index, song_position)])
+  for rating in range(MAX_RATING, MIN_RATING - LIMIT_SET, -1):
+    rating_menu.add_command(label=u"\u2605" * rating, command=lambda rating=rating: rate_song(
+                            rating, shuffle, mp3_list, song_index))
+  rating_menu.add_command(label="No Rating", command=lambda: rate_song(None, shuffle,
+                          mp3_list, song_index))
+  options_menu.add_cascade(label="Rate Current Song", menu=rating_menu)
 
-      # set song index to first song, change displays of folder path and song playing
-      song_index.set(FIRST_SONG)
-      playing_var.set(mp3_list[FIRST_SONG][SONG_COLUMN])
-      display_path.set(playlist_name)
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adds the items of the help menu the first time it is opened
+#
+# INPUT PARAMETERS:
+#   help_menu - the help drop-down menu
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def build_help_menu(help_menu):
 
-      # load first song into the mixer
-      mixer.music.load(mp3_list[FIRST_SONG][PATH_COLUMN] + "/" + mp3_list[FIRST_SONG][SONG_COLUMN])
+  # the items are already there if the menu has been opened before
+  if help_menu.index('end') is not None:
+    return
 
-    # if not at least two songs in file, print error message
-    else:
-      tkinter.messagebox.showinfo('Empty Playlist', 'Please choose a playlist with ' +
-      'at least two songs in it.')  
-  
-  # print error message if invalid file
-  except:
-    tkinter.messagebox.showinfo('Invalid File', 'Choose a valid playlist with mp3 files.')
+  # add a "help" and "about" info dialogue box within the help drop-down
+  help_menu.add_command(label="Help", command=help_info)
+  help_menu.add_command(label="About", command=about_info)
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function saves the current playlist when called
+#   This function opens a folder of the user's choice and starts a background
+#   scan that appends the mp3 files in it and all of its sub folders to a list
 #
 # INPUT PARAMETERS:
+#   root - the main window, used to poll the scan
+#   scanner - background library scanner
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   duplicates - background finder of songs in the list more than once
+#   playlist_import - background reader of M3U and PLS playlists
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
 #   mp3_list - the list of mp3 files
+#   song_index - index of current song being played
+#   display_path - the path displayed in the GUI
+#   playing_var - the song displayed in the GUI
+#   queued_index - index of the song waiting in the mixer queue
+#   folder_name - folder to open, or None to let the user browse for one
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def save_playlist(mp3_list):
-
-  # local variables
-  playlist_save = ''
-
-  # if at least two songs, ask user where to save and what to name file
-  if len(mp3_list) > LIMIT_SET:
-    playlist_name = tkinter.filedialog.asksaveasfilename()
-
-    # if filename is NOT empty
-    if len(playlist_name) > EMPTY:
-
-      # open file for writing and dump mp3 filenames into file
-      playlist_save = open(playlist_name, 'wb')
-      pickle.dump(mp3_list, playlist_save)
-
-      # close file
-      playlist_save.close()
-
-    # if name is empty, print error message requiring name
-    else:
-      tkinter.messagebox.showinfo('Name Required', 'Filename required before saving') 
+def open_folder(root, scanner, search_index, folder_watcher, duplicates, playlist_import,
+                columns, metadata, loudness, mp3_list, song_index, display_path, playing_var,
+                queued_index, folder_name=None):
+
+  # have user browse directory and choose folder to open
+  if folder_name is None:
+    folder_name = tkinter.filedialog.askdirectory()
+
+  # keep the current list if the user cancelled the dialog
+  if len(folder_name) == EMPTY:
+    return
+
+  # clear list and current song incase it had contents before opening folder
+  playback.unload()
+  playlist_import.cancel()
+  folder_watcher.stop()
+  metadata.cancel()
+  loudness.cancel()
+  duplicates.cancel()
+  mp3_list.clear()
+  song_index.set(FIRST_SONG)
+  playing_var.set('*** NONE ***')
+  display_path.set('Scanning ' + folder_name)
 
-  # if less than two songs, print error message 
-  else:
-    tkinter.messagebox.showinfo('MP3 Required', 'Please choose a folder with at ' +
-    'least two MP3 files before saving a playlist.')  
+  # scan folder in the background and check on it from the main loop
+  scan_id = scanner.start(folder_name)
+  root.after(SCAN_POLL_DELAY, poll_folder_scan, root, scanner, search_index, folder_watcher,
+             duplicates, columns, scan_id, metadata, loudness, mp3_list, song_index,
+             display_path, playing_var, queued_index)
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function clears the current loaded songs when called
+#   This function adds newly scanned songs to the list, loads the first song
+#   as soon as there are enough of them and shows the scan progress
 #
 # INPUT PARAMETERS:
+#   root - the main window, used to poll the scan
+#   scanner - background library scanner
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   duplicates - background finder of songs in the list more than once
+#   columns - column view of the list for sorting, or None without NumPy
+#   scan_id - id of the scan being polled
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song being played
 #   display_path - the path displayed in the GUI
 #   playing_var - the song displayed in the GUI
-#   player_status_info - status of whether mixer is playing, stopped, or paused
-#   mp3_list - the list of mp3 files
-#   pause_play - button for pausing/playing mixer
+#   queued_index - index of the song waiting in the mixer queue
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def clear_playlist(display_path, playing_var, player_status_info, mp3_list, pause_play):
+def poll_folder_scan(root, scanner, search_index, folder_watcher, duplicates, columns, scan_id,
+                     metadata, loudness, mp3_list, song_index, display_path, playing_var,
+                     queued_index):
+
+  # stop polling if the scan was cancelled or replaced
+  progress = scanner.poll(scan_id)
+  if progress is None:
+    return
+
+  batches, finished = progress
+  songs_before = len(mp3_list)
+
+  # append each batch of [path, song name] entries to the mp3 list and index
+  # the new songs for searching
+  for batch in batches:
+    mp3_list.extend(batch)
+  search_index.catch_up()
+  if columns is not None:
+    columns.catch_up()
+
+  # load first song and display on GUI as soon as there are two or more mp3 files
+  if songs_before < MIN_SONGS <= len(mp3_list):
+    playback.load(mp3_list.path(FIRST_SONG))
+    playing_var.set(mp3_list.title(FIRST_SONG, metadata))
+
+  # show scan progress and check again shortly
+  if not finished:
+    display_path.set('Scanning... ' + str(scanner.songs_found) + ' songs in ' +
+                     str(scanner.folders_scanned) + ' folders')
+    root.after(SCAN_POLL_DELAY, poll_folder_scan, root, scanner, search_index,
+               folder_watcher, duplicates, columns, scan_id, metadata, loudness, mp3_list,
+               song_index, display_path, playing_var, queued_index)
 
-  # unload current song and clear mp3 list of songs. set dynamic variables back to default
-  mixer.music.unload()
-  mp3_list.clear()
-  display_path.set('Select folder to load') 
-  playing_var.set('*** NONE ***')
-  player_status_info.set('STOPPED')
-  pause_play['text'] = PLAY_BTN_ICON
+  # clear list and display error if less than two mp3 files
+  elif len(mp3_list) < MIN_SONGS:
+    mp3_list.clear()
+    display_path.set('Select folder to load')
+    tkinter.messagebox.showinfo('ERROR', 'Please choose a folder or ' +
+    'playlist with at least two songs in it.')
+
+  # display the folder path once the whole folder has been scanned, then read
+  # the tags of the songs, look for copies of songs and watch the folder for
+  # songs added or deleted
+  else:
+    display_path.set(scanner.folder_name)
+    read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var)
+    find_duplicates(root, search_index, duplicates, columns, metadata, mp3_list, song_index,
+                    playing_var, queued_index)
+    folder_watcher.start(scanner.folder_name, mp3_list)
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function goes to the next song when called
+#   This function applies songs copied into or deleted from the loaded folder
+#   to the list. The current song keeps playing: songs removed before it move
+#   its index up, and if it was deleted itself the song before it becomes the
+#   current one, so the next song is still the one that came after it. New
+#   songs go on the end of the list.
 #
 # INPUT PARAMETERS:
+#   added - sorted list of [folder, song name] rows of new songs
+#   removed - set of full paths of deleted songs
+#   root - the main window, used to poll the tag reader
+#   search_index - search index kept up to date with the list
+#   track_view - list of every loaded song
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
 #   mp3_list - the list of mp3 files
 #   song_index - index of current song
 #   playing_var - the song displayed in the GUI
 #   random_var - variable to tell if random box is checked or not
-#   pause_boolean - true if mixer is paused
+#   shuffle - shuffle order used in random mode
 #   stop_boolean - true if mixer is stopped
-#   pause_play - button for pausing/playing mixer
-#   player_status_info - status of player (playing, paused, stopped)
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def next_song_func(mp3_list, song_index, playing_var, random_var, pause_boolean, stop_boolean,
-                   pause_play, player_status_info):
-
-  # check random and stop boolean
-  random_box = random_var.get()
-  stop_bool = stop_boolean.get()
-   
-  # set random number limit to length of mp3 list 
-  random_limit =len(mp3_list)
-
-  try: # might throw exception...
-
-    # if random box is checked, randomly assign index number in range 
-    if random_box == RANDOM:
-      index = random.randint(FIRST_SONG, (random_limit -LIMIT_SET))
+def apply_folder_changes(added, removed, root, search_index, track_view, columns, metadata,
+                         loudness, mp3_list, song_index, playing_var, random_var, shuffle,
+                         stop_boolean, gapless_var, queued_index, song_position):
 
-    # if random box NOT checked, index goes up by one
+  # local variables
+  current = song_index.get()
+  queued = queued_index.get()
+
+  # take out deleted songs and move the current and queued songs with the rest
+  if len(removed) > 0:
+    gone = mp3_list.remove(removed)
+    if columns is not None:
+      columns.follow_removed(gone)
+    before = bisect.bisect_left(gone, current)
+
+    if before < len(gone) and gone[before] == current:
+      current = max(current - before - LIMIT_SET, FIRST_SONG)
     else:
-      index = (song_index.get() + LIMIT_SET) 
-
-      # stops index from being more than list length
-      if index >= len(mp3_list):
-        index -= LIMIT_SET
+      current -= before
 
+    if queued != NO_QUEUE:
+      before = bisect.bisect_left(gone, queued)
+      if before < len(gone) and gone[before] == queued:
+        queued = NO_QUEUE
       else:
-        index = index
+        queued -= before
 
-    # load song based on index calculated
-    mixer.music.load(mp3_list[index][PATH_COLUMN] + "/" + mp3_list[index][SONG_COLUMN])
-
-    # set new song index and change "now playing" dynamic var
-    song_index.set(index)
-    playing_var.set(mp3_list[index][SONG_COLUMN])
+  # new songs go on the end, so no index moves
+  mp3_list.extend(added)
 
-    # if mixer is stopped, play, change play button to pause, and set pause bool to False
-    if stop_bool == False:
+  if current != song_index.get():
+    song_index.set(current)
 
-      mixer.music.play()
-      pause_play['text'] = PAUSE_BTN_ICON
-      player_status_info.set('PLAYING')
-      pause_boolean.set(False)
+  # a deleted song can't stay queued, so pick the next song again
+  if queued != queued_index.get():
+    queued_index.set(queued)
+    if queued == NO_QUEUE:
+      requeue_next_song(mp3_list, song_index, random_var, shuffle, stop_boolean, gapless_var,
+                        queued_index, song_position)
 
-  # print error if exception is thrown    
-  except:
-    tkinter.messagebox.showinfo('MP3 Required', 'Load a playlist or folder of ' +
-    'MP3 files in order to switch song.') 
+  # show the changes, index them for searching and read the new songs' tags
+  track_view.refresh()
+  search_index.catch_up()
+  if columns is not None:
+    columns.catch_up()
+  if len(added) > 0:
+    read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var)
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function goes to the last song when called
+#   This function starts reading the artist, title and length of every song
+#   in the list in the background. Songs read before are answered from the
+#   library index, so only new or changed files are parsed.
 #
 # INPUT PARAMETERS:
+#   root - the main window, used to poll the tag reader
+#   search_index - search index kept up to date with the list
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
 #   mp3_list - the list of mp3 files
-#   song_index - index of current song
+#   song_index - index of current song being played
 #   playing_var - the song displayed in the GUI
-#   random_var - variable to tell if random box is checked or not
-#   pause_boolean - true if mixer is paused
-#   stop_boolean - true if mixer is stopped
-#   pause_play - button for pausing/playing mixer
-#   player_status_info - status of player (playing, paused, stopped)
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def last_song_func(mp3_list, song_index, playing_var, random_var, pause_boolean, stop_boolean,
-                   pause_play, player_status_info):
-
-  # check random and stop boolean
-  random_box = random_var.get()
-  stop_bool = stop_boolean.get() 
+def read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var):
 
-  # set random number limit to length of mp3 list 
-  random_limit =len(mp3_list)
-
-  try: # might throw exception...
+  # the paths are built on the reader's thread, from the list as it is now.
+  # The song lengths are kept in the order the list is in now, for sorting
+  job_id = metadata.start(mp3_list.paths(), mp3_list.generation)
+  root.after(TAGS_POLL_DELAY, poll_song_tags, root, search_index, job_id, metadata, loudness,
+             mp3_list, song_index, playing_var)
 
-    # if random box is checked, randomly assign index number in range 
-    if random_box == RANDOM:
-      index = random.randint(FIRST_SONG, (random_limit -LIMIT_SET))
-    
-    # if random box NOT checked, index goes down by one
-    else:
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function shows the tags of the current song as soon as they have
+#   been read, and keeps checking until every song has been read
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the tag reader
+#   search_index - search index kept up to date with the list
+#   job_id - id of the tag read being polled
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song being played
+#   playing_var - the song displayed in the GUI
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def poll_song_tags(root, search_index, job_id, metadata, loudness, mp3_list, song_index,
+                   playing_var):
+
+  # stop polling if the read was cancelled or replaced
+  finished = metadata.poll(job_id)
+  if finished is None:
+    return
+
+  # update "now playing" with whatever has been read so far
+  if len(mp3_list) > song_index.get():
+    playing_var.set(mp3_list.title(song_index.get(), metadata))
+
+  # once every song has been read, add the tags to the search index and
+  # start working out the loudness of the songs
+  if not finished:
+    root.after(TAGS_POLL_DELAY, poll_song_tags, root, search_index, job_id, metadata, loudness,
+               mp3_list, song_index, playing_var)
+  else:
+    search_index.retag()
+    loudness.start(mp3_list.paths())
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function starts looking for songs that are in the list more than
+#   once in the background
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the duplicate finder
+#   search_index - search index kept up to date with the list
+#   duplicates - background finder of songs in the list more than once
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song being played
+#   playing_var - the song displayed in the GUI
+#   queued_index - index of the song waiting in the mixer queue
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def find_duplicates(root, search_index, duplicates, columns, metadata, mp3_list, song_index,
+                    playing_var, queued_index):
+
+  # the paths are built on the finder's thread, from the list as it is now
+  job_id = duplicates.start(mp3_list.paths())
+  root.after(TAGS_POLL_DELAY, poll_duplicates, root, search_index, duplicates, columns, job_id,
+             mp3_list.generation, metadata, mp3_list, song_index, playing_var, queued_index)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function takes the copies out of the list once they have all been
+#   found. The first of each set of copies stays; a current or queued song
+#   that was a later copy becomes that first one, so playback carries on
+#   untouched.
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the duplicate finder
+#   search_index - search index kept up to date with the list
+#   duplicates - background finder of songs in the list more than once
+#   columns - column view of the list for sorting, or None without NumPy
+#   job_id - id of the search being polled
+#   generation - generation of the list when the search started
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song being played
+#   playing_var - the song displayed in the GUI
+#   queued_index - index of the song waiting in the mixer queue
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def poll_duplicates(root, search_index, duplicates, columns, job_id, generation, metadata,
+                    mp3_list, song_index, playing_var, queued_index):
+
+  # stop polling if the search was cancelled or replaced
+  finished = duplicates.poll(job_id)
+  if finished is None:
+    return
+
+  if not finished:
+    root.after(TAGS_POLL_DELAY, poll_duplicates, root, search_index, duplicates, columns,
+               job_id, generation, metadata, mp3_list, song_index, playing_var, queued_index)
+    return
+
+  # songs taken out meanwhile have moved the indexes the copies were found at
+  copies = duplicates.copies
+  if len(copies) == 0 or mp3_list.generation != generation:
+    return
+
+  current = copies.get(song_index.get(), song_index.get())
+  queued = queued_index.get()
+
+  gone = mp3_list.remove_rows(copies)
+  if columns is not None:
+    columns.follow_removed(gone)
+  current -= bisect.bisect_left(gone, current)
+  if queued != NO_QUEUE:
+    queued = copies.get(queued, queued)
+    queued -= bisect.bisect_left(gone, queued)
+    queued_index.set(queued)
+
+  # showing the current song again redraws the list of songs
+  song_index.set(current)
+  playing_var.set(mp3_list.title(current, metadata))
+  search_index.catch_up()
+  if columns is not None:
+    columns.catch_up()
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function pauses or plays the mixer depending on the variables passed in
+#
+# INPUT PARAMETERS:
+#   pause_play - button for pausing and playing
+#   player_status_info - status of if mixer is playing, stopped, or paused
+#   pause_boolean - returns true if mixer is paused
+#   stop_boolean - returns true if mixer is stopped
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def pause_play_func(pause_play, player_status_info, pause_boolean, stop_boolean, mp3_list,
+                    song_index, random_var, shuffle, gapless_var, queued_index, song_position,
+                    watcher):
+
+  # local variables. Set stop to False, get pause boolean result 
+  stop_boolean.set(False)
+  pause_bool = pause_boolean.get()
+
+  try: # might throw exception
+
+    # if mixer is paused, unpause, set pause bool to false and change icon to pause
+    if pause_bool == True:
+      playback.unpause()
+      history.resumed()
+      pause_boolean.set(False)
+      pause_play['text'] = PAUSE_BTN_ICON
+      player_status_info.set('PLAYING')  
+      watcher.playing()
+    
+    # if mixer is playing, pause, set pause bool to true and change icon to play
+    elif playback.get_busy() == True:
+      playback.pause()
+      history.paused()
+      pause_boolean.set(True)
+      pause_play['text'] = PLAY_BTN_ICON
+      player_status_info.set('PAUSED') 
+    
+    # if neither the above... play mixer, set pause bool to false and change icon to pause
+    else:
+      playback.play() 
+      history.started(mp3_list.path(song_index.get()))
+      pause_play['text'] = PAUSE_BTN_ICON 
+      player_status_info.set('PLAYING')
+      pause_boolean.set(False)
+      queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                      song_position)
+      watcher.playing()
+
+  # print error message if there is not a song loaded in to play
+  except:
+    tkinter.messagebox.showinfo('No song to play', 'Please choose a folder or ' +
+    'playlist with at least two songs in it.')  
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function stops audio when called
+#
+# INPUT PARAMETERS:
+#   pause_play - button for pausing and playing
+#   player_status_info - status of if mixer is playing, stopped, or paused
+#   pause_boolean - returns true if mixer is paused
+#   stop_boolean - returns true if mixer is stopped
+#   queued_index - index of the song waiting in the mixer queue
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def stop_audio(pause_play, player_status_info, pause_boolean, stop_boolean, queued_index):
+  
+  # stop mixer (which also empties its queue), change pause bool to false, stop
+  # bool to true and change icons
+  playback.stop()
+  history.stopped()
+  queued_index.set(NO_QUEUE)
+  pause_boolean.set(False)
+  stop_boolean.set(True)
+  player_status_info.set('STOPPED')
+  pause_play['text'] = PLAY_BTN_ICON 
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is called from the main loop each time the playback worker
+#   has run a load, play, pause, unpause or stop. A song that finished loading
+#   shows as playing, and a command the mixer refused stops the player.
+#
+# INPUT PARAMETERS:
+#   command - the mixer command that was run
+#   error - None if it worked, otherwise the pygame error
+#   pause_play - button for pausing and playing
+#   player_status_info - status of if mixer is playing, stopped, or paused
+#   pause_boolean - returns true if mixer is paused
+#   stop_boolean - returns true if mixer is stopped
+#   queued_index - index of the song waiting in the mixer queue
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def playback_changed(command, error, pause_play, player_status_info, pause_boolean,
+                     stop_boolean, queued_index):
+
+  # the song has been opened and is playing now
+  if error is None:
+    if command == 'play' and player_status_info.get() == 'LOADING':
+      player_status_info.set('PLAYING')
+
+  # a song that can't be moved within just carries on where it was
+  elif command == 'set_pos':
+    tkinter.messagebox.showinfo('Seek Error', 'Could not move within the song: ' +
+    str(error))
+
+  # print error message if the song couldn't be opened or played
+  else:
+    stop_audio(pause_play, player_status_info, pause_boolean, stop_boolean, queued_index)
+    tkinter.messagebox.showinfo('Playback Error', 'The song could not be played: ' +
+    str(error))
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function shows the waveform of the current song on the seek bar. A
+#   song whose waveform hasn't been worked out yet is shown flat meanwhile.
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the waveform reader
+#   waveforms - reader that works out and keeps the waveforms
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   seek_bar - the seek bar
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def show_waveform(root, waveforms, metadata, mp3_list, song_index, seek_bar):
+
+  # local variables
+  index = song_index.get()
+  path = None
+  duration = 0
+
+  if index < len(mp3_list):
+    path = mp3_list.path(index)
+
+  # the index is set again whenever the list is rearranged around the song
+  if path == seek_bar.path:
+    return
+
+  if path is None:
+    seek_bar.show(None, 0, None)
+    return
+
+  values = waveforms.lookup(path)
+  if values is not None:
+    seek_bar.show(path, *values)
+    return
+
+  # until then the length comes from the tags, if they have it
+  tags = metadata.lookup(path)
+  if tags is not None:
+    duration = tags[DURATION_COLUMN]
+  seek_bar.show(path, duration, None)
+
+  job_id = waveforms.start([path])
+  root.after(TAGS_POLL_DELAY, poll_waveform, root, waveforms, job_id, path, seek_bar)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function checks on the waveform being worked out and shows it once
+#   it is done, if its song is still the one on the seek bar
+#
+# INPUT PARAMETERS:
+#   root - the main window
+#   waveforms - reader that works out and keeps the waveforms
+#   job_id - id of the read
+#   path - path of the song
+#   seek_bar - the seek bar
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def poll_waveform(root, waveforms, job_id, path, seek_bar):
+
+  # local variables
+  finished = waveforms.poll(job_id)
+
+  # a newer song has taken its place
+  if finished is None:
+    return
+
+  if finished == False:
+    root.after(TAGS_POLL_DELAY, poll_waveform, root, waveforms, job_id, path, seek_bar)
+    return
+
+  values = waveforms.lookup(path)
+  if values is not None and seek_bar.path == path:
+    duration, peaks = values
+    position = seek_bar.played * duration // seek_bar.width
+    seek_bar.show(path, duration, peaks)
+    seek_bar.set_position(position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function moves the current song to a new position. A stopped song
+#   is loaded to start from there when play is pressed.
+#
+# INPUT PARAMETERS:
+#   position - position to move to, in ms
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   stop_boolean - true if mixer is stopped
+#   queued_index - index of the song waiting in the mixer queue
+#   seek_bar - the seek bar
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def seek_song(position, mp3_list, song_index, stop_boolean, queued_index, seek_bar):
+
+  if len(mp3_list) == EMPTY:
+    return
+
+  if stop_boolean.get() == True:
+    playback.load(mp3_list.path(song_index.get()), position / 1000)
+    queued_index.set(NO_QUEUE)
+  else:
+    playback.seek(position / 1000)
+
+  seek_bar.set_position(position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function has the seek bar follow the position of the player only
+#   while a song is playing, and go back to the start when it is stopped
+#
+# INPUT PARAMETERS:
+#   player_status_info - status of player (loading, playing, paused, stopped)
+#   seek_bar - the seek bar
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def follow_status(player_status_info, seek_bar):
+
+  # local variables
+  status = player_status_info.get()
+
+  seek_bar.set_playing(status == 'PLAYING' or status == 'LOADING')
+
+  if status == 'STOPPED':
+    seek_bar.set_position(START_POSITION)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function opens a playlist that has been previously saved on your
+#   computer. M3U and PLS playlists are read in the background like a folder,
+#   and songs that can't be found are reported once they have all been read.
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the tag reader
+#   scanner - background library scanner
+#   search_index - search index kept up to date with the list
+#   folder_watcher - watcher of the loaded folder
+#   duplicates - background finder of songs in the list more than once
+#   playlist_import - background reader of M3U and PLS playlists
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   playing_var - the song displayed in the GUI
+#   display_path - the path displayed in the GUI
+#   song_index - index of current song being played
+#   queued_index - index of the song waiting in the mixer queue
+#   playlist_name - playlist to open, or None to let the user browse for one
+#   ask_user - false to open the playlist without any dialogs, for the control
+#              socket; an old playlist is then left as it is
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def open_playlist(root, scanner, search_index, folder_watcher, duplicates, playlist_import,
+                  columns, metadata, loudness, mp3_list, playing_var, display_path, song_index,
+                  queued_index, playlist_name=None, ask_user=True):
+
+  # local variables
+  written_list = []
+
+  # stop any folder scan and clear mp3 list when opening a new playlist
+  scanner.cancel()
+  playlist_import.cancel()
+  folder_watcher.stop()
+  metadata.cancel()
+  loudness.cancel()
+  duplicates.cancel()
+  mp3_list.clear()
+
+  # have user browse directory for file to open
+  if playlist_name is None:
+    playlist_name = tkinter.filedialog.askopenfilename(filetypes=OPEN_PLAYLIST_TYPES)
+
+  # read a text playlist a batch of songs at a time, the first ones can be
+  # played while the rest are still being checked
+  if len(playlist_name) > EMPTY and is_text_playlist(playlist_name):
+    import_id = playlist_import.start(playlist_name)
+    song_index.set(FIRST_SONG)
+    playing_var.set('*** NONE ***')
+    display_path.set('Reading ' + playlist_name)
+    root.after(SCAN_POLL_DELAY, poll_playlist_import, root, search_index, duplicates,
+               playlist_import, columns, import_id, metadata, loudness, mp3_list, song_index,
+               display_path, playing_var, queued_index)
+    return
+
+  try: # code might throw exception...
+  
+    # if file has at least two songs, open for reading and load to list
+    if os.path.getsize(playlist_name) > LIMIT_SET:
+
+      # map the playlist file, songs are only read from it as they are needed
+      if is_playlist_file(playlist_name):
+        mp3_list.attach(PlaylistReader(playlist_name))
+
+      # append each [path, song name] item of an old pickled playlist to the
+      # mp3 list and offer to convert the file to the new format
+      else:
+        written_list = read_legacy_playlist(playlist_name)
+        mp3_list.extend(written_list)
+
+        if ask_user and tkinter.messagebox.askyesno('Old Playlist', 'This playlist was ' +
+        'saved by an older version of the player. Convert it to the new playlist format?'):
+          write_playlist(playlist_name, mp3_list)
+
+      # index the songs for searching
+      search_index.catch_up()
+      if columns is not None:
+        columns.catch_up()
+
+      # set song index to first song, change displays of folder path and song playing
+      song_index.set(FIRST_SONG)
+      playing_var.set(mp3_list.title(FIRST_SONG, metadata))
+      display_path.set(playlist_name)
+
+      # load first song into the mixer, then read the tags of the songs and
+      # look for copies of songs
+      playback.load(mp3_list.path(FIRST_SONG))
+      read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var)
+      find_duplicates(root, search_index, duplicates, columns, metadata, mp3_list, song_index,
+                      playing_var, queued_index)
+
+    # if not at least two songs in file, print error message
+    elif ask_user:
+      tkinter.messagebox.showinfo('Empty Playlist', 'Please choose a playlist with ' +
+      'at least two songs in it.')  
+  
+  # print error message if invalid file
+  except:
+    if ask_user:
+      tkinter.messagebox.showinfo('Invalid File', 'Choose a valid playlist with mp3 files.')
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adds the songs read from a text playlist to the list as
+#   they arrive, and once they are all in, reads their tags and reports any
+#   that couldn't be found
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the import
+#   search_index - search index kept up to date with the list
+#   duplicates - background finder of songs in the list more than once
+#   playlist_import - background reader of M3U and PLS playlists
+#   columns - column view of the list for sorting, or None without NumPy
+#   import_id - id of the import
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   display_path - the path displayed in the GUI
+#   playing_var - the song displayed in the GUI
+#   queued_index - index of the song waiting in the mixer queue
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def poll_playlist_import(root, search_index, duplicates, playlist_import, columns, import_id,
+                         metadata, loudness, mp3_list, song_index, display_path, playing_var,
+                         queued_index):
+
+  # local variables
+  importer = playlist_import
+
+  # stop polling if the import was cancelled or replaced
+  progress = importer.poll(import_id)
+  if progress is None:
+    return
+
+  batches, finished = progress
+  songs_before = len(mp3_list)
+
+  for batch in batches:
+    mp3_list.extend(batch)
+  search_index.catch_up()
+  if columns is not None:
+    columns.catch_up()
+
+  # load first song as soon as there are two or more songs
+  if songs_before < MIN_SONGS <= len(mp3_list):
+    playback.load(mp3_list.path(FIRST_SONG))
+    playing_var.set(mp3_list.title(FIRST_SONG, metadata))
+
+  if not finished:
+    display_path.set('Reading... ' + str(importer.songs_found) + ' songs')
+    root.after(SCAN_POLL_DELAY, poll_playlist_import, root, search_index, duplicates,
+               playlist_import, columns, import_id, metadata, loudness, mp3_list, song_index,
+               display_path, playing_var, queued_index)
+    return
+
+  # a playlist needs two songs that are there, like a folder does
+  if len(mp3_list) < MIN_SONGS:
+    mp3_list.clear()
+    playing_var.set('*** NONE ***')
+    display_path.set('Select folder to load')
+  else:
+    display_path.set(importer.playlist_name)
+    read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var)
+    find_duplicates(root, search_index, duplicates, columns, metadata, mp3_list, song_index,
+                    playing_var, queued_index)
+
+  show_playlist_report(root, importer, len(mp3_list))
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function opens a window saying what was left out of a text playlist
+#   and listing the songs that couldn't be found, unless everything was
+#   loaded
+#
+# INPUT PARAMETERS:
+#   root - the main window
+#   importer - the finished PlaylistImport
+#   songs_loaded - number of songs in the list now
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def show_playlist_report(root, importer, songs_loaded):
+
+  # local variables
+  lines = ['Loaded %d of the %d songs in the playlist.' % (songs_loaded, importer.entries_read)]
+
+  if (songs_loaded >= MIN_SONGS and importer.missing_count == EMPTY and
+      importer.skipped == EMPTY and importer.error is None):
+    return
+
+  if songs_loaded < MIN_SONGS:
+    lines.append('Please choose a playlist with at least two songs that can be found.')
+  if importer.error is not None:
+    lines.append('The rest of the playlist ' + str(importer.error) + '.')
+  if importer.skipped > EMPTY:
+    lines.append('%d entries are not files, such as web streams, and were left out.' %
+                 importer.skipped)
+  if importer.missing_count > len(importer.missing):
+    lines.append('%d songs could not be found, the first %d are listed below.' %
+                 (importer.missing_count, len(importer.missing)))
+  elif importer.missing_count > EMPTY:
+    lines.append('%d songs could not be found:' % importer.missing_count)
+
+  report_window = tkinter.Toplevel(root)
+  report_window.title('Playlist Report')
+  report_label = tkinter.Label(report_window, text='\n'.join(lines), justify='left')
+  report_label.pack(side = 'top', anchor = 'w')
+
+  if len(importer.missing) > EMPTY:
+    missing_frame = tkinter.Frame(report_window)
+    missing_box = tkinter.Listbox(missing_frame, width=SEARCH_WIDTH, height=TOP_ROWS)
+    missing_scroll = tkinter.Scrollbar(missing_frame, command=missing_box.yview)
+    missing_box.config(yscrollcommand=missing_scroll.set)
+    missing_box.insert('end', *importer.missing)
+    missing_box.pack(side = 'left')
+    missing_scroll.pack(side = 'left', fill = 'y')
+    missing_frame.pack(side = 'top')
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function saves the current playlist when called
+#
+# INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def save_playlist(metadata, mp3_list):
+
+  # if at least two songs, ask user where to save and what to name file
+  if len(mp3_list) > LIMIT_SET:
+    playlist_name = tkinter.filedialog.asksaveasfilename(defaultextension=PLAYLIST_SUFFIX,
+                                                         filetypes=SAVE_PLAYLIST_TYPES)
+
+    # if filename is NOT empty
+    if len(playlist_name) > EMPTY:
+
+      # write mp3 folders and filenames into the playlist file, or the path,
+      # length and title of each song for other players
+      try:
+        if is_text_playlist(playlist_name):
+          write_text_playlist(playlist_name, describe_songs(metadata, mp3_list))
+        else:
+          write_playlist(playlist_name, mp3_list)
+
+      # print error message if the file can't be written
+      except OSError:
+        tkinter.messagebox.showinfo('Save Failed', 'The playlist could not be saved ' +
+        'to ' + playlist_name + '.')
+
+    # if name is empty, print error message requiring name
+    else:
+      tkinter.messagebox.showinfo('Name Required', 'Filename required before saving') 
+
+  # if less than two songs, print error message 
+  else:
+    tkinter.messagebox.showinfo('MP3 Required', 'Please choose a folder with at ' +
+    'least two MP3 files before saving a playlist.')  
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function goes through the list one song at a time for saving as a
+#   text playlist
+#
+# INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#
+# RETURN:
+#   generator of (full path, length in seconds or UNKNOWN_LENGTH, title)
+# -----------------------------------------------------------------------------
+def describe_songs(metadata, mp3_list):
+
+  for index, path in enumerate(mp3_list.paths()):
+    tags = metadata.lookup(path)
+    length = UNKNOWN_LENGTH
+
+    if tags is not None and tags[DURATION_COLUMN] > 0:
+      length = tags[DURATION_COLUMN] // 1000
+
+    yield path, length, mp3_list.title(index, metadata)
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function writes the recorded playback metrics to a file when called,
+#   in the Prometheus text format if its name ends in .prom and as JSON
+#   otherwise
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def export_metrics():
+
+  # ask user where to save the metrics
+  file_name = tkinter.filedialog.asksaveasfilename(defaultextension='.json',
+                                                   filetypes=[('JSON', '.json'),
+                                                   ('Prometheus', PROMETHEUS_SUFFIX)])
+
+  if len(file_name) > EMPTY:
+    try:
+      metrics.export(file_name)
+
+    # print error message if the file can't be written
+    except OSError:
+      tkinter.messagebox.showinfo('Export Failed', 'The metrics could not be saved ' +
+      'to ' + file_name + '.')
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function clears the current loaded songs when called
+#
+# INPUT PARAMETERS:
+#   scanner - background library scanner
+#   folder_watcher - watcher of the loaded folder
+#   duplicates - background finder of songs in the list more than once
+#   playlist_import - background reader of M3U and PLS playlists
+#   display_path - the path displayed in the GUI
+#   playing_var - the song displayed in the GUI
+#   player_status_info - status of whether mixer is playing, stopped, or paused
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   pause_play - button for pausing/playing mixer
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def clear_playlist(scanner, folder_watcher, duplicates, playlist_import, display_path,
+                   playing_var, player_status_info, metadata, loudness, mp3_list, pause_play):
+
+  # stop any folder scan, unload current song and clear mp3 list of songs. set
+  # dynamic variables back to default
+  scanner.cancel()
+  playlist_import.cancel()
+  folder_watcher.stop()
+  metadata.cancel()
+  loudness.cancel()
+  duplicates.cancel()
+  playback.unload()
+  history.stopped()
+  mp3_list.clear()
+  display_path.set('Select folder to load') 
+  playing_var.set('*** NONE ***')
+  player_status_info.set('STOPPED')
+  pause_play['text'] = PLAY_BTN_ICON
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function brings the column view of the list up to date and returns
+#   it. Sorting and filtering need NumPy; without it the user is told so and
+#   None is returned.
+#
+# INPUT PARAMETERS:
+#   columns - column view of the list for sorting, or None without NumPy
+#
+# RETURN:
+#   TrackColumns of the list, or None
+# -----------------------------------------------------------------------------
+def playlist_columns(columns):
+
+  if columns is None:
+    tkinter.messagebox.showinfo('NumPy Required', 'Sorting and filtering the playlist ' +
+    'need NumPy to be installed.')
+    return None
+
+  # songs are taken in while the player is idle; only those it hasn't got
+  # to yet are taken in now
+  columns.finish()
+
+  return columns
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function sorts the whole list by one key, keeping the current song
+#   playing
+#
+# INPUT PARAMETERS:
+#   key - 'folder', 'name', 'duration' or 'plays'
+#   descending - True to sort from the largest value down
+#   search_index - search index kept up to date with the list
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   stop_boolean - true if mixer is stopped
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def sort_playlist(key, descending, search_index, columns, metadata, mp3_list, song_index,
+                  playing_var, random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                  song_position):
+
+  if len(mp3_list) < MIN_SONGS:
+    return
+
+  columns = playlist_columns(columns)
+  if columns is None:
+    return
+
+  from PlaylistColumns import sort_rows
+
+  new_index = sort_rows(columns, [(key, descending)])
+  follow_new_order(new_index, search_index, metadata, mp3_list, song_index, playing_var,
+                   random_var, shuffle, stop_boolean, gapless_var, queued_index, song_position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function keeps only the songs in the folder of the current song and
+#   its sub folders
+#
+# INPUT PARAMETERS:
+#   search_index - search index kept up to date with the list
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   stop_boolean - true if mixer is stopped
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def keep_current_folder(search_index, columns, metadata, mp3_list, song_index, playing_var,
+                        random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                        song_position):
+
+  if len(mp3_list) < MIN_SONGS:
+    return
+
+  columns = playlist_columns(columns)
+  if columns is None:
+    return
+
+  from PlaylistColumns import keep_rows
+
+  new_index = keep_rows(columns, columns.in_folder(mp3_list.folder(song_index.get())))
+  follow_new_order(new_index, search_index, metadata, mp3_list, song_index, playing_var,
+                   random_var, shuffle, stop_boolean, gapless_var, queued_index, song_position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function moves the current and queued songs to where a sort or
+#   filter has put them, then picks the next song again since the one after
+#   the current song may be a different one now
+#
+# INPUT PARAMETERS:
+#   new_index - array of the new index of every old song, -1 for songs taken
+#               out
+#   search_index - search index kept up to date with the list
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   stop_boolean - true if mixer is stopped
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def follow_new_order(new_index, search_index, metadata, mp3_list, song_index, playing_var,
+                     random_var, shuffle, stop_boolean, gapless_var, queued_index,
+                     song_position):
+
+  # local variables
+  queued = queued_index.get()
+
+  if queued != NO_QUEUE:
+    queued_index.set(int(new_index[queued]))
+
+  # showing the current song again redraws the list of songs
+  song_index.set(int(new_index[song_index.get()]))
+  playing_var.set(mp3_list.title(song_index.get(), metadata))
+  search_index.catch_up()
+
+  requeue_next_song(mp3_list, song_index, random_var, shuffle, stop_boolean, gapless_var,
+                    queued_index, song_position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function opens a window listing the songs played most this month,
+#   from the play history
+#
+# INPUT PARAMETERS:
+#   root - the main window
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def show_top_songs(root):
+
+  # local variables
+  top_songs = history.top_songs(limit=TOP_SONGS)
+
+  if len(top_songs) == EMPTY:
+    tkinter.messagebox.showinfo('Most Played', 'No song has been played to its end ' +
+    'this month.')
+    return
+
+  top_window = tkinter.Toplevel(root)
+  top_window.title('Most Played This Month')
+  top_box = tkinter.Listbox(top_window, width=SEARCH_WIDTH, height=TOP_ROWS)
+  top_scroll = tkinter.Scrollbar(top_window, command=top_box.yview)
+  top_box.config(yscrollcommand=top_scroll.set)
+
+  for path, plays in top_songs:
+    top_box.insert('end', '%4d  %s' % (plays, os.path.basename(path)))
+
+  top_box.pack(side = 'left')
+  top_scroll.pack(side = 'left', fill = 'y')
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adds the songs of one or more saved playlists to the end of
+#   the list. Each playlist is added as whole columns rather than song by
+#   song, then the new songs have their tags read and copies taken out.
+#
+# INPUT PARAMETERS:
+#   root - the main window, used to poll the tag reader
+#   search_index - search index kept up to date with the list
+#   duplicates - background finder of songs in the list more than once
+#   columns - column view of the list for sorting, or None without NumPy
+#   metadata - tag reader, songs are shown by artist and title once read
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   display_path - the path displayed in the GUI
+#   queued_index - index of the song waiting in the mixer queue
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def merge_playlists(root, search_index, duplicates, columns, metadata, loudness, mp3_list,
+                    song_index, playing_var, display_path, queued_index):
+
+  # local variables
+  songs_before = len(mp3_list)
+
+  if not HAVE_NUMPY:
+    tkinter.messagebox.showinfo('NumPy Required', 'Merging playlists needs NumPy to be ' +
+    'installed.')
+    return
+
+  from PlaylistColumns import merge
+
+  # have user browse for the playlists to add
+  playlist_names = tkinter.filedialog.askopenfilenames(filetypes=[('Playlist',
+                                                                   PLAYLIST_SUFFIX)])
+  if len(playlist_names) == EMPTY:
+    return
+
+  # the playlists before a bad one stay added
+  try:
+    merge(mp3_list, playlist_names)
+  except (OSError, PlaylistError):
+    tkinter.messagebox.showinfo('Invalid File', 'Choose playlists saved by this version ' +
+    'of the player.')
+
+  if len(mp3_list) == songs_before:
+    return
+
+  # an empty list starts at the first merged song
+  if songs_before == EMPTY:
+    song_index.set(FIRST_SONG)
+    display_path.set(playlist_names[0])
+    playback.load(mp3_list.path(FIRST_SONG))
+
+  # showing the current song again redraws the list of songs
+  playing_var.set(mp3_list.title(song_index.get(), metadata))
+  search_index.catch_up()
+  if columns is not None:
+    columns.catch_up()
+  read_song_tags(root, search_index, metadata, loudness, mp3_list, song_index, playing_var)
+  find_duplicates(root, search_index, duplicates, columns, metadata, mp3_list, song_index,
+                  playing_var, queued_index)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function rates the current song, which changes how often smart
+#   shuffle picks it
+#
+# INPUT PARAMETERS:
+#   rating - 1 to 5 stars, or None to take the rating away
+#   shuffle - shuffle order used in random mode
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def rate_song(rating, shuffle, mp3_list, song_index):
+
+  if len(mp3_list) > EMPTY:
+    shuffle.rate(mp3_list, song_index.get(), rating)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out which song comes after the current one, without
+#   moving to it
+#
+# INPUT PARAMETERS:
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#
+# RETURN:
+#   index of the next song
+# -----------------------------------------------------------------------------
+def choose_next_index(mp3_list, song_index, random_var, shuffle):
+
+  # if random box is checked, the shuffle order decides (without moving on yet)
+  if random_var.get() == RANDOM:
+    shuffle.sync(mp3_list, song_index.get())
+    index = shuffle.peek_next()
+
+  # if random box NOT checked, index goes up by one
+  else:
+    index = (song_index.get() + LIMIT_SET)
+
+    # stops index from being more than list length
+    if index >= len(mp3_list):
+      index -= LIMIT_SET
+
+  return index
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out which song is a number of songs away from the
+#   current one, the same way pressing next or prev that many times would. In
+#   random mode the shuffle order is moved along with it
+#
+# INPUT PARAMETERS:
+#   steps - songs to move, forwards if positive and backwards if negative
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#
+# RETURN:
+#   index of the song the steps end on
+# -----------------------------------------------------------------------------
+def step_index(steps, mp3_list, song_index, random_var, shuffle):
+
+  # local variables
+  index = song_index.get()
+
+  # if random box is checked, walk the shuffle order; going back past the
+  # first song played stays on it
+  if random_var.get() == RANDOM:
+    shuffle.sync(mp3_list, index)
+    for step in range(abs(steps)):
+      if steps > 0:
+        index = shuffle.next()
+      else:
+        previous = shuffle.previous()
+        if previous is not None:
+          index = previous
+
+  # if random box NOT checked, move along the list without leaving it
+  else:
+    index = min(max(index + steps, FIRST_SONG), len(mp3_list) - LIMIT_SET)
+
+  return index
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function picks the next song ahead of time and has it decoded if the
+#   sound cache is on. In gapless mode it is also handed to the mixer queue,
+#   so the mixer moves on to it with no gap when the current song ends
+#
+# INPUT PARAMETERS:
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                    song_position):
+
+  if len(mp3_list) < MIN_SONGS:
+    return
+
+  # have the next song decoded ahead of time if the sound cache is on
+  index = choose_next_index(mp3_list, song_index, random_var, shuffle)
+  playback.prefetch(mp3_list.path(index))
+
+  # only queue when gapless mode is on
+  if gapless_var.get() == True:
+
+    # queueing again replaces the song that was queued before
+    playback.queue(mp3_list.path(index))
+    queued_index.set(index)
+    song_position.set(START_POSITION)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function picks the queued song again after the random or gapless box
+#   has been changed, as long as a song is playing
+#
+# INPUT PARAMETERS:
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   stop_boolean - true if mixer is stopped
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def requeue_next_song(mp3_list, song_index, random_var, shuffle, stop_boolean, gapless_var,
+                      queued_index,
+                      song_position):
+
+  # a song already in the mixer queue can't be taken back out without stopping the
+  # current one, so turning gapless off takes effect after the queued song starts
+  if stop_boolean.get() == False:
+    queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                    song_position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function updates the GUI after the mixer has moved on to the queued
+#   song by itself, then queues up the song after that
+#
+# INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def start_queued_song(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                      gapless_var, queued_index, song_position):
+
+  # the mixer moved on to the queued song by itself, without any gap
+  metrics.observe('transition_gap_ms', 0.0)
+
+  # the song before it played to its end
+  history.finished()
+  shuffle.rest(mp3_list, song_index.get())
+
+  # the queued song is now the current song, step the shuffle order along with it
+  playback.queued_started()
+  index = queued_index.get()
+  queued_index.set(NO_QUEUE)
+  if random_var.get() == RANDOM:
+    shuffle.next()
+  song_index.set(index)
+  playing_var.set(mp3_list.title(index, metadata))
+  history.started(mp3_list.path(index))
+
+  # line up the one after it
+  queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                  song_position)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function goes to the next song when called
+#
+# INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   pause_play - button for pausing/playing mixer
+#   player_status_info - status of player (playing, paused, stopped)
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def next_song_func(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                   pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+                   queued_index, song_position, watcher):
+
+  # check stop boolean
+  stop_bool = stop_boolean.get()
+
+  try: # might throw exception...
+
+    # moving on from a song that is still playing skips it; the history
+    # counts the skip once the next song starts
+    if stop_bool == False and playback.get_busy() == True:
+      shuffle.rest(mp3_list, song_index.get())
+
+    # pick the next song (the same one already picked for the mixer queue) and
+    # in random mode step the shuffle order forward to it
+    index = choose_next_index(mp3_list, song_index, random_var, shuffle)
+    if random_var.get() == RANDOM:
+      shuffle.next()
+
+    # load song based on index calculated, this also empties the mixer queue
+    playback.load(mp3_list.path(index))
+    queued_index.set(NO_QUEUE)
+
+    # set new song index and change "now playing" dynamic var
+    song_index.set(index)
+    playing_var.set(mp3_list.title(index, metadata))
+
+    # if mixer is stopped, play, change play button to pause, and set pause bool to False
+    if stop_bool == False:
+
+      playback.play()
+      history.started(mp3_list.path(index))
+      pause_play['text'] = PAUSE_BTN_ICON
+      player_status_info.set('LOADING')
+      pause_boolean.set(False)
+      queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                      song_position)
+      watcher.playing()
+
+  # print error if exception is thrown    
+  except:
+    tkinter.messagebox.showinfo('MP3 Required', 'Load a playlist or folder of ' +
+    'MP3 files in order to switch song.') 
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function goes to the last song when called
+#
+# INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   pause_play - button for pausing/playing mixer
+#   player_status_info - status of player (playing, paused, stopped)
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def last_song_func(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                   pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+                   queued_index, song_position, watcher):
+
+  # check random and stop boolean
+  random_box = random_var.get()
+  stop_bool = stop_boolean.get() 
+
+  try: # might throw exception...
+
+    # if random box is checked, go back to the song played before this one, or
+    # start this one again if nothing was played before it
+    if random_box == RANDOM:
+      shuffle.sync(mp3_list, song_index.get())
+      index = shuffle.previous()
+      if index is None:
+        index = song_index.get()
+    
+    # if random box NOT checked, index goes down by one
+    else:
       index = (song_index.get() - LIMIT_SET) 
 
       # stops index from being less than list length
@@ -583,20 +2450,25 @@ def last_song_func(mp3_list, song_index, playing_var, random_var, pause_boolean,
       else:
         index = index
 
-    # load song based on index calculated
-    mixer.music.load(mp3_list[index][PATH_COLUMN] + "/" + mp3_list[index][SONG_COLUMN])
+    # load song based on index calculated, this also empties the mixer queue
+    playback.load(mp3_list.path(index))
+    queued_index.set(NO_QUEUE)
 
     # set new song index and change "now playing" dynamic var
     song_index.set(index)
-    playing_var.set(mp3_list[index][SONG_COLUMN])
+    playing_var.set(mp3_list.title(index, metadata))
 
     # if mixer is stopped, play, change play button to pause, and set pause bool to False
     if stop_bool == False:
 
-      mixer.music.play()
+      playback.play()
+      history.started(mp3_list.path(index))
       pause_play['text'] = PAUSE_BTN_ICON
-      player_status_info.set('PLAYING')
+      player_status_info.set('LOADING')
       pause_boolean.set(False)
+      queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                      song_position)
+      watcher.playing()
 
   # print error if exception is thrown 
   except: 
@@ -606,42 +2478,241 @@ def last_song_func(mp3_list, song_index, playing_var, random_var, pause_boolean,
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function adjusts volume when called
+#   This function shows the songs matching the text in the search box
+#
+# INPUT PARAMETERS:
+#   search_index - search index of the loaded songs
+#   search_var - text typed in the search box
+#   results_box - list box the matching songs are shown in
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def update_search(search_index, search_var, results_box, metadata, mp3_list):
+
+  # replace the old results with the new ones
+  results_box.delete(0, 'end')
+  for index in search_index.search(search_var.get()):
+    results_box.insert('end', mp3_list.title(index, metadata))
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function jumps to the search result picked by the user
+#
+# INPUT PARAMETERS:
+#   search_index - search index of the loaded songs
+#   results_box - list box the matching songs are shown in
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   pause_play - button for pausing/playing mixer
+#   player_status_info - status of whether mixer is playing, stopped, or paused
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def play_search_result(search_index, results_box, metadata, mp3_list, song_index, playing_var,
+                       random_var, shuffle, pause_boolean, stop_boolean, pause_play,
+                       player_status_info, gapless_var, queued_index, song_position, watcher):
+
+  # local variables
+  selection = results_box.curselection()
+
+  # nothing picked, or the results are from a list that has been replaced
+  if len(selection) == EMPTY:
+    return
+  index = search_index.result(selection[0])
+  if index is None:
+    return
+
+  jump_to_song(index, metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+               pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+               queued_index, song_position, watcher)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function loads the song picked by the user from the search results
+#   or the track list, playing it right away unless the player is stopped
+#
+# INPUT PARAMETERS:
+#   index - index of the song to jump to
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   pause_play - button for pausing/playing mixer
+#   player_status_info - status of whether mixer is playing, stopped, or paused
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+@metrics.timed
+def jump_to_song(index, metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                 pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+                 queued_index, song_position, watcher):
+
+  # load the song, this also empties the mixer queue
+  playback.load(mp3_list.path(index))
+  queued_index.set(NO_QUEUE)
+
+  # set new song index and change "now playing" dynamic var
+  song_index.set(index)
+  playing_var.set(mp3_list.title(index, metadata))
+
+  # if mixer isn't stopped, play, change play button to pause, and set pause bool to False
+  if stop_boolean.get() == False:
+    playback.play()
+    history.started(mp3_list.path(index))
+    pause_play['text'] = PAUSE_BTN_ICON
+    player_status_info.set('LOADING')
+    pause_boolean.set(False)
+    queue_next_song(mp3_list, song_index, random_var, shuffle, gapless_var, queued_index,
+                    song_position)
+    watcher.playing()
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adjusts volume when called. It is also called on every
+#   change of song, to apply the loudness gain of the new song.
 #
 # INPUT PARAMETERS:
 #   vol_var - dynamic variable of volume setting
+#   loudness - loudness analyzer giving the gain of each song
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
 # RETURN:
 #   none
 #
 # -----------------------------------------------------------------------------
-def adjust_volume(vol_var):
+def adjust_volume(vol_var, loudness, mp3_list, song_index):
   
   # retrieve current volume
-  volume = vol_var.get()
+  volume = vol_var.get()*VOLUME_SCALE
+
+  # turn the song up or down by its gain, if it has been analysed
+  if song_index.get() < len(mp3_list):
+    volume = volume*gain_factor(loudness.gain(mp3_list.path(song_index.get())))
 
   # set volume to number multiplied by vol scale (range is 0.0-1.0)
-  mixer.music.set_volume(volume*VOLUME_SCALE)
+  playback.set_volume(min(volume, MAX_VOLUME*VOLUME_SCALE))
 
   return
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function checks whether a song has ended or not
+#   This function is called from the main loop when the mixer reports that a
+#   song has ended. If the mixer already moved on to the queued song the GUI
+#   is updated to match, otherwise the next song is started. While commands
+#   are still waiting to run the mixer's state can't be trusted, so it looks
+#   again once they have, and a report from before a newer load is dropped.
 #
 # INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
 #   mp3_list - the list of mp3 files
 #   song_index - index of current song
 #   playing_var - the song displayed in the GUI
 #   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
 #   pause_boolean - true if mixer is paused
 #   stop_boolean - true if mixer is stopped
 #   pause_play - button for pausing/playing mixer
 #   player_status_info - status of player (playing, paused, stopped)
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#   generation - load generation of the playback worker when the song ended
 #
 # RETURN:
 #   none
 # -----------------------------------------------------------------------------
-def check_event(root, mp3_list, song_index, playing_var, random_var, pause_boolean, stop_boolean,
-                pause_play, player_status_info):
+@metrics.timed
+def track_ended(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+                queued_index, song_position, watcher, generation):
+
+  # the song that ended has been replaced since
+  if generation != playback.load_generation():
+    return
+
+  if not playback.settled():
+    watcher.root.after(SETTLE_DELAY, track_ended, metadata, mp3_list, song_index, playing_var,
+                       random_var, shuffle, pause_boolean, stop_boolean, pause_play,
+                       player_status_info, gapless_var, queued_index, song_position, watcher,
+                       generation)
+    return
+
+  # stopping the mixer also reports the end of a song, so only act while playing
+  if len(mp3_list) > EMPTY:
+    if (stop_boolean.get() == False and pause_boolean.get() == False):
+
+      # mixer is still busy, so it has moved on to the queued song by itself
+      if queued_index.get() != NO_QUEUE and playback.get_busy() == True:
+        start_queued_song(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                          gapless_var, queued_index, song_position)
+
+      # otherwise nothing is playing any more, so start next song
+      elif playback.get_busy() == False:
+        metrics.mark('track_end')
+        history.finished()
+        shuffle.rest(mp3_list, song_index.get())
+        next_song_func(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                       pause_boolean, stop_boolean,
+                       pause_play, player_status_info, gapless_var, queued_index, song_position,
+                       watcher)
+
+  return
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function checks whether a song has ended or not. It is only used
+#   when the mixer can't report the end of a song itself, and only while a
+#   song is playing.
+#
+# INPUT PARAMETERS:
+#   metadata - tag reader, songs are shown by artist and title once read
+#   mp3_list - the list of mp3 files
+#   song_index - index of current song
+#   playing_var - the song displayed in the GUI
+#   random_var - variable to tell if random box is checked or not
+#   shuffle - shuffle order used in random mode
+#   pause_boolean - true if mixer is paused
+#   stop_boolean - true if mixer is stopped
+#   pause_play - button for pausing/playing mixer
+#   player_status_info - status of player (playing, paused, stopped)
+#   gapless_var - variable to tell if gapless box is checked or not
+#   queued_index - index of the song waiting in the mixer queue
+#   song_position - last play position read from the mixer, in ms
+#   watcher - watcher that reports the end of each song
+#
+# RETURN:
+#   True if a song is still playing and it should check again
+# -----------------------------------------------------------------------------
+@metrics.timed
+def check_event(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                pause_boolean, stop_boolean, pause_play, player_status_info, gapless_var,
+                queued_index, song_position, watcher):
 
   # local boolean variables
   stop_bool = stop_boolean.get()
@@ -651,16 +2722,35 @@ def check_event(root, mp3_list, song_index, playing_var, random_var, pause_boole
   # playing, start next song
   if len(mp3_list) > EMPTY:
     if (stop_bool == False and pause_bool == False):
-      if mixer.music.get_busy() == False:
+      if playback.get_busy() == False:
 
-        next_song_func(mp3_list, song_index, playing_var, random_var, pause_boolean, stop_boolean,
-                       pause_play, player_status_info)
+        # the song ended some time since the last check that found it playing
+        metrics.mark('track_end', metrics.marked('song_busy'))
+        history.finished()
+        shuffle.rest(mp3_list, song_index.get())
+        next_song_func(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                       pause_boolean, stop_boolean,
+                       pause_play, player_status_info, gapless_var, queued_index, song_position,
+                       watcher)
 
-  # check again in 500 ms
-  root.after(CALLBACK_DELAY, check_event, root, mp3_list, song_index, playing_var, random_var, pause_boolean, 
-              stop_boolean, pause_play, player_status_info)
+      else:
 
-  return
+        # remember the last time the song was still playing
+        metrics.mark('song_busy')
+
+        # the mixer restarts its play position when it moves on to the queued song
+        if queued_index.get() != NO_QUEUE:
+          position = playback.get_pos()
+
+          if position < song_position.get():
+            start_queued_song(metadata, mp3_list, song_index, playing_var, random_var, shuffle,
+                              gapless_var, queued_index, song_position)
+
+          song_position.set(position)
+
+  # check again only while a song is playing
+  return (len(mp3_list) > EMPTY and stop_boolean.get() == False and
+          pause_boolean.get() == False)
     
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -671,15 +2761,29 @@ def check_event(root, mp3_list, song_index, playing_var, random_var, pause_boole
 # -----------------------------------------------------------------------------
 def help_info():
   
-  tkinter.messagebox.showinfo('Help', 'First, you must open a folder containing at ' +
-  'least two MP3 files by clicking on the \"FOLDER\" button. This opens your computer ' +
-  'directory and allows you to browse for any folder. The \"Random\" box allows you ' +
-  'to choose whether the next song will be sequential or randomized. There is volume ' +
-  'control (1-10), as well as buttons for skipping backwards or forwards a song, ' +
-  'pausing, stopping, and quitting the program. Once a folder has been opened, the ' +
-  'will display the path to the folder/playlist, the current song loaded, and the status ' +
-  'stopped, playing, or paused. Playlists can be saved, loaded, or cleared from the MP3 ' +
-  'under the options tab in the top left.')
+  tkinter.messagebox.showinfo('Help', 'First, you must open a folder containing at least ' +
+  'two MP3 files by clicking on the \"FOLDER\" button. This opens your computer ' +
+  'directory and allows you to browse for any folder. Songs in sub folders are found ' +
+  'too, and the first songs can be played while the rest are still loading. The ' +
+  '\"Random\" box allows you to choose whether the next song will be sequential or ' +
+  'randomized. The \"Gapless\" box picks the next song ahead of time so it starts with ' +
+  'no pause in between. There is volume control (1-10), as well as buttons for skipping ' +
+  'backwards or forwards a song, pausing, stopping, and quitting the program. Once a ' +
+  'folder has been opened, the will display the path to the folder/playlist, the current ' +
+  'song loaded, and the status stopped, playing, or paused. Playlists can be saved, ' +
+  'loaded, or cleared from the MP3 under the options tab in the top left, where songs ' +
+  'can also be rated; save a playlist as .m3u or .pls to use it in other players, and ' +
+  'songs missing from an opened M3U or PLS playlist are listed in a report. With \"Smart ' +
+  'Shuffle\" on, random mode favours songs rated highly and played often, and plays ' +
+  'songs skipped often or played lately less. Every song played is counted, and \"Most ' +
+  'Played This Month\" lists the songs played to their end most often. Typing in the ' +
+  '\"Search\" box lists the songs whose name, artist or title match; double click one to ' +
+  'jump to it. The \"Position\" bar shows the waveform of the song playing; click it to ' +
+  'jump to that point. Every loaded song is listed under \"Songs\", where double ' +
+  'clicking a song also jumps to it. The songs and the song playing when the player is ' +
+  'closed are back the next time it starts. Scripts can control the player by sending ' +
+  'play, pause, stop, next, prev, volume, load and status commands, one per line, to the ' +
+  'socket ' + CONTROL_SOCKET + '.')
 
   return
 
@@ -0,0 +1,509 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlayHistory.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file records what the player plays: when each song starts, is
+#   paused, resumed, stopped, skipped or played to its end, and how long it
+#   was listened to. Recording an event only adds it to a list in memory, so
+#   the buttons never wait on the disk. A writer thread appends the events
+#   to a log file as lines of JSON, a batch at a time, every few seconds or
+#   once enough have piled up, and syncs the file after each batch. A batch
+#   cut short by a crash leaves at most a partial last line, which is
+#   skipped when the log is read.
+#
+#   The log is kept in numbered segments. Once a segment is full, and for
+#   any segments left over at start up, the writer thread folds it into the
+#   library index as totals per song (plays, skips, time listened, last
+#   played) and per song per month, then deletes it. The number of the last
+#   segment folded is saved in the same transaction as its totals, so a
+#   segment is never counted twice even if the player stops part way.
+#   Segments are folded strictly in order: one that can't be folded, say
+#   while a scan has the index locked, holds back the ones after it until it
+#   can, so the last number folded always covers every segment before it.
+#
+#   Questions such as the most played songs of a month are answered from
+#   the monthly totals, which are indexed by month, plus the few events not
+#   folded in yet, so they stay fast however long the history gets. The
+#   totals per song are also kept in memory for the smart shuffle and for
+#   sorting the list by plays, along with the set of songs whose totals have
+#   changed since the list last asked, so a sort only needs to look at those
+#   again. Loading the saved totals changes every song, which is counted in
+#   totals_generation instead.
+#
+#   Like the playback worker, there is one history for the whole player,
+#   named history.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import json
+import time
+import threading
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# columns of the totals kept for each song
+PLAYS_COLUMN = 0
+SKIPS_COLUMN = 1
+LAST_PLAYED_COLUMN = 2
+LISTENED_COLUMN = 3
+
+# kinds of event
+STARTED = 'start'
+PAUSED = 'pause'
+RESUMED = 'resume'
+STOPPED = 'stop'
+SKIPPED = 'skip'
+FINISHED = 'end'
+
+# columns of an event
+TIME_FIELD = 0
+KIND_FIELD = 1
+PATH_FIELD = 2
+LISTENED_FIELD = 3
+
+# seconds between writes, and the number of events that is written at once
+FLUSH_SECONDS = 5.0
+BATCH_EVENTS = 64
+
+# size a log segment grows to before it is folded into the totals
+SEGMENT_BYTES = 1024 * 1024
+
+# names of the log segments
+SEGMENT_PREFIX = 'history-'
+SEGMENT_SUFFIX = '.log'
+
+# seconds to wait for the last events to be written when the player closes
+CLOSE_TIMEOUT = 2.0
+
+# format of the month of an event
+MONTH_FORMAT = '%Y-%m'
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the month a time falls in, as YYYY-MM
+# -----------------------------------------------------------------------------
+def month_of(when):
+
+  return time.strftime(MONTH_FORMAT, time.localtime(when))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adds one event to totals
+#
+# INPUT PARAMETERS:
+#   totals - dictionary of path -> [plays, skips, last played, listened ms]
+#   event - [time, kind, path, listened ms]
+#
+# RETURN:
+#   the totals of the event's song
+# -----------------------------------------------------------------------------
+def count_event(totals, event):
+
+  # local variables
+  row = totals.get(event[PATH_FIELD])
+
+  if row is None:
+    row = [0, 0, 0.0, 0]
+    totals[event[PATH_FIELD]] = row
+
+  if event[KIND_FIELD] == FINISHED:
+    row[PLAYS_COLUMN] += 1
+  elif event[KIND_FIELD] == SKIPPED:
+    row[SKIPS_COLUMN] += 1
+
+  if event[KIND_FIELD] in (FINISHED, SKIPPED):
+    row[LAST_PLAYED_COLUMN] = max(row[LAST_PLAYED_COLUMN], event[TIME_FIELD])
+
+  row[LISTENED_COLUMN] += event[LISTENED_FIELD]
+
+  return row
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class records play events and keeps the totals worked out from them
+# -----------------------------------------------------------------------------
+class PlayHistory:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates a history that only counts in memory until start() is called
+  # ---------------------------------------------------------------------------
+  def __init__(self):
+
+    self.folder = None
+    self.index = None
+    self.counts = {}
+    self.changed = set()
+    self.totals_generation = 0
+    self._pending = []
+    self._unfolded = {}
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._closing = False
+    self._thread = None
+    self._path = None
+    self._since = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts the writer thread, which first folds the segments left by earlier
+  #   runs and loads the totals
+  #
+  # INPUT PARAMETERS:
+  #   folder - folder the log segments are kept in
+  #   index - LibraryIndex the totals are kept in
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def start(self, folder, index):
+
+    self.folder = folder
+    self.index = index
+    self._thread = threading.Thread(target=self._write_events, daemon=True)
+    self._thread.start()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Functions called as the player changes state. A song started while
+  #   another one hasn't ended, been stopped or been skipped counts as a
+  #   skip of the other one.
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song that starts playing
+  # ---------------------------------------------------------------------------
+  def started(self, path):
+
+    if self._path is not None:
+      self._record(SKIPPED)
+
+    self._path = path
+    self._since = time.monotonic()
+    self._record(STARTED)
+
+  def paused(self):
+    if self._path is not None and self._since is not None:
+      self._record(PAUSED)
+      self._since = None
+
+  def resumed(self):
+    if self._path is not None and self._since is None:
+      self._since = time.monotonic()
+      self._record(RESUMED)
+
+  def stopped(self):
+    if self._path is not None:
+      self._record(STOPPED)
+      self._path = None
+
+  def finished(self):
+    if self._path is not None:
+      self._record(FINISHED)
+      self._path = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds an event for the current song to the batch waiting to be written
+  #   and to the totals. Events that stop the song playing carry the time
+  #   listened since it last started or resumed.
+  #
+  # INPUT PARAMETERS:
+  #   kind - kind of event
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _record(self, kind):
+
+    # local variables
+    listened = 0
+
+    if kind not in (STARTED, RESUMED) and self._since is not None:
+      listened = int((time.monotonic() - self._since) * 1000)
+      self._since = None
+
+    event = [time.time(), kind, self._path, listened]
+
+    with self._lock:
+      self._pending.append(event)
+      count_event(self.counts, event)
+      self.changed.add(self._path)
+      batch_full = len(self._pending) >= BATCH_EVENTS
+
+    if batch_full:
+      self._wake.set()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Hands over the songs whose totals have changed since the last call and
+  #   starts a new set
+  #
+  # RETURN:
+  #   totals_generation, and set of the paths of the songs changed
+  # ---------------------------------------------------------------------------
+  def take_changes(self):
+
+    with self._lock:
+      changed = self.changed
+      self.changed = set()
+      generation = self.totals_generation
+
+    return generation, changed
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the most played songs of a range of months
+  #
+  # INPUT PARAMETERS:
+  #   first_month - first month as YYYY-MM, or None for this month
+  #   last_month - last month as YYYY-MM, or None for the same as first_month
+  #   limit - most songs returned
+  #
+  # RETURN:
+  #   list of (path, plays), most played first
+  # ---------------------------------------------------------------------------
+  def top_songs(self, first_month=None, last_month=None, limit=100):
+
+    # local variables
+    first_month = first_month or month_of(time.time())
+    last_month = last_month or first_month
+    recent = {}
+
+    # plays not folded into the index yet, written or still waiting
+    with self._lock:
+      for events in list(self._unfolded.values()) + [self._pending]:
+        for event in events:
+          if (event[KIND_FIELD] == FINISHED and
+              first_month <= month_of(event[TIME_FIELD]) <= last_month):
+            recent[event[PATH_FIELD]] = recent.get(event[PATH_FIELD], 0) + 1
+
+    if self.index is None:
+      plays = {}
+    else:
+      plays = dict(self.index.top_plays(first_month, last_month, limit))
+
+      # a song played lately may be outside the top of the index on its own
+      plays.update(self.index.plays_of(first_month, last_month,
+                                       [path for path in recent if path not in plays]))
+
+    for path, count in recent.items():
+      plays[path] = plays.get(path, 0) + count
+
+    return sorted(plays.items(), key=lambda item: -item[1])[:limit]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes the last events and stops the writer thread, waiting a moment
+  #   for it
+  # ---------------------------------------------------------------------------
+  def close(self):
+
+    self.stopped()
+
+    if self._thread is not None:
+      self._closing = True
+      self._wake.set()
+      self._thread.join(CLOSE_TIMEOUT)
+      self._thread = None
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the log segments in the folder, as (number, path) in order
+  # ---------------------------------------------------------------------------
+  def _segments(self):
+
+    # local variables
+    segments = []
+
+    for file_name in os.listdir(self.folder):
+      number = file_name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+      if (file_name.startswith(SEGMENT_PREFIX) and file_name.endswith(SEGMENT_SUFFIX) and
+          number.isdigit()):
+        segments.append((int(number), os.path.join(self.folder, file_name)))
+
+    return sorted(segments)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the path of a log segment
+  # ---------------------------------------------------------------------------
+  def _segment_path(self, number):
+
+    return os.path.join(self.folder, '%s%08d%s' % (SEGMENT_PREFIX, number, SEGMENT_SUFFIX))
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writer thread: folds old segments, loads the totals, then writes the
+  #   events in batches until the history is closed
+  # ---------------------------------------------------------------------------
+  def _write_events(self):
+
+    # local variables
+    waiting = []
+
+    try: # folder might not be writable...
+      os.makedirs(self.folder, exist_ok=True)
+
+      # segments up to the last one folded were folded before being deleted
+      folded = self.index.folded_segment()
+      number = folded
+      for segment, path in self._segments():
+        if segment > folded:
+          waiting.append((segment, path))
+        else:
+          os.remove(path)
+        number = max(number, segment)
+
+      self._fold_waiting(waiting)
+      self._load_totals()
+
+      number += 1
+      log_file = open(self._segment_path(number), 'a', encoding='utf-8')
+
+    # events are still counted in memory, just not kept
+    except OSError:
+      return
+
+    with log_file:
+      while True:
+        self._wake.wait(FLUSH_SECONDS)
+        self._wake.clear()
+
+        with self._lock:
+          batch, self._pending = self._pending, []
+          if len(batch) > 0:
+            self._unfolded[number] = self._unfolded.get(number, []) + batch
+
+        try: # disk might be full...
+          if len(batch) > 0:
+            log_file.write(''.join(json.dumps(event) + '\n' for event in batch))
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+          # a full segment waits to be folded and a new one is started
+          if log_file.tell() >= SEGMENT_BYTES and not self._closing:
+            log_file.close()
+            waiting.append((number, self._segment_path(number)))
+            number += 1
+            log_file = open(self._segment_path(number), 'a', encoding='utf-8')
+
+          if len(waiting) > 0 and not self._closing:
+            self._fold_waiting(waiting)
+
+        except OSError:
+          pass
+
+        if self._closing:
+          return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Folds the segments waiting, oldest first, stopping at the first one
+  #   that can't be folded; it and the ones after it are tried again later
+  #
+  # INPUT PARAMETERS:
+  #   waiting - list of (number, path) of the segments in order, folded ones
+  #             are taken off the front
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _fold_waiting(self, waiting):
+
+    while len(waiting) > 0 and self._fold(*waiting[0]):
+      waiting.pop(0)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Folds one log segment into the totals in the index, then deletes it
+  #
+  # INPUT PARAMETERS:
+  #   number - number of the segment
+  #   file_name - path of the segment
+  #
+  # RETURN:
+  #   True if the segment was folded, False if it is kept to try again
+  # ---------------------------------------------------------------------------
+  def _fold(self, number, file_name):
+
+    # local variables
+    totals = {}
+    months = {}
+
+    with open(file_name, 'rb') as log_file:
+      for line in log_file:
+        try:
+          event = json.loads(line)
+          month = months.setdefault(month_of(event[TIME_FIELD]), {})
+          count_event(totals, event)
+          count_event(month, event)
+
+        # the end of a batch cut short by a crash
+        except (ValueError, TypeError, IndexError):
+          continue
+
+    # a segment that couldn't be folded is kept for the next try
+    if not self.index.fold_history(number,
+                                   [(path,) + tuple(row) for path, row in totals.items()],
+                                   [(month, path, row[PLAYS_COLUMN], row[SKIPS_COLUMN],
+                                     row[LISTENED_COLUMN])
+                                    for month, songs in months.items()
+                                    for path, row in songs.items()]):
+      return False
+
+    os.remove(file_name)
+
+    with self._lock:
+      self._unfolded.pop(number, None)
+
+    return True
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds the totals in the index to the ones counted since start up. Every
+  #   song may have changed, which is noted by a new totals_generation.
+  # ---------------------------------------------------------------------------
+  def _load_totals(self):
+
+    # local variables
+    totals = self.index.load_play_totals()
+
+    with self._lock:
+      for path, row in self.counts.items():
+        old = totals.get(path)
+        if old is not None:
+          row[PLAYS_COLUMN] += old[PLAYS_COLUMN]
+          row[SKIPS_COLUMN] += old[SKIPS_COLUMN]
+          row[LAST_PLAYED_COLUMN] = max(row[LAST_PLAYED_COLUMN], old[LAST_PLAYED_COLUMN])
+          row[LISTENED_COLUMN] += old[LISTENED_COLUMN]
+
+      for path, old in totals.items():
+        if path not in self.counts:
+          self.counts[path] = list(old)
+
+      self.totals_generation += 1
+      self.changed = set()
+
+    return
+
+# single play history shared by the whole player
+history = PlayHistory()
@@ -0,0 +1,301 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlaybackMetrics.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file records how the player performs while it is being used:
+#
+#     load_ms             time the mixer takes to open a song
+#     transition_gap_ms   silence between the end of one song and the start
+#                         of the next
+#     callback_ms         time a GUI callback holds up the tkinter main loop,
+#                         labelled with the name of the callback
+#     startup_ms          time from starting the player until its window is
+#                         ready
+#
+#   Each is kept as a histogram with fixed buckets, so recording a value is
+#   only a bucket lookup and memory never grows. Recording is off until it is
+#   turned on from the Options menu or with MP3PLAYER_METRICS=1; while off,
+#   every recording call returns after checking one flag. The histograms can
+#   be written to a JSON file or a Prometheus text file at any time.
+#
+#   Like the playback worker, there is one set of metrics for the whole
+#   player, named metrics.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import json
+import time
+import bisect
+import threading
+import functools
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# upper bounds of the histogram buckets in ms; anything larger goes in a
+# last, unbounded bucket
+BUCKET_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# description of each histogram, for the Prometheus export
+HELP_TEXT = {
+  'load_ms': 'Time the mixer takes to open a song',
+  'transition_gap_ms': 'Silence between the end of one song and the start of the next',
+  'callback_ms': 'Time a GUI callback holds up the tkinter main loop',
+  'startup_ms': 'Time from starting the player until its window is ready',
+}
+
+# prefix of every name in the Prometheus export
+METRIC_PREFIX = 'mp3player_'
+
+# file ending that selects the Prometheus text format when exporting
+PROMETHEUS_SUFFIX = '.prom'
+
+# environment variable that turns recording on at start up
+ENABLE_VARIABLE = 'MP3PLAYER_METRICS'
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class counts values in fixed buckets, along with their sum
+# -----------------------------------------------------------------------------
+class Histogram:
+
+  def __init__(self):
+
+    self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+    self.total = 0.0
+    self.count = 0
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds one value
+  # ---------------------------------------------------------------------------
+  def observe(self, value):
+
+    self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+    self.total += value
+    self.count += 1
+
+    return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class holds every histogram and the times marked between events
+# -----------------------------------------------------------------------------
+class Metrics:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an empty set of metrics, on only if MP3PLAYER_METRICS is set
+  # ---------------------------------------------------------------------------
+  def __init__(self):
+
+    self.enabled = os.environ.get(ENABLE_VARIABLE, '') not in ('', '0')
+    self.histograms = {}
+    self._marks = {}
+    self._lock = threading.Lock()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Records one value in a histogram
+  #
+  # INPUT PARAMETERS:
+  #   name - name of the histogram
+  #   value - value in ms
+  #   label - optional label value, which gets its own histogram
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def observe(self, name, value, label=None):
+
+    if not self.enabled:
+      return
+
+    with self._lock:
+      histogram = self.histograms.get((name, label))
+      if histogram is None:
+        histogram = Histogram()
+        self.histograms[(name, label)] = histogram
+      histogram.observe(value)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Remembers the time an event happened, to be measured from by since()
+  #
+  # INPUT PARAMETERS:
+  #   event - name of the event
+  #   when - time.perf_counter() of the event, or None for now
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def mark(self, event, when=None):
+
+    if not self.enabled:
+      return
+
+    self._marks[event] = time.perf_counter() if when is None else when
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the time of a marked event without clearing it, or None
+  # ---------------------------------------------------------------------------
+  def marked(self, event):
+
+    return self._marks.get(event)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Records the time since a marked event in a histogram and clears the
+  #   mark, so each event is only measured once. Nothing is recorded if the
+  #   event hasn't been marked.
+  #
+  # INPUT PARAMETERS:
+  #   event - name of the event
+  #   name - name of the histogram
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def since(self, event, name):
+
+    if not self.enabled:
+      return
+
+    start = self._marks.pop(event, None)
+    if start is not None:
+      self.observe(name, (time.perf_counter() - start) * 1000)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Decorator that records how long each call of a GUI callback takes in
+  #   callback_ms, labelled with the callback's name
+  # ---------------------------------------------------------------------------
+  def timed(self, function):
+
+    @functools.wraps(function)
+    def timed_function(*args, **kwargs):
+
+      if not self.enabled:
+        return function(*args, **kwargs)
+
+      start = time.perf_counter()
+      try:
+        return function(*args, **kwargs)
+      finally:
+        self.observe('callback_ms', (time.perf_counter() - start) * 1000, function.__name__)
+
+    return timed_function
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Forgets everything recorded so far
+  # ---------------------------------------------------------------------------
+  def reset(self):
+
+    with self._lock:
+      self.histograms = {}
+      self._marks = {}
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns a copy of the histograms, sorted by name and label
+  # ---------------------------------------------------------------------------
+  def _snapshot(self):
+
+    with self._lock:
+      rows = [(name, label, list(histogram.counts), histogram.total, histogram.count)
+              for (name, label), histogram in self.histograms.items()]
+
+    return sorted(rows, key=lambda row: (row[0], row[1] or ''))
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the histograms as a JSON document
+  # ---------------------------------------------------------------------------
+  def to_json(self):
+
+    # local variables
+    report = {'bucket_bounds_ms': list(BUCKET_BOUNDS), 'histograms': []}
+
+    for name, label, counts, total, count in self._snapshot():
+      report['histograms'].append({'name': name, 'label': label, 'counts': counts,
+                                   'sum': total, 'count': count})
+
+    return json.dumps(report, indent=2)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the histograms in the Prometheus text format
+  # ---------------------------------------------------------------------------
+  def to_prometheus(self):
+
+    # local variables
+    lines = []
+    described = set()
+
+    for name, label, counts, total, count in self._snapshot():
+      metric = METRIC_PREFIX + name
+      labels = '' if label is None else 'callback="' + label + '",'
+
+      if name not in described:
+        lines.append('# HELP ' + metric + ' ' + HELP_TEXT.get(name, name))
+        lines.append('# TYPE ' + metric + ' histogram')
+        described.add(name)
+
+      # Prometheus buckets count everything up to their bound
+      running = 0
+      for bound, bucket_count in zip(BUCKET_BOUNDS + ('+Inf',), counts):
+        running += bucket_count
+        lines.append('%s_bucket{%sle="%s"} %d' % (metric, labels, bound, running))
+
+      labels = labels.rstrip(',')
+      selector = '{' + labels + '}' if labels else ''
+      lines.append('%s_sum%s %r' % (metric, selector, total))
+      lines.append('%s_count%s %d' % (metric, selector, count))
+
+    return '\n'.join(lines) + '\n'
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes the histograms to a file, in the Prometheus text format if its
+  #   name ends in .prom and as JSON otherwise
+  #
+  # INPUT PARAMETERS:
+  #   file_name - path of the file to write
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def export(self, file_name):
+
+    if file_name.endswith(PROMETHEUS_SUFFIX):
+      text = self.to_prometheus()
+    else:
+      text = self.to_json()
+
+    with open(file_name, 'w') as export_file:
+      export_file.write(text)
+
+    return
+
+# single set of metrics shared by the whole player
+metrics = Metrics()
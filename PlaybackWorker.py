@@ -0,0 +1,392 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlaybackWorker.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file runs every call into the pygame mixer on a background thread,
+#   so opening a song on a slow or sleeping disk never freezes the window.
+#   The GUI puts commands (load, play, pause, unpause, stop, seek, queue,
+#   unload and volume) on a queue and returns right away. The worker runs them in order
+#   and posts the result of each play state change back to the tkinter main
+#   loop with after_idle.
+#
+#   Every load starts a new generation. A command is skipped if a newer load
+#   was asked for before the worker got to it, so pressing next ten times in
+#   a row only opens the last song instead of ten blocking loads. A load
+#   that fails ends its generation too, so the play queued behind it doesn't
+#   start the song that was loaded before and report a second error.
+#
+#   pygame is only imported, and the mixer only opened, once the worker
+#   thread is running, so the window can be built and shown meanwhile.
+#   Commands given before then simply wait in the queue.
+#
+#   With the sound cache on, a song that is already decoded in memory is
+#   played from there on a mixer channel instead of being opened by
+#   mixer.music, and every song that is loaded is decoded in the background
+#   so coming back to it later is just as quick.
+#
+#   Like pygame's mixer.music, there is one worker for the whole player,
+#   named playback.
+#
+# *****************************************************************************
+
+# modules used by this file
+import time
+import queue
+import threading
+import tkinter
+from PlaybackMetrics import metrics
+from SoundCache import SoundCache, SoundPlayer
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# commands that report their result back to the main loop
+STATE_COMMANDS = ('load', 'play', 'pause', 'unpause', 'stop')
+
+# commands that still run after a newer load has been asked for
+ALWAYS_RUN = ('set_volume',)
+
+# commands run on both mixer.music and the sound player, whichever is in use
+BOTH_PLAYERS = ('set_volume', 'stop', 'unload')
+
+# mixer.music commands that halt the song playing, which posts the end event
+# as if it had ended
+HALTING_COMMANDS = ('load', 'play', 'stop', 'unload')
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class owns the mixer and runs commands for it on its own thread
+# -----------------------------------------------------------------------------
+class PlaybackWorker:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle worker, nothing runs until start() is called
+  # ---------------------------------------------------------------------------
+  def __init__(self):
+
+    self.root = None
+    self.on_state = None
+    self._commands = queue.Queue()
+    self._lock = threading.Lock()
+    self._generation = 0
+    self._in_flight = 0
+    self._expect_busy = False
+    self._start_at = 0.0
+    self._offset = 0.0
+    self.music = None
+    self.sounds = None
+    self.player = None
+    self.cache = SoundCache()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts the worker thread
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window, used to post results back to the main loop
+  #   on_state - called in the main loop as on_state(command, error) after
+  #              each load, play, pause, unpause and stop; error is None if
+  #              it worked, or the exception if it didn't
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def start(self, root, on_state):
+
+    self.root = root
+    self.on_state = on_state
+    worker = threading.Thread(target=self._run, daemon=True)
+    worker.start()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Puts a command on the queue, tagged with the current load generation
+  #
+  # INPUT PARAMETERS:
+  #   command - name of the mixer.music function to call
+  #   args - arguments for it
+  #   busy - whether the mixer will be playing once this runs, or None if
+  #          the command doesn't change that
+  #   new_load - True to start a new generation, cancelling older commands
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _submit(self, command, args=(), busy=None, new_load=False):
+
+    with self._lock:
+      if new_load:
+        self._generation += 1
+      if busy is not None:
+        self._expect_busy = busy
+      self._in_flight += 1
+      generation = self._generation
+
+    self._commands.put((generation, command, args))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Commands for the mixer, named after the mixer.music functions they run.
+  #   A song can be loaded with a start position in seconds, which the first
+  #   play() after the load starts from.
+  # ---------------------------------------------------------------------------
+  def load(self, path, start=0.0):
+    self._start_at = start
+    self._submit('load', (path,), busy=False, new_load=True)
+
+  def play(self):
+    self._offset = self._start_at
+    self._start_at = 0.0
+    self._submit('play', (0, self._offset), busy=True)
+
+  def pause(self):
+    self._submit('pause', busy=False)
+
+  def unpause(self):
+    self._submit('unpause', busy=True)
+
+  def stop(self):
+    self._submit('stop', busy=False)
+
+  def unload(self):
+    self._submit('unload', busy=False, new_load=True)
+
+  def seek(self, position):
+    self._submit('set_pos', (position,))
+
+  def queue(self, path):
+    self._submit('queue', (path,))
+
+  def set_volume(self, volume):
+    self._submit('set_volume', (volume,))
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Asks for a song to be decoded ahead of time, if the sound cache is on,
+  #   so loading it later doesn't have to touch the disk
+  # ---------------------------------------------------------------------------
+  def prefetch(self, path):
+
+    self.cache.prefetch(path)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Tells whether a song is playing. While commands are still waiting to
+  #   run, the answer is what the mixer will be doing once they have.
+  #
+  # RETURN:
+  #   True if a song is (or is about to be) playing
+  # ---------------------------------------------------------------------------
+  def get_busy(self):
+
+    with self._lock:
+      if self._in_flight > 0 or self.player is None:
+        return self._expect_busy
+
+    return self.player.get_busy()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Tells whether every command given so far has run, so the mixer really
+  #   is in the state they put it in
+  # ---------------------------------------------------------------------------
+  def settled(self):
+
+    with self._lock:
+      return self._in_flight == 0
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the generation of the last load asked for. It goes up with
+  #   every load, so anything stamped with an older one is about a song that
+  #   has since been replaced.
+  # ---------------------------------------------------------------------------
+  def load_generation(self):
+
+    return self._generation
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns how long the current song has been playing, in ms
+  # ---------------------------------------------------------------------------
+  def get_pos(self):
+
+    if self.player is None:
+      return 0
+
+    return self.player.get_pos()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns how far into the current song the mixer is, in ms. Unlike
+  #   get_pos() this counts from the start of the song, even if it was loaded
+  #   with a start position.
+  # ---------------------------------------------------------------------------
+  def position(self):
+
+    return int(self._offset * 1000) + max(self.get_pos(), 0)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Must be called when the mixer moves on to the queued song by itself,
+  #   which always starts from the beginning
+  # ---------------------------------------------------------------------------
+  def queued_started(self):
+
+    self._offset = 0.0
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Worker thread: runs each command that is still current and reports the
+  #   result of play state changes to the main loop
+  # ---------------------------------------------------------------------------
+  def _run(self):
+
+    # importing pygame and opening the sound card take a while, so they are
+    # only done here, off the main loop
+    import pygame
+    from pygame import mixer
+
+    try:
+      mixer.init()
+    except pygame.error as mixer_error:
+      self.root.after_idle(self.on_state, 'init', mixer_error)
+    else:
+      self.sounds = SoundPlayer(self.cache, mixer.music)
+    self.music = mixer.music
+    self.player = self.music
+
+    while True:
+      generation, command, args = self._commands.get()
+      error = None
+
+      # skip commands made stale by a newer load
+      if generation == self._generation or command in ALWAYS_RUN:
+        try:
+          started = time.perf_counter()
+
+          # each song is played by whichever player can start it quickest
+          if command == 'load':
+            self.player = self._choose_player(args[0])
+
+          # mixer.music counts an MP3's seek position from where it is in some
+          # versions of SDL_mixer and from its start in others; from the start
+          # of the song both are the same
+          if command == 'set_pos' and self.player is self.music:
+            self.music.rewind()
+
+          if command in BOTH_PLAYERS and self.sounds is not None:
+            getattr(self.sounds, command)(*args)
+            self._call_music(command, args)
+          elif self.player is self.music:
+            self._call_music(command, args)
+          else:
+            getattr(self.player, command)(*args)
+
+          if command == 'load':
+            metrics.observe('load_ms', (time.perf_counter() - started) * 1000)
+
+          # get_pos() carries on counting from the last play() through a
+          # seek, so the offset makes up the difference
+          elif command == 'set_pos':
+            self._offset = args[0] - max(self.player.get_pos(), 0) / 1000
+
+          # the next song is audible, so the gap after the last one is over
+          elif command == 'play':
+            metrics.since('track_end', 'transition_gap_ms')
+        except pygame.error as mixer_error:
+          error = mixer_error
+
+        # results are only posted for commands that are still current
+        report = generation == self._generation
+
+        # drop the rest of a failed load's commands; the ones the main loop
+        # gives once it hears of the failure start a new generation
+        if command == 'load' and error is not None:
+          with self._lock:
+            if generation == self._generation:
+              self._generation += 1
+              self._expect_busy = False
+
+        if (command in STATE_COMMANDS or error is not None) and report:
+          try:
+            self.root.after_idle(self.on_state, command, error)
+
+          # the main window has been closed
+          except (RuntimeError, tkinter.TclError):
+            return
+
+      with self._lock:
+        self._in_flight -= 1
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Runs a mixer.music command. Commands that halt the song playing are
+  #   run with the end event off, so only a song that really ends posts it.
+  #
+  # INPUT PARAMETERS:
+  #   command - name of the mixer.music function to call
+  #   args - arguments for it
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _call_music(self, command, args):
+
+    # local variables
+    end_event = self.music.get_endevent()
+
+    if command not in HALTING_COMMANDS:
+      getattr(self.music, command)(*args)
+      return
+
+    self.music.set_endevent()
+    try:
+      getattr(self.music, command)(*args)
+    finally:
+      self.music.set_endevent(end_event)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Picks the player for a song about to be loaded and stops the other one.
+  #   Songs played from disk are decoded in the background for next time.
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song
+  #
+  # RETURN:
+  #   the sound player if the song is decoded, or mixer.music if it isn't
+  # ---------------------------------------------------------------------------
+  def _choose_player(self, path):
+
+    if self.sounds is not None and self.sounds.ready(path):
+      self._call_music('stop', ())
+      return self.sounds
+
+    if self.sounds is not None:
+      self.sounds.unload()
+      self.cache.prefetch(path)
+
+    return self.music
+
+# single playback worker shared by the whole player
+playback = PlaybackWorker()
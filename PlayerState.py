@@ -0,0 +1,222 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlayerState.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file holds what the window shows about the player: the song
+#   playing, the player status and the play/pause button. The handlers no
+#   longer write to Tk themselves. They set fields of the state, which only
+#   remembers the new value and asks the main loop, once, to update the
+#   window when it is next idle. By then every handler in the chain has run,
+#   so only the fields whose final value differs from what is on screen are
+#   handed to Tk. Pressing next twenty times in a row, or a song ending into
+#   the next one, costs one update of the window instead of dozens, and
+#   setting a field to the value it already shows costs nothing at all.
+#
+#   The handlers are given stand-ins that look like the Tk variables and
+#   button they used to write to, so reading a field always gives its
+#   latest value, even before the window shows it.
+#
+# *****************************************************************************
+
+# modules used by this file
+import tkinter
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class collects changes to the fields shown in the window and pushes
+#   the ones that differ to Tk, at most once each time the main loop is idle
+# -----------------------------------------------------------------------------
+class PlayerState:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates a state with no fields
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window, used to reach the main loop
+  # ---------------------------------------------------------------------------
+  def __init__(self, root):
+
+    self.root = root
+    self._values = {}
+    self._shown = {}
+    self._show = {}
+    self._repeated = set()
+    self._changed = set()
+    self._scheduled = False
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds a field shown by a Tk variable
+  #
+  # INPUT PARAMETERS:
+  #   name - name of the field
+  #   variable - the Tk variable that shows it
+  #   repeat - True to hand the value to Tk after it is written even if it
+  #            is the one shown, for variables whose watchers redraw
+  #
+  # RETURN:
+  #   StateVariable for the handlers to use in place of the variable
+  # ---------------------------------------------------------------------------
+  def variable(self, name, variable, repeat=False):
+
+    self._add(name, variable.get(), variable.set)
+
+    if repeat:
+      self._repeated.add(name)
+
+    return StateVariable(self, name)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds a widget whose options are fields
+  #
+  # INPUT PARAMETERS:
+  #   name - name of the widget; each option becomes the field name.option
+  #   widget - the widget
+  #
+  # RETURN:
+  #   StateWidget for the handlers to use in place of the widget
+  # ---------------------------------------------------------------------------
+  def widget(self, name, widget):
+
+    return StateWidget(self, name, widget)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds a field, with the value it shows now and the function that shows a
+  #   new one
+  # ---------------------------------------------------------------------------
+  def _add(self, name, value, show):
+
+    self._values[name] = value
+    self._shown[name] = value
+    self._show[name] = show
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the latest value of a field, shown yet or not
+  # ---------------------------------------------------------------------------
+  def get(self, name):
+
+    return self._values[name]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Changes a field; the window is updated once the main loop is idle
+  #
+  # INPUT PARAMETERS:
+  #   name - name of the field
+  #   value - its new value
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def set(self, name, value):
+
+    self._values[name] = value
+    self._changed.add(name)
+
+    if not self._scheduled:
+      try:
+        self.root.after_idle(self.flush)
+        self._scheduled = True
+
+      # the main window has been closed
+      except (RuntimeError, tkinter.TclError):
+        pass
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Main loop: shows every field whose value differs from the one on
+  #   screen. Anything watching a Tk variable hears about it only then, and
+  #   only once.
+  #
+  # RETURN:
+  #   number of fields handed to Tk
+  # ---------------------------------------------------------------------------
+  def flush(self):
+
+    # local variables
+    changed = self._changed
+    shown = 0
+
+    self._changed = set()
+    self._scheduled = False
+
+    for name in changed:
+      value = self._values[name]
+      if value != self._shown[name] or name in self._repeated:
+        self._shown[name] = value
+        self._show[name](value)
+        shown += 1
+
+    return shown
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class stands in for a Tk variable, reading and writing a field of
+#   the state instead
+# -----------------------------------------------------------------------------
+class StateVariable:
+
+  def __init__(self, state, name):
+
+    self.state = state
+    self.name = name
+
+  def get(self):
+    return self.state.get(self.name)
+
+  def set(self, value):
+    self.state.set(self.name, value)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class stands in for a widget. Options set with widget['option']
+#   become fields of the state; everything else goes to the widget itself.
+# -----------------------------------------------------------------------------
+class StateWidget:
+
+  def __init__(self, state, name, widget):
+
+    self.state = state
+    self.name = name
+    self.widget = widget
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Reads and writes an option through the state, adding it as a field the
+  #   first time
+  # ---------------------------------------------------------------------------
+  def _field(self, option):
+
+    # local variables
+    name = self.name + '.' + option
+    widget = self.widget
+
+    if name not in self.state._show:
+      self.state._add(name, widget.cget(option),
+                      lambda value: widget.configure({option: value}))
+
+    return name
+
+  def __getitem__(self, option):
+    return self.state.get(self._field(option))
+
+  def __setitem__(self, option, value):
+    self.state.set(self._field(option), value)
+
+  def __getattr__(self, attribute):
+    return getattr(self.widget, attribute)
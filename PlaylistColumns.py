@@ -0,0 +1,796 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlaylistColumns.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file sorts, filters, merges and trims the list of songs as whole
+#   NumPy columns instead of row by row. A TrackColumns looks at a TrackTable
+#   as arrays: the folder number and song name of each row, and the rank of
+#   its folder, its song name, its length and its play count. One view is
+#   kept for as long as the player runs. Songs are taken into it a chunk at
+#   a time while the player is idle, and folder and name ranks are worked out
+#   as they come in. Ranks are carried along whenever the columns rearrange
+#   the list or follow songs taken out of it, so every operation is a
+#   handful of array operations:
+#
+#     sort_order   order of the rows by several keys, each either way
+#     keep_rows    keeps the rows a boolean mask picks, in order
+#     drop_rows    takes out a set of rows by index
+#     merge        adds the rows of several saved playlists
+#
+#   Sorting packs every key into one 64 bit number per row, with the row
+#   number last so equal rows keep their order, and sorts those numbers. The
+#   result is always handed back to the table as whole new columns.
+#
+#   NumPy has to be installed for these operations.
+#
+# *****************************************************************************
+
+# modules used by this file
+import numpy
+from array import array
+from PlaylistFile import PlaylistReader
+from TrackTable import FOLDER_ID_TYPE
+from TrackMetadata import DURATION_COLUMN, NOT_READ
+from PlayHistory import PLAYS_COLUMN
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# keys the list can be sorted by
+SORT_KEYS = ('folder', 'name', 'duration', 'plays')
+
+# length of songs whose tags haven't been read; they sort after every other
+UNKNOWN_DURATION = NOT_READ
+
+# largest packed sort key; keys are ranked again before they would go past it
+KEY_LIMIT = 2 ** 62
+
+# rows taken into the columns, and rows of an attached playlist copied into
+# the table, each time the player is idle
+ROW_CHUNK = 2500
+READ_CHUNK = 20000
+
+# odd number the hash of a song's folder is multiplied by before the hash of
+# its name is added, to make one number for its path
+PATH_HASH_FACTOR = 1000003
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function slots new strings in among strings already ranked
+#
+# INPUT PARAMETERS:
+#   vocabulary - sorted object array of the different strings ranked so far
+#   strings - object array of the new strings, which may repeat
+#
+# RETURN:
+#   the sorted object array of every different string, int64 array of how
+#   far each old rank moves up or None if none do, and int64 array of the
+#   rank of each new string
+# -----------------------------------------------------------------------------
+def add_ranks(vocabulary, strings):
+
+  # local variables
+  different = sorted(set(strings))
+  number = {string: index for index, string in enumerate(different)}
+  added = numpy.empty(len(different), dtype=object)
+  new = numpy.ones(len(different), dtype=bool)
+  shift = None
+
+  # Python sorts strings much quicker than NumPy sorts objects
+  added[:] = different
+  at = numpy.searchsorted(vocabulary, added)
+
+  inside = at < len(vocabulary)
+  new[inside] = vocabulary[at[inside]] != added[inside]
+
+  # each string lands past the new strings slotted in before it, and only
+  # pointers move when they are slotted in
+  ranks = at + numpy.cumsum(new) - new
+  if new.any():
+    shift = numpy.cumsum(numpy.bincount(at[new], minlength=len(vocabulary)))
+    vocabulary = numpy.insert(vocabulary, at[new], added[new])
+
+  return vocabulary, shift, ranks[numpy.fromiter(map(number.__getitem__, strings),
+                                                 dtype=numpy.int64, count=len(strings))]
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function turns any integer column into ranks from 0, keeping ties
+# -----------------------------------------------------------------------------
+def dense_rank(values):
+
+  return numpy.unique(values, return_inverse=True)[1].reshape(-1).astype(numpy.int64)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function makes one number for the path of each of some songs from
+#   the hashes of their folders and names, without building the paths
+#
+# INPUT PARAMETERS:
+#   folder_hashes - int64 array of the hash of each song's folder
+#   names - iterable of the song names
+#   count - number of songs
+#
+# RETURN:
+#   int64 array of the number of each song's path
+# -----------------------------------------------------------------------------
+def path_hashes(folder_hashes, names, count):
+
+  # local variables
+  name_hashes = numpy.fromiter(map(hash, names), dtype=numpy.int64, count=count)
+
+  # the numbers wrap around rather than overflow
+  return folder_hashes * PATH_HASH_FACTOR + name_hashes
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a column view of a TrackTable, kept for as long as the
+#   player runs. catch_up() is called whenever songs are added to the table:
+#   they are taken into the columns a chunk at a time while the player is
+#   idle, ranked among the songs already there, and a table that has been
+#   emptied or replaced is looked at again from the start. finish() takes in
+#   whatever is left before the columns are used. Sorts and filters made
+#   through the functions below, and songs taken out and passed to
+#   follow_removed(), are followed without looking at the table again.
+# -----------------------------------------------------------------------------
+class TrackColumns:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Makes an empty view; the columns are filled in by catch_up()
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window, used to take in songs when idle
+  #   mp3_list - the TrackTable to look at
+  #   history - PlayHistory the play counts come from, or None
+  #   metadata - MetadataReader the song lengths come from, or None
+  # ---------------------------------------------------------------------------
+  def __init__(self, root, mp3_list, history=None, metadata=None):
+
+    self.root = root
+    self.mp3_list = mp3_list
+    self.history = history
+    self.metadata = metadata
+    self._step_id = None
+    self._reset()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Forgets every column, so the table is looked at again from the start
+  # ---------------------------------------------------------------------------
+  def _reset(self):
+
+    self.generation = self.mp3_list.generation
+    self.size = 0
+    self.folders = []
+    self.folder_id = numpy.zeros(0, dtype=numpy.uint32)
+    self.names = numpy.zeros(0, dtype=object)
+    self.name_rank = numpy.zeros(0, dtype=numpy.int64)
+    self.path_hash = numpy.zeros(0, dtype=numpy.int64)
+    self.play_count = numpy.zeros(0, dtype=numpy.int64)
+    self._vocabulary = numpy.zeros(0, dtype=object)
+    self._folder_vocabulary = numpy.zeros(0, dtype=object)
+    self._folder_rank = numpy.zeros(0, dtype=numpy.int64)
+    self._folder_hash = numpy.zeros(0, dtype=numpy.int64)
+    self._durations_read = None
+    self._totals_generation = None
+    self._source_job = None
+    self._source_generation = None
+    self._source_row = None
+    self._keys = {}
+    self._room = {}
+
+    # songs played from now on are noted as changes; those played before are
+    # in the totals the rows are looked up in as they come in
+    if self.history is not None:
+      self._totals_generation = self.history.take_changes()[0]
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts taking in the songs added to the table since the columns were
+  #   last brought up to date, unless that has already been started
+  # ---------------------------------------------------------------------------
+  def catch_up(self):
+
+    if self._step_id is None and self._behind():
+      self._step_id = self.root.after_idle(self._step)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Tells whether the table has rows the columns don't have yet, or the
+  #   play history has loaded its old totals since the play counts were made
+  # ---------------------------------------------------------------------------
+  def _behind(self):
+
+    return (self.generation != self.mp3_list.generation or self.size < len(self.mp3_list) or
+            (self.history is not None and
+             self.history.totals_generation != self._totals_generation))
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Copies one chunk of an attached playlist into the table, or takes one
+  #   chunk of rows into the columns and brings the play counts up to date,
+  #   then schedules itself again if there is more to do
+  # ---------------------------------------------------------------------------
+  def _step(self):
+
+    self._step_id = None
+
+    if self.mp3_list.source_name() is not None:
+      self.mp3_list.read_ahead(READ_CHUNK)
+    else:
+      self._take_rows(ROW_CHUNK)
+      self._update_plays()
+
+    self.catch_up()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes in every row the columns don't have yet, so they can be used
+  # ---------------------------------------------------------------------------
+  def finish(self):
+
+    self._take_rows(None)
+    self._update_plays()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes in the next rows of the table, starting again from the first row
+  #   if the table has been emptied or replaced
+  #
+  # INPUT PARAMETERS:
+  #   count - most rows to take in, or None for every row
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _take_rows(self, count):
+
+    # local variables
+    folders, folder_ids, names = self.mp3_list.columns()
+    stop = len(folder_ids)
+
+    if self.generation != self.mp3_list.generation or self.folders is not folders:
+      self._reset()
+
+    if count is not None:
+      stop = min(self.size + count, stop)
+
+    if self.size < stop:
+      self._extend(folders, folder_ids, names, stop)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds rows of the end of the table to the columns. Their names are
+  #   ranked among the names already there, any new folders among the
+  #   folders, and their play counts are looked up in the history; song
+  #   lengths are made again when they are next asked for.
+  #
+  # INPUT PARAMETERS:
+  #   folders - list of folders of the table
+  #   folder_ids - folder number of each row of the table
+  #   names - song name of each row of the table
+  #   stop - row after the last one to add
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _extend(self, folders, folder_ids, names, stop):
+
+    # local variables
+    new_ids = numpy.frombuffer(folder_ids, dtype=numpy.uint32)[self.size:stop]
+    new_names = numpy.empty(len(new_ids), dtype=object)
+    new_plays = numpy.zeros(len(new_ids), dtype=numpy.int64)
+
+    new_names[:] = names[self.size:stop]
+
+    if len(self._folder_rank) < len(folders):
+      self._add_folders(folders)
+
+    self._vocabulary, shift, new_ranks = add_ranks(self._vocabulary, new_names)
+    if shift is not None:
+      self.name_rank += shift[self.name_rank]
+
+    # a few rows are looked up one at a time, more rows than the history has
+    # songs are counted all at once below
+    if self.history is not None and len(new_ids) <= len(self.history.counts):
+      get_totals = self.history.counts.get
+      for offset, (folder_id, name) in enumerate(zip(new_ids.tolist(), new_names)):
+        totals = get_totals(folders[folder_id] + "/" + name)
+        if totals is not None:
+          new_plays[offset] = totals[PLAYS_COLUMN]
+
+    self.folders = folders
+    self.folder_id = self._grow('folder_id', new_ids)
+    self.names = self._grow('names', new_names)
+    self.name_rank = self._grow('name_rank', new_ranks)
+    self.path_hash = self._grow('path_hash', path_hashes(self._folder_hash[new_ids], new_names,
+                                                         len(new_names)))
+    self.play_count = self._grow('play_count', new_plays)
+    self._keys.pop('duration', None)
+
+    # rows added while the rows are still in the tag reader's order are where
+    # it has them, otherwise it hasn't read them
+    if self._source_row is not None:
+      if self.generation == self._source_generation:
+        added = numpy.arange(self.size, stop, dtype=numpy.int64)
+      else:
+        added = numpy.full(len(new_ids), -1, dtype=numpy.int64)
+      self._source_row = numpy.concatenate((self._source_row, added))
+
+    self.size = stop
+
+    if self.history is not None and len(new_ids) > len(self.history.counts):
+      self._count_plays(self.play_count, list(self.history.counts))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds values for new rows to the end of one column. Each column is kept
+  #   in an array with room to spare, twice the size it needed the last time
+  #   it ran out, so rows taken in a chunk at a time aren't copied every time.
+  #
+  # INPUT PARAMETERS:
+  #   name - name of the column
+  #   values - array of the values of the new rows
+  #
+  # RETURN:
+  #   the column with the new values on the end
+  # ---------------------------------------------------------------------------
+  def _grow(self, name, values):
+
+    # local variables
+    column = getattr(self, name)
+    room = self._room.get(name)
+    size = self.size + len(values)
+
+    if room is None or len(room) < size:
+      room = numpy.empty(2 * size, dtype=column.dtype)
+      room[:self.size] = column
+      self._room[name] = room
+
+    room[self.size:size] = values
+
+    return room[:size]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Ranks and hashes the folders added to the table since the last ones
+  #   were ranked
+  # ---------------------------------------------------------------------------
+  def _add_folders(self, folders):
+
+    # local variables
+    new_folders = numpy.empty(len(folders) - len(self._folder_rank), dtype=object)
+
+    new_folders[:] = folders[len(self._folder_rank):]
+    self._folder_hash = numpy.concatenate((self._folder_hash, numpy.fromiter(
+      map(hash, new_folders), dtype=numpy.int64, count=len(new_folders))))
+    self._folder_vocabulary, shift, new_ranks = add_ranks(self._folder_vocabulary,
+                                                          new_folders)
+    if shift is not None:
+      self._folder_rank += shift[self._folder_rank]
+    self._folder_rank = numpy.concatenate((self._folder_rank, new_ranks))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns one sort key column, making it the first time
+  #
+  # INPUT PARAMETERS:
+  #   name - one of SORT_KEYS
+  #
+  # RETURN:
+  #   int64 array with one non-negative value per row
+  # ---------------------------------------------------------------------------
+  def key(self, name):
+
+    # folder and name ranks and play counts are kept as the rows come in
+    if name == 'folder':
+      return self._folder_rank[self.folder_id]
+    if name == 'name':
+      return self.name_rank
+    if name == 'plays':
+      self._update_plays()
+      return self.play_count
+
+    # song lengths are made again once more tags have been read
+    if name == 'duration' and self._durations_read != self._tags_read():
+      self.forget('duration')
+
+    column = self._keys.get(name)
+
+    if column is None:
+      if name == 'duration':
+        column = self.durations()
+      else:
+        raise KeyError(name)
+      self._keys[name] = column
+
+    return column
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Tells how far the tag reader has got, to know when the song lengths
+  #   have changed
+  # ---------------------------------------------------------------------------
+  def _tags_read(self):
+
+    # local variables
+    metadata = self.metadata
+
+    if metadata is None:
+      return None
+
+    return metadata.job_id, metadata.songs_read
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the length of each song in ms, with songs whose tags haven't
+  #   been read just longer than the longest song. The tag reader keeps the
+  #   lengths in the order the list was in when it started. The rows are
+  #   matched to that order the first time they are needed, which can be done
+  #   as long as the rows haven't been moved since; the match is carried
+  #   along like the other columns, so lengths read later are picked up
+  #   straight from the reader. Otherwise each song is looked up.
+  # ---------------------------------------------------------------------------
+  def durations(self):
+
+    # local variables
+    metadata = self.metadata
+    lengths = numpy.full(self.size, UNKNOWN_DURATION, dtype=numpy.int64)
+
+    self._durations_read = self._tags_read()
+    self._match_source()
+
+    # rows the reader has in its order are copied from it, the rest are
+    # looked up one at a time
+    missing = numpy.arange(self.size)
+    if metadata is None:
+      missing = missing[:0]
+    elif metadata.job_id == self._source_job:
+      read = numpy.frombuffer(metadata.row_values[:], dtype=numpy.int64)
+      have = (self._source_row >= 0) & (self._source_row < len(read))
+      lengths[have] = read[self._source_row[have]]
+      missing = numpy.flatnonzero(self._source_row < 0)
+
+    for index, folder_id, name in zip(missing.tolist(), self.folder_id[missing].tolist(),
+                                      self.names[missing]):
+      tags = metadata.lookup(self.folders[folder_id] + "/" + name)
+      if tags is not None:
+        lengths[index] = tags[DURATION_COLUMN]
+
+    unknown = lengths == UNKNOWN_DURATION
+    lengths[unknown] = lengths.max() + 1 if self.size > 0 else 0
+
+    return lengths
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Matches the rows to the order the tag reader keeps the song lengths in,
+  #   if it has started a new read since the last match and the rows are
+  #   still in the order they were in when it started
+  # ---------------------------------------------------------------------------
+  def _match_source(self):
+
+    # local variables
+    metadata = self.metadata
+
+    if (metadata is not None and metadata.job_id != self._source_job and
+        metadata.row_generation == self.generation):
+      self._source_job = metadata.job_id
+      self._source_generation = self.generation
+      self._source_row = numpy.arange(self.size, dtype=numpy.int64)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Brings the play counts up to date with the songs played since they were
+  #   last looked at, or counts them all again if the history has loaded its
+  #   old totals since
+  # ---------------------------------------------------------------------------
+  def _update_plays(self):
+
+    # local variables
+    history = self.history
+
+    if history is None:
+      return
+
+    generation, changed = history.take_changes()
+
+    if generation != self._totals_generation:
+      self.play_count = numpy.zeros(self.size, dtype=numpy.int64)
+      self._count_plays(self.play_count, list(history.counts))
+      self._totals_generation = generation
+    elif len(changed) > 0:
+      self._count_plays(self.play_count, [path for path in changed if path in history.counts])
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Sets the play count of the rows of some songs. Each row's path is kept
+  #   as a number made from hashes, so the rows are matched to the songs with
+  #   one sorted search.
+  #
+  # INPUT PARAMETERS:
+  #   counts - int64 array of the play count of each row, changed in place
+  #   paths - list of the paths of songs in the play history
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _count_plays(self, counts, paths):
+
+    # local variables
+    totals = self.history.counts
+    songs = path_hashes(numpy.fromiter((hash(path.rpartition('/')[0]) for path in paths),
+                                       dtype=numpy.int64, count=len(paths)),
+                        (path.rpartition('/')[2] for path in paths), len(paths))
+    plays = numpy.fromiter((totals[path][PLAYS_COLUMN] for path in paths),
+                           dtype=numpy.int64, count=len(paths))
+
+    if len(songs) == 0 or self.size == 0:
+      return
+
+    order = numpy.argsort(songs)
+    songs = songs[order]
+    rows = numpy.flatnonzero(numpy.isin(self.path_hash, songs))
+    counts[rows] = plays[order[numpy.searchsorted(songs, self.path_hash[rows])]]
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Drops a sort key column whose values have changed, so it is made again
+  #   the next time it is asked for
+  # ---------------------------------------------------------------------------
+  def forget(self, name):
+
+    self._keys.pop(name, None)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns a mask of the rows whose folder is at or below a folder
+  # ---------------------------------------------------------------------------
+  def in_folder(self, folder_name):
+
+    # local variables
+    prefix = folder_name.rstrip('/') + '/'
+    matches = numpy.array([folder == folder_name or folder.startswith(prefix)
+                           for folder in self.folders], dtype=bool)
+
+    return matches[self.folder_id]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Follows songs just taken out of the table with remove() or
+  #   remove_rows(). Nothing is done if the table has changed any other way
+  #   since the columns were last brought up to date; catch_up() then starts
+  #   again instead.
+  #
+  # INPUT PARAMETERS:
+  #   removed - sorted list of the indexes the removed songs had
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def follow_removed(self, removed):
+
+    # local variables
+    mask = numpy.ones(self.size, dtype=bool)
+    removed = numpy.array(removed, dtype=numpy.int64)
+
+    if len(removed) == 0 or self.generation + 1 != self.mp3_list.generation:
+      return
+
+    # rows added since the last catch_up() aren't in the columns yet
+    mask[removed[removed < self.size]] = False
+    order = numpy.flatnonzero(mask)
+    self._follow(order, self.folder_id[order], self.names[order])
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Rearranges the columns the same way the table has just been
+  #
+  # INPUT PARAMETERS:
+  #   order - array of the old index of each new row
+  #   folder_id - array of the folder number of each new row
+  #   names - array of the song name of each new row
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _follow(self, order, folder_id, names):
+
+    # the rows can only be matched to the tag reader's order before they move
+    self._match_source()
+
+    self.generation = self.mp3_list.generation
+    self.size = len(order)
+    self.folder_id = folder_id
+    self.names = names
+    self.name_rank = self.name_rank[order]
+    self.path_hash = self.path_hash[order]
+    self.play_count = self.play_count[order]
+    self._room = {}
+    self._keys = {name: column[order] for name, column in self._keys.items()}
+
+    if self._source_row is not None:
+      self._source_row = self._source_row[order]
+
+    return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out the order of the rows sorted by several keys
+#
+# INPUT PARAMETERS:
+#   columns - TrackColumns of the list
+#   keys - list of (key name, descending) pairs, most important first
+#
+# RETURN:
+#   int64 array of row indexes in sorted order; equal rows keep their order
+# -----------------------------------------------------------------------------
+def sort_order(columns, keys):
+
+  # local variables
+  size = columns.size
+  packed = numpy.zeros(size, dtype=numpy.int64)
+  span = 1
+
+  if size == 0:
+    return packed
+
+  # each key goes into the packed number below the keys before it
+  for name, descending in keys:
+    column = columns.key(name)
+    key_span = int(column.max()) + 1
+    if descending:
+      column = key_span - 1 - column
+
+    # rank what has been packed so far again rather than overflow
+    if span * key_span * size >= KEY_LIMIT:
+      packed = dense_rank(packed)
+      span = int(packed.max()) + 1
+      if span * key_span * size >= KEY_LIMIT:
+        column = dense_rank(column)
+        key_span = int(column.max()) + 1
+
+    packed = packed * key_span + column
+    span *= key_span
+
+  # the row number goes last, so sorting the numbers sorts the rows
+  packed = packed * size + numpy.arange(size, dtype=numpy.int64)
+  packed.sort()
+
+  return packed % size
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function sorts the list in place
+#
+# INPUT PARAMETERS:
+#   columns - TrackColumns of the list
+#   keys - list of (key name, descending) pairs, most important first
+#
+# RETURN:
+#   int64 array of the new index of every old row
+# -----------------------------------------------------------------------------
+def sort_rows(columns, keys):
+
+  return _reorder(columns, sort_order(columns, keys))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function keeps only the rows a boolean mask picks, in order
+#
+# INPUT PARAMETERS:
+#   columns - TrackColumns of the list
+#   mask - boolean array with one value per row
+#
+# RETURN:
+#   int64 array of the new index of every old row, -1 for rows taken out
+# -----------------------------------------------------------------------------
+def keep_rows(columns, mask):
+
+  return _reorder(columns, numpy.flatnonzero(mask))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function takes rows out of the list by index
+#
+# INPUT PARAMETERS:
+#   columns - TrackColumns of the list
+#   indexes - iterable of row indexes to take out
+#
+# RETURN:
+#   int64 array of the new index of every old row, -1 for rows taken out
+# -----------------------------------------------------------------------------
+def drop_rows(columns, indexes):
+
+  # local variables
+  mask = numpy.ones(columns.size, dtype=bool)
+
+  mask[numpy.fromiter(indexes, dtype=numpy.int64)] = False
+
+  return keep_rows(columns, mask)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function hands a new order of rows to the table
+#
+# INPUT PARAMETERS:
+#   columns - TrackColumns of the list
+#   order - array of the old index of each new row
+#
+# RETURN:
+#   int64 array of the new index of every old row, -1 for rows taken out
+# -----------------------------------------------------------------------------
+def _reorder(columns, order):
+
+  # local variables
+  new_index = numpy.full(columns.size, -1, dtype=numpy.int64)
+  folder_id = columns.folder_id[order]
+  names = columns.names[order]
+
+  new_index[order] = numpy.arange(len(order), dtype=numpy.int64)
+
+  # the table is handed the name array itself, and only makes a list of it
+  # if songs are added to it later
+  columns.mp3_list.replace_rows(array(FOLDER_ID_TYPE, folder_id.tobytes()), names)
+  columns._follow(order, folder_id, names)
+
+  return new_index
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function adds the songs of several saved playlists to the end of
+#   the list, a whole playlist at a time
+#
+# INPUT PARAMETERS:
+#   mp3_list - the TrackTable to add to
+#   playlist_names - paths of the playlist files
+#
+# RETURN:
+#   number of songs added
+# -----------------------------------------------------------------------------
+def merge(mp3_list, playlist_names):
+
+  # local variables
+  songs_before = len(mp3_list)
+
+  for playlist_name in playlist_names:
+    reader = PlaylistReader(playlist_name)
+    try:
+      mp3_list.extend_columns(*reader.columns())
+    finally:
+      reader.close()
+
+  return len(mp3_list) - songs_before
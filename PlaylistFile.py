@@ -0,0 +1,402 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlaylistFile.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file reads and writes saved playlists. Playlists are stored in a
+#   small versioned binary format made of a header, a table of folders, a
+#   fixed size table of rows and a pool of UTF-8 text:
+#
+#     header       magic, version, flags, row count, folder count and the
+#                  offsets of the three sections below
+#     folder table one (pool offset, length) entry per folder
+#     row table    one (folder number, pool offset, length) entry per song
+#     string pool  the folder and song name text
+#
+#   Because every row has the same size, the reader can memory map the file
+#   and decode any one row on its own. Opening a playlist only reads the
+#   header, so the first song can be loaded right away and the other rows are
+#   decoded when they are needed. Playlists saved by older versions of the
+#   player with pickle are still read, through an unpickler that only allows
+#   plain lists and strings.
+#
+# *****************************************************************************
+
+# modules used by this file
+import io
+import os
+import mmap
+import struct
+import pickle
+from array import array
+from TrackTable import song_path
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# file identification and default file ending
+PLAYLIST_MAGIC = b'MP3PLST\x00'
+PLAYLIST_VERSION = 1
+PLAYLIST_SUFFIX = '.mp3pl'
+
+# header: magic, version, flags, row count, folder count, folder table
+# offset, row table offset, string pool offset
+HEADER = struct.Struct('<8sHHIIQQQ')
+
+# folder table entry: pool offset, length
+FOLDER_ENTRY = struct.Struct('<QI')
+
+# row table entry: folder number, pool offset of the song name, length
+ROW_ENTRY = struct.Struct('<IQI')
+
+# text encoding of the string pool
+TEXT_ENCODING = 'utf-8'
+
+# array type code for the folder number of each row (unsigned 32 bit)
+FOLDER_ID_TYPE = 'I'
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This exception is raised for a playlist file that can't be read
+# -----------------------------------------------------------------------------
+class PlaylistError(ValueError):
+  pass
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class only lets pickle build the plain lists and strings an old
+#   playlist is made of, so loading an untrusted file can't run any code
+# -----------------------------------------------------------------------------
+class LegacyUnpickler(pickle.Unpickler):
+
+  def find_class(self, module, name):
+    raise pickle.UnpicklingError('old playlist refers to ' + module + '.' + name)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function checks whether a file is in the binary playlist format
+#
+# INPUT PARAMETERS:
+#   playlist_name - path of the file
+#
+# RETURN:
+#   True if the file starts with the playlist magic
+# -----------------------------------------------------------------------------
+def is_playlist_file(playlist_name):
+
+  with open(playlist_name, 'rb') as playlist_open:
+    return playlist_open.read(len(PLAYLIST_MAGIC)) == PLAYLIST_MAGIC
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function writes songs to a playlist file in the binary format. The
+#   file is written next to the old one and swapped in at the end, so a
+#   failed save never leaves a half written playlist behind.
+#
+# INPUT PARAMETERS:
+#   playlist_name - path of the file to write
+#   rows - iterable of (folder, song name) rows
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def write_playlist(playlist_name, rows):
+
+  # local variables
+  pool = io.BytesIO()
+  folder_table = io.BytesIO()
+  row_table = io.BytesIO()
+  folder_ids = {}
+  row_count = 0
+
+  # build the three sections, storing each folder's text only once
+  for folder, name in rows:
+    folder_id = folder_ids.get(folder)
+
+    if folder_id is None:
+      folder_id = len(folder_ids)
+      folder_ids[folder] = folder_id
+      text = folder.encode(TEXT_ENCODING, 'surrogateescape')
+      folder_table.write(FOLDER_ENTRY.pack(pool.tell(), len(text)))
+      pool.write(text)
+
+    text = name.encode(TEXT_ENCODING, 'surrogateescape')
+    row_table.write(ROW_ENTRY.pack(folder_id, pool.tell(), len(text)))
+    pool.write(text)
+    row_count += 1
+
+  # sections follow the header in order: folders, rows, string pool
+  folder_offset = HEADER.size
+  row_offset = folder_offset + folder_table.tell()
+  pool_offset = row_offset + row_table.tell()
+  header = HEADER.pack(PLAYLIST_MAGIC, PLAYLIST_VERSION, 0, row_count, len(folder_ids),
+                       folder_offset, row_offset, pool_offset)
+
+  # write to a temporary file, then replace the playlist in one step
+  temp_name = playlist_name + '.tmp'
+  try: # disk might be full or the folder read only...
+    with open(temp_name, 'wb') as playlist_save:
+      playlist_save.write(header)
+      playlist_save.write(folder_table.getbuffer())
+      playlist_save.write(row_table.getbuffer())
+      playlist_save.write(pool.getbuffer())
+
+    os.replace(temp_name, playlist_name)
+
+  # don't leave the half written file behind
+  except OSError:
+    try:
+      os.remove(temp_name)
+    except OSError:
+      pass
+    raise
+
+  return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads a playlist saved by older versions of the player,
+#   which pickled the list of [folder, song name] lists
+#
+# INPUT PARAMETERS:
+#   playlist_name - path of the file
+#
+# RETURN:
+#   list of [folder, song name] rows
+# -----------------------------------------------------------------------------
+def read_legacy_playlist(playlist_name):
+
+  with open(playlist_name, 'rb') as playlist_open:
+    written_list = LegacyUnpickler(playlist_open).load()
+
+  # make sure the file really held a list of [folder, song name] rows
+  if not isinstance(written_list, list):
+    raise PlaylistError('old playlist is not a list')
+
+  for item in written_list:
+    if (not isinstance(item, (list, tuple)) or len(item) != 2 or
+        not isinstance(item[0], str) or not isinstance(item[1], str)):
+      raise PlaylistError('old playlist has an invalid row')
+
+  return written_list
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class gives lazy, read only access to a binary playlist through a
+#   memory map. Rows are decoded one at a time when they are asked for.
+# -----------------------------------------------------------------------------
+class PlaylistReader:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Opens a playlist and checks its header
+  #
+  # INPUT PARAMETERS:
+  #   playlist_name - path of the file
+  # ---------------------------------------------------------------------------
+  def __init__(self, playlist_name):
+
+    self.playlist_name = playlist_name
+    self._file = open(playlist_name, 'rb')
+
+    try: # file might be too short or not a playlist...
+      self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+      self._read_header()
+    except (OSError, ValueError, struct.error):
+      self._file.close()
+      raise PlaylistError('not a valid playlist: ' + playlist_name)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Reads the header and makes sure every section fits inside the file
+  # ---------------------------------------------------------------------------
+  def _read_header(self):
+
+    (magic, version, flags, self.row_count, self.folder_count, self._folder_offset,
+     self._row_offset, self._pool_offset) = HEADER.unpack_from(self._map, 0)
+
+    if magic != PLAYLIST_MAGIC or version > PLAYLIST_VERSION:
+      raise PlaylistError('unknown playlist format')
+
+    if (self._folder_offset + self.folder_count * FOLDER_ENTRY.size > len(self._map) or
+        self._row_offset + self.row_count * ROW_ENTRY.size > len(self._map) or
+        self._pool_offset > len(self._map)):
+      raise PlaylistError('playlist file is cut short')
+
+    # folders are decoded the first time a row needs them
+    self._folders = [None] * self.folder_count
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Number of songs in the playlist
+  # ---------------------------------------------------------------------------
+  def __len__(self):
+
+    return self.row_count
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Decodes text from the string pool, which must hold all of it
+  # ---------------------------------------------------------------------------
+  def _text(self, offset, length):
+
+    start = self._pool_offset + offset
+
+    if start + length > len(self._map):
+      raise PlaylistError('playlist text is outside the file')
+
+    return self._map[start:start + length].decode(TEXT_ENCODING, 'surrogateescape')
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns one folder, decoding it the first time
+  # ---------------------------------------------------------------------------
+  def folder(self, folder_id):
+
+    folder = self._folders[folder_id]
+
+    if folder is None:
+      offset, length = FOLDER_ENTRY.unpack_from(self._map, self._folder_offset +
+                                                folder_id * FOLDER_ENTRY.size)
+      folder = self._text(offset, length)
+      self._folders[folder_id] = folder
+
+    return folder
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Decodes one row of the playlist
+  #
+  # INPUT PARAMETERS:
+  #   index - row number, negative numbers count from the end
+  #
+  # RETURN:
+  #   (folder, song name)
+  # ---------------------------------------------------------------------------
+  def row(self, index):
+
+    if index < 0:
+      index += self.row_count
+    if index < 0 or index >= self.row_count:
+      raise IndexError('playlist index out of range')
+
+    folder_id, offset, length = ROW_ENTRY.unpack_from(self._map, self._row_offset +
+                                                      index * ROW_ENTRY.size)
+
+    if folder_id >= self.folder_count:
+      raise PlaylistError('playlist row has an unknown folder')
+
+    return self.folder(folder_id), self._text(offset, length)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Goes through every row in order
+  # ---------------------------------------------------------------------------
+  def __iter__(self):
+
+    for index in range(self.row_count):
+      yield self.row(index)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the full path of every row, one at a time, from a memory map of
+  #   its own, so the paths can be gone through on another thread even after
+  #   this reader is closed
+  #
+  # RETURN:
+  #   generator of full song paths, in row order
+  # ---------------------------------------------------------------------------
+  def paths(self):
+
+    return self._reopened_paths(PlaylistReader(self.playlist_name))
+
+  @staticmethod
+  def _reopened_paths(reader):
+
+    try:
+      for folder, name in reader:
+        yield song_path(folder, name)
+    finally:
+      reader.close()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Decodes the whole playlist as columns, which is much quicker than going
+  #   through it row by row
+  #
+  # RETURN:
+  #   list of folders, array of the folder number of each row, list of the
+  #   song name of each row
+  # ---------------------------------------------------------------------------
+  def columns(self):
+
+    # local variables
+    folder_ids, names = self.column_slice(0, self.row_count)
+
+    return self.folders(), folder_ids, names
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns every folder of the playlist, in folder number order
+  # ---------------------------------------------------------------------------
+  def folders(self):
+
+    return [self.folder(folder_id) for folder_id in range(self.folder_count)]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Decodes some of the rows of the playlist as columns
+  #
+  # INPUT PARAMETERS:
+  #   start - first row to decode
+  #   stop - row after the last one to decode
+  #
+  # RETURN:
+  #   array of the folder number of each row, list of the song name of each
+  #   row
+  # ---------------------------------------------------------------------------
+  def column_slice(self, start, stop):
+
+    # local variables
+    rows = memoryview(self._map)[self._row_offset + start * ROW_ENTRY.size:
+                                 self._row_offset + stop * ROW_ENTRY.size]
+    pool = self._pool_offset
+    end = len(self._map)
+    folder_ids = array(FOLDER_ID_TYPE)
+    names = []
+
+    for folder_id, offset, length in ROW_ENTRY.iter_unpack(rows):
+      if pool + offset + length > end:
+        break
+      folder_ids.append(folder_id)
+      names.append(self._map[pool + offset:pool + offset + length].decode(TEXT_ENCODING,
+                                                                          'surrogateescape'))
+    rows.release()
+
+    if len(names) < stop - start:
+      raise PlaylistError('playlist text is outside the file')
+
+    if len(folder_ids) > 0 and max(folder_ids) >= self.folder_count:
+      raise PlaylistError('playlist row has an unknown folder')
+
+    return folder_ids, names
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Releases the memory map and file
+  # ---------------------------------------------------------------------------
+  def close(self):
+
+    self._map.close()
+    self._file.close()
+
+    return
@@ -0,0 +1,406 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  PlaylistText.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file reads and writes playlists in the text formats other players
+#   use, so lists can be swapped with them:
+#
+#     .m3u / .m3u8  one song per line, with #EXTM3U and #EXTINF lines giving
+#                   the length and title of each song in the extended form
+#     .pls          an ini style [playlist] section of FileN, TitleN and
+#                   LengthN entries
+#
+#   Both are read and written a line at a time, so even a playlist with a
+#   million songs never has to fit in memory as text. Songs listed relative
+#   to the playlist are found next to it, and file:// URLs are turned back
+#   into paths; entries that aren't files at all, such as web streams, are
+#   left out.
+#
+#   Opening a playlist runs on a background thread like a folder scan. The
+#   songs are checked for in batches of os.stat calls spread over a pool of
+#   threads, a few batches ahead of the reader, and handed back in list order
+#   through a queue the GUI polls. Songs that can't be found are counted and
+#   listed for a report instead of failing the whole playlist.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import stat
+import queue
+import threading
+import collections
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from PlaylistFile import PlaylistError
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# file endings of the text formats
+M3U_SUFFIXES = ('.m3u', '.m3u8')
+PLS_SUFFIX = '.pls'
+
+# first line of an extended M3U playlist, and the line before each song
+EXTM3U_HEADER = '#EXTM3U'
+EXTINF_PREFIX = '#EXTINF:'
+
+# section and keys of a PLS playlist
+PLS_SECTION = '[playlist]'
+PLS_FILE_KEY = 'file'
+PLS_VERSION = 2
+
+# length written for a song whose length isn't known
+UNKNOWN_LENGTH = -1
+
+# text encoding; bytes that aren't UTF-8 are kept as they are in file names
+TEXT_ENCODING = 'utf-8'
+TEXT_ERRORS = 'surrogateescape'
+
+# paths checked per job, jobs running at once, and jobs waiting ahead of the
+# one being handed back
+STAT_BATCH = 500
+STAT_WORKERS = 8
+STAT_AHEAD = 2 * STAT_WORKERS
+
+# most missing songs listed in the report; the rest are only counted
+MAX_REPORTED = 1000
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function checks whether a file is named as a text playlist
+# -----------------------------------------------------------------------------
+def is_text_playlist(playlist_name):
+
+  return playlist_name.lower().endswith(M3U_SUFFIXES + (PLS_SUFFIX,))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function turns one entry of a playlist into the full path of a song
+#
+# INPUT PARAMETERS:
+#   location - the entry as written in the playlist
+#   base_folder - folder of the playlist, relative entries are found from it
+#
+# RETURN:
+#   full path, or None if the entry isn't a file
+# -----------------------------------------------------------------------------
+def resolve_location(location, base_folder):
+
+  # file:// URLs are paths; any other URL, such as a web stream, isn't a file
+  if '://' in location:
+    parts = urllib.parse.urlsplit(location)
+    if parts.scheme.lower() != 'file':
+      return None
+    location = urllib.request.url2pathname(parts.path)
+
+  # playlists written on Windows separate folders with backslashes
+  if os.sep == '/' and '\\' in location and '/' not in location:
+    location = location.replace('\\', '/')
+
+  return os.path.normpath(os.path.join(base_folder, os.path.expanduser(location)))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   These functions go through the lines of an M3U or PLS playlist, one at a
+#   time, yielding each song entry as written
+# -----------------------------------------------------------------------------
+def m3u_locations(lines):
+
+  for line in lines:
+    line = line.strip()
+    if len(line) > 0 and not line.startswith('#'):
+      yield line
+
+def pls_locations(lines):
+
+  for line in lines:
+    key, equals, value = line.strip().partition('=')
+    key = key.strip().lower()
+
+    # FileN=path, where N is the number of the entry
+    if equals and key.startswith(PLS_FILE_KEY) and key[len(PLS_FILE_KEY):].isdigit():
+      value = value.strip()
+      if len(value) > 0:
+        yield value
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads the songs of a text playlist, a line at a time
+#
+# INPUT PARAMETERS:
+#   playlist_name - path of the playlist
+#
+# RETURN:
+#   generator of full song paths, or None for an entry that isn't a file
+# -----------------------------------------------------------------------------
+def read_text_playlist(playlist_name):
+
+  # local variables
+  base_folder = os.path.dirname(os.path.abspath(playlist_name))
+  read_locations = pls_locations if playlist_name.lower().endswith(PLS_SUFFIX) else m3u_locations
+
+  # utf-8-sig drops the byte order mark some players start the file with
+  with open(playlist_name, 'r', encoding=TEXT_ENCODING + '-sig', errors=TEXT_ERRORS,
+            newline=None) as playlist_open:
+    for location in read_locations(playlist_open):
+      yield resolve_location(location, base_folder)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function checks a batch of songs are there, in a worker thread
+#
+# INPUT PARAMETERS:
+#   paths - list of full song paths
+#
+# RETURN:
+#   list of [folder, song name] rows of the songs found, list of the paths
+#   of the songs that aren't
+# -----------------------------------------------------------------------------
+def stat_batch(paths):
+
+  # local variables
+  rows = []
+  missing = []
+
+  for path in paths:
+    try:
+      found = stat.S_ISREG(os.stat(path).st_mode)
+    except (OSError, ValueError):
+      found = False
+
+    if found:
+      rows.append(list(os.path.split(path)))
+    else:
+      missing.append(path)
+
+  return rows, missing
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function writes songs to a text playlist. It is written a line at a
+#   time next to the old file and swapped in at the end, so a failed save
+#   never leaves half a playlist behind. Songs in or under the playlist's
+#   folder are written relative to it, so the folder can be moved as a whole.
+#
+# INPUT PARAMETERS:
+#   playlist_name - path of the file to write; .pls writes PLS, anything
+#                   else extended M3U
+#   songs - iterable of (full path, length in seconds or UNKNOWN_LENGTH,
+#           title)
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def write_text_playlist(playlist_name, songs):
+
+  # local variables
+  base_folder = os.path.dirname(os.path.abspath(playlist_name))
+  inside = base_folder.rstrip(os.sep) + os.sep
+  pls = playlist_name.lower().endswith(PLS_SUFFIX)
+  temp_name = playlist_name + '.tmp'
+  number = 0
+
+  try: # disk might be full or the folder read only...
+    with open(temp_name, 'w', encoding=TEXT_ENCODING, errors=TEXT_ERRORS,
+              newline='\n') as playlist_save:
+      playlist_save.write((PLS_SECTION if pls else EXTM3U_HEADER) + '\n')
+
+      for path, length, title in songs:
+        location = path[len(inside):] if path.startswith(inside) else path
+        title = ' '.join(title.split())
+        number += 1
+
+        if pls:
+          playlist_save.write('File%d=%s\nTitle%d=%s\nLength%d=%d\n' %
+                              (number, location, number, title, number, length))
+        else:
+          playlist_save.write('%s%d,%s\n%s\n' % (EXTINF_PREFIX, length, title, location))
+
+      # PLS gives the number of entries, which is only known at the end
+      if pls:
+        playlist_save.write('NumberOfEntries=%d\nVersion=%d\n' % (number, PLS_VERSION))
+
+    os.replace(temp_name, playlist_name)
+
+  # don't leave the half written file behind
+  except OSError:
+    try:
+      os.remove(temp_name)
+    except OSError:
+      pass
+    raise
+
+  return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class reads a text playlist on a background thread and hands its
+#   songs to the GUI in batches, keeping count of what couldn't be found
+# -----------------------------------------------------------------------------
+class PlaylistImport:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle importer
+  #
+  # INPUT PARAMETERS:
+  #   max_workers - number of threads checking songs at the same time
+  #   batch_size - number of songs checked per job and sent to the GUI at
+  #                once
+  # ---------------------------------------------------------------------------
+  def __init__(self, max_workers=STAT_WORKERS, batch_size=STAT_BATCH):
+
+    self.max_workers = max_workers
+    self.batch_size = batch_size
+    self.playlist_name = ''
+    self.entries_read = 0
+    self.songs_found = 0
+    self.missing = []
+    self.missing_count = 0
+    self.skipped = 0
+    self.error = None
+    self.import_id = 0
+    self._results = queue.Queue()
+    self._cancel = threading.Event()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Cancels any running import and starts reading a new playlist
+  #
+  # INPUT PARAMETERS:
+  #   playlist_name - path of the playlist
+  #
+  # RETURN:
+  #   id of the new import, to be passed back in to poll()
+  # ---------------------------------------------------------------------------
+  def start(self, playlist_name):
+
+    self.cancel()
+    self.playlist_name = playlist_name
+    self.entries_read = 0
+    self.songs_found = 0
+    self.missing = []
+    self.missing_count = 0
+    self.skipped = 0
+    self.error = None
+    self._results = queue.Queue()
+    self._cancel = threading.Event()
+
+    reader = threading.Thread(target=self._read, daemon=True,
+                              args=(playlist_name, self._results, self._cancel))
+    reader.start()
+
+    return self.import_id
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Stops the running import. Any poll() for the old id returns None.
+  # ---------------------------------------------------------------------------
+  def cancel(self):
+
+    self._cancel.set()
+    self.import_id += 1
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Collects the song batches that have arrived since the last poll, and
+  #   the missing songs found meanwhile. Never blocks.
+  #
+  # INPUT PARAMETERS:
+  #   import_id - id returned by start()
+  #
+  # RETURN:
+  #   (list of song batches, True if the import is finished), or None if the
+  #   import has been cancelled or replaced by a newer one
+  # ---------------------------------------------------------------------------
+  def poll(self, import_id):
+
+    # local variables
+    batches = []
+    finished = False
+
+    if import_id != self.import_id:
+      return None
+
+    try:
+      while not finished:
+        (rows, missing, self.entries_read, self.skipped, self.error,
+         finished) = self._results.get_nowait()
+        self.songs_found += len(rows)
+        self.missing_count += len(missing)
+        self.missing.extend(missing[:MAX_REPORTED - len(self.missing)])
+        if len(rows) > 0:
+          batches.append(rows)
+    except queue.Empty:
+      pass
+
+    return batches, finished
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Background thread that reads the playlist a batch of songs at a time and
+  #   has them checked in the pool, keeping only a few batches in flight so
+  #   memory stays the same for any length of playlist. Its counts go out with
+  #   each batch, so a cancelled import never touches the next one's.
+  #
+  # INPUT PARAMETERS:
+  #   playlist_name - path of the playlist
+  #   results - queue the GUI reads batches from
+  #   cancel - event set when this import should stop early
+  # ---------------------------------------------------------------------------
+  def _read(self, playlist_name, results, cancel):
+
+    # local variables
+    batch = []
+    pending = collections.deque()
+    entries_read = 0
+    skipped = 0
+    error = None
+
+    with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+      try:
+        for path in read_text_playlist(playlist_name):
+          if cancel.is_set():
+            break
+
+          entries_read += 1
+          if path is None:
+            skipped += 1
+            continue
+
+          batch.append(path)
+          if len(batch) == self.batch_size:
+            pending.append(pool.submit(stat_batch, batch))
+            batch = []
+
+          # hand back the oldest batch once enough are waiting, which keeps
+          # the songs in playlist order
+          if len(pending) > STAT_AHEAD:
+            results.put(pending.popleft().result() + (entries_read, skipped, error, False))
+
+        if len(batch) > 0:
+          pending.append(pool.submit(stat_batch, batch))
+
+      # the songs read so far are still loaded
+      except (OSError, UnicodeError) as read_error:
+        error = PlaylistError('could not read ' + playlist_name + ': ' + str(read_error))
+
+      while len(pending) > 0 and not cancel.is_set():
+        results.put(pending.popleft().result() + (entries_read, skipped, error, False))
+
+    if not cancel.is_set():
+      results.put(([], [], entries_read, skipped, error, True))
+
+    return
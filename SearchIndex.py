@@ -0,0 +1,337 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  SearchIndex.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file finds songs in the loaded list as the user types. Every song's
+#   file name, artist and title are broken into three letter pieces
+#   (trigrams) and two letter pieces (bigrams), and for each piece the index
+#   keeps the numbers of the songs that contain it, in order. A search starts
+#   from the shortest list of the query's pieces and narrows it down with
+#   the others, so only songs holding every piece are checked for the words
+#   themselves, instead of going through the whole library. A word of two
+#   letters is looked up by its bigram, and one of three or more by its
+#   trigrams; single letters can't be looked up, so a query of only those
+#   finds nothing until more is typed.
+#
+#   The index is built a few thousand songs at a time from the tkinter main
+#   loop, so it keeps up with a folder while it is still being scanned
+#   without ever holding up the window. When tags are read later the songs
+#   are indexed again to add their artist and title, and the lists they were
+#   added to are put back in order.
+#
+# *****************************************************************************
+
+# modules used by this file
+from array import array
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# lengths of the pieces text is broken into
+GRAM_SIZE = 3
+BIGRAM_SIZE = 2
+
+# songs indexed each time the main loop is idle
+INDEX_CHUNK = 1000
+
+# posting lists put back in order each time the main loop is idle
+SORT_CHUNK = 200
+
+# most songs returned by a search
+MAX_RESULTS = 100
+
+# array type code for song numbers (unsigned 32 bit)
+SONG_ID_TYPE = 'I'
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the set of trigrams in a piece of text
+# -----------------------------------------------------------------------------
+def trigrams(text):
+
+  return {text[start:start + GRAM_SIZE] for start in range(len(text) - GRAM_SIZE + 1)}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the set of pieces a song's text is indexed under,
+#   its trigrams and bigrams
+# -----------------------------------------------------------------------------
+def grams(text):
+
+  return trigrams(text) | {text[start:start + BIGRAM_SIZE]
+                           for start in range(len(text) - BIGRAM_SIZE + 1)}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the pieces a word of a query is looked up by: its
+#   trigrams, the word itself if it is a bigram, or none for a single letter
+# -----------------------------------------------------------------------------
+def query_grams(word):
+
+  if len(word) == BIGRAM_SIZE:
+    return {word}
+
+  return trigrams(word)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a trigram index over the songs of a TrackTable that keeps
+#   itself up to date from the main loop
+# -----------------------------------------------------------------------------
+class SearchIndex:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an empty index, nothing is indexed until catch_up() is called
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window, used to index songs when idle
+  #   mp3_list - the TrackTable to index
+  #   metadata - MetadataReader the songs' titles come from
+  # ---------------------------------------------------------------------------
+  def __init__(self, root, mp3_list, metadata):
+
+    self.root = root
+    self.mp3_list = mp3_list
+    self.metadata = metadata
+    self.results = []
+    self._step_id = None
+    self._reset()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Forgets every song, used when the list is cleared or replaced
+  # ---------------------------------------------------------------------------
+  def _reset(self):
+
+    self.generation = self.mp3_list.generation
+    self.results = []
+    self.size = 0
+    self._texts = []
+    self._postings = {}
+    self._unsorted = set()
+    self._refresh_at = None
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the lower case text a song is searched by
+  # ---------------------------------------------------------------------------
+  def _song_text(self, index):
+
+    name = self.mp3_list.name(index)
+    title = self.mp3_list.title(index, self.metadata)
+
+    if title == name:
+      return name.casefold()
+
+    return (name + '\n' + title).casefold()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds a song to the posting list of each of its pieces
+  #
+  # INPUT PARAMETERS:
+  #   index - number of the song
+  #   grams - pieces to add it under
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _post(self, index, pieces):
+
+    # local variables
+    postings = self._postings
+
+    for gram in pieces:
+      songs = postings.get(gram)
+      if songs is None:
+        songs = array(SONG_ID_TYPE)
+        postings[gram] = songs
+      songs.append(index)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the songs under a trigram in list order, or None if there are
+  #   none, putting the list back in order first if songs were added to it
+  #   out of order
+  # ---------------------------------------------------------------------------
+  def _songs(self, gram):
+
+    # local variables
+    songs = self._postings.get(gram)
+
+    if gram in self._unsorted:
+      self._unsorted.discard(gram)
+      songs = array(SONG_ID_TYPE, sorted(songs))
+      self._postings[gram] = songs
+
+    return songs
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Indexes songs added to the list again once their tags have been read
+  # ---------------------------------------------------------------------------
+  def retag(self):
+
+    self._refresh_at = 0
+    self.catch_up()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Makes sure the index is being brought up to date with the list
+  # ---------------------------------------------------------------------------
+  def catch_up(self):
+
+    if self._step_id is None:
+      self._step_id = self.root.after_idle(self._step)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Indexes one chunk of new songs (or of songs whose tags changed, or puts
+  #   back in order some of the lists those were added to), then schedules
+  #   itself again if there is more to do
+  # ---------------------------------------------------------------------------
+  def _step(self):
+
+    # local variables
+    texts = self._texts
+    count = len(self.mp3_list)
+
+    self._step_id = None
+
+    if self.generation != self.mp3_list.generation:
+      self._reset()
+
+    # new songs at the end of the list
+    if self.size < count:
+      stop = min(self.size + INDEX_CHUNK, count)
+      for index in range(self.size, stop):
+        text = self._song_text(index)
+        texts.append(text)
+        self._post(index, grams(text))
+      self.size = stop
+
+    # songs that may have new tags; only trigrams they didn't have are added
+    elif self._refresh_at is not None:
+      stop = min(self._refresh_at + INDEX_CHUNK, self.size)
+      for index in range(self._refresh_at, stop):
+        text = self._song_text(index)
+        if text != texts[index]:
+          pieces = grams(text) - grams(texts[index])
+          self._post(index, pieces)
+          self._unsorted.update(pieces)
+          texts[index] = text
+      self._refresh_at = stop if stop < self.size else None
+
+    # lists songs were added to out of order
+    elif len(self._unsorted) > 0:
+      for gram in list(self._unsorted)[:SORT_CHUNK]:
+        self._songs(gram)
+
+    if self.size < count or self._refresh_at is not None or len(self._unsorted) > 0:
+      self._step_id = self.root.after_idle(self._step)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Finds the songs that contain every word of a query and keeps them as
+  #   the current results
+  #
+  # INPUT PARAMETERS:
+  #   query - text typed by the user
+  #   limit - most songs to return
+  #
+  # RETURN:
+  #   list of song numbers, in list order
+  # ---------------------------------------------------------------------------
+  def search(self, query, limit=MAX_RESULTS):
+
+    self.results = self._find(query.casefold().split(), limit)
+
+    return self.results
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the song number of one of the current results, or None if the
+  #   list has been replaced since the search
+  # ---------------------------------------------------------------------------
+  def result(self, position):
+
+    if self.generation != self.mp3_list.generation or position >= len(self.results):
+      return None
+
+    return self.results[position]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Finds the songs whose text holds every word
+  # ---------------------------------------------------------------------------
+  def _find(self, words, limit):
+
+    # local variables
+    texts = self._texts
+    postings = {}
+    candidates = None
+    found = []
+
+    if len(words) == 0 or self.generation != self.mp3_list.generation:
+      return found
+
+    # the pieces of one word are found in nearly the same songs, so only the
+    # rarest piece of each word narrows the search down
+    for word in words:
+      rarest = None
+      for gram in query_grams(word):
+        songs = self._songs(gram)
+        if songs is None:
+          return found
+        if rarest is None or len(songs) < len(rarest):
+          rarest = songs
+      if rarest is not None:
+        postings[id(rarest)] = rarest
+
+    # a query of only single letters can't be looked up and would have to
+    # check every song
+    if len(postings) == 0:
+      return found
+
+    # the songs holding every word's piece, starting from the shortest list so
+    # the set being narrowed down is never bigger than that
+    postings = sorted(postings.values(), key=len)
+    if len(postings) > 1:
+      candidates = set(postings[0])
+      for songs in postings[1:]:
+        candidates.intersection_update(songs)
+        if len(candidates) == 0:
+          return found
+
+    # every word has to appear in the song's text, not just its pieces. The
+    # shortest list gives the candidates in list order, so the search can
+    # stop as soon as it has enough.
+    for index in postings[0]:
+      if candidates is not None and index not in candidates:
+        continue
+      text = texts[index]
+      if all(word in text for word in words):
+        found.append(index)
+        if len(found) == limit:
+          break
+
+    return found
@@ -0,0 +1,210 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  SeekBar.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file is a seek bar that shows the waveform of the current song and
+#   how far into it the player is. Clicking the bar jumps to that point.
+#
+#   The waveform is one vertical line per pixel, made once and only moved
+#   when a new song is shown. While a song plays the bar checks the position
+#   a few times a second, but only recolours the lines between where it was
+#   and where it is now, and moves the cursor; the rest of the canvas is
+#   left alone, so keeping the bar up to date costs next to nothing.
+#
+# *****************************************************************************
+
+# modules used by this file
+import tkinter
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# default size of the bar in pixels
+BAR_WIDTH = 460
+BAR_HEIGHT = 40
+
+# ms between position updates while a song is playing
+TICK_DELAY = 200
+
+# largest peak value, a signed byte
+PEAK_SCALE = 128
+
+# colours of the bar
+BACKGROUND = 'white'
+PLAYED_FILL = '#3366cc'
+UNPLAYED_FILL = '#b0b0b0'
+CURSOR_FILL = 'red'
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class draws the waveform and position of the current song on a
+#   canvas and reports clicks on it as seeks
+# -----------------------------------------------------------------------------
+class SeekBar:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an empty bar; pack or grid self.frame to show it
+  #
+  # INPUT PARAMETERS:
+  #   parent - widget the bar is placed in
+  #   get_position - returns how far into the current song the player is,
+  #                  in ms
+  #   on_seek - called with a position in ms when the bar is clicked
+  #   width - width of the bar in pixels
+  #   height - height of the bar in pixels
+  # ---------------------------------------------------------------------------
+  def __init__(self, parent, get_position, on_seek, width=BAR_WIDTH, height=BAR_HEIGHT):
+
+    self.get_position = get_position
+    self.on_seek = on_seek
+    self.width = width
+    self.height = height
+    self.path = None
+    self.duration = 0
+    self.played = 0
+    self._playing = False
+    self._ticking = False
+
+    self.frame = tkinter.Frame(parent)
+    self.canvas = tkinter.Canvas(self.frame, width=width, height=height, bg=BACKGROUND,
+                                 highlightthickness=0)
+    self.canvas.pack()
+
+    # one line per pixel, drawn flat until a waveform is shown, and the cursor
+    # on top of them
+    self._lines = [self.canvas.create_line(x, height // 2, x, height // 2 + 1,
+                                           fill=UNPLAYED_FILL)
+                   for x in range(width)]
+    self._cursor = self.canvas.create_line(0, 0, 0, height, fill=CURSOR_FILL)
+
+    self.canvas.bind('<Button-1>', self._click)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Shows a new song from its start
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song, or None for no song
+  #   duration - length of the song in ms, or 0 if it isn't known
+  #   peaks - low and high signed byte of each column in turn, or None to
+  #           draw the bar flat
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def show(self, path, duration, peaks):
+
+    # local variables
+    canvas = self.canvas
+    middle = self.height // 2
+    scale = self.height / (2 * PEAK_SCALE)
+    columns = len(peaks) // 2 if peaks else 0
+
+    self.path = path
+    self.duration = max(duration, 0)
+
+    # signed bytes from the bytes of the peaks, without copying them
+    if columns > 0:
+      peaks = memoryview(peaks).cast('b')
+
+    for x, line in enumerate(self._lines):
+      low = high = 0
+      if columns > 0:
+        column = x * columns // self.width
+        low, high = peaks[2 * column], peaks[2 * column + 1]
+      canvas.coords(line, x, middle - int(high * scale), x, middle - int(low * scale) + 1)
+      canvas.itemconfigure(line, fill=UNPLAYED_FILL)
+
+    self.played = 0
+    canvas.coords(self._cursor, 0, 0, 0, self.height)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Moves the bar to a position, recolouring only the lines it has passed
+  #   since the last time
+  #
+  # INPUT PARAMETERS:
+  #   position - how far into the song, in ms
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def set_position(self, position):
+
+    # local variables
+    canvas = self.canvas
+    played = 0
+
+    if self.duration > 0:
+      played = max(0, min(position * self.width // self.duration, self.width))
+
+    if played > self.played:
+      for line in self._lines[self.played:played]:
+        canvas.itemconfigure(line, fill=PLAYED_FILL)
+    elif played < self.played:
+      for line in self._lines[played:self.played]:
+        canvas.itemconfigure(line, fill=UNPLAYED_FILL)
+
+    if played != self.played:
+      self.played = played
+      canvas.coords(self._cursor, played, 0, played, self.height)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts or stops following the position of the player
+  #
+  # INPUT PARAMETERS:
+  #   playing - True while a song is playing
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def set_playing(self, playing):
+
+    self._playing = playing
+
+    if playing and not self._ticking:
+      self._ticking = True
+      self.canvas.after(TICK_DELAY, self._tick)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Main loop: follows the position until the song stops playing
+  # ---------------------------------------------------------------------------
+  def _tick(self):
+
+    if not self._playing:
+      self._ticking = False
+      return
+
+    self.set_position(self.get_position())
+    self.canvas.after(TICK_DELAY, self._tick)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Seeks to the point of the song that was clicked, if its length is known
+  # ---------------------------------------------------------------------------
+  def _click(self, event):
+
+    if self.duration > 0:
+      x = max(0, min(event.x, self.width))
+      self.on_seek(x * self.duration // self.width)
+
+    return
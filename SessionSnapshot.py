@@ -0,0 +1,136 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  SessionSnapshot.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file saves the player's session when it quits and brings it back the
+#   next time it starts, so the last list of songs is there straight away
+#   without scanning its folder again. The songs are written as a binary
+#   playlist, which is memory mapped again on start up, so restoring even a
+#   very large list only reads a header. The rest of the session (where the
+#   list came from, the current song and how far into it the player was, the
+#   volume and the random and gapless boxes) is kept in a small JSON file
+#   next to it.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import json
+from os.path import join
+from PlaylistFile import PlaylistReader, write_playlist, PLAYLIST_SUFFIX
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# names of the two snapshot files inside the player's data folder
+ROWS_FILE = 'session' + PLAYLIST_SUFFIX
+STATE_FILE = 'session.json'
+
+# version of the state file; older or newer snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class saves and restores the session snapshot in one folder
+# -----------------------------------------------------------------------------
+class SessionSnapshot:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates a snapshot kept in a folder; nothing is read or written yet
+  #
+  # INPUT PARAMETERS:
+  #   folder_name - folder the snapshot files are kept in
+  # ---------------------------------------------------------------------------
+  def __init__(self, folder_name):
+
+    self.folder_name = folder_name
+    self.rows_file = join(folder_name, ROWS_FILE)
+    self.state_file = join(folder_name, STATE_FILE)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Saves the songs of a TrackTable and the state that goes with them
+  #
+  # INPUT PARAMETERS:
+  #   mp3_list - the TrackTable of loaded songs
+  #   state - dictionary of the rest of the session, written as JSON
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save(self, mp3_list, state):
+
+    # local variables
+    state = dict(state, version=SNAPSHOT_VERSION, songs=len(mp3_list))
+    temp_name = self.state_file + '.tmp'
+
+    os.makedirs(self.folder_name, exist_ok=True)
+
+    # a list restored from the snapshot and never changed is already saved
+    if mp3_list.source_name() != self.rows_file:
+      write_playlist(self.rows_file, mp3_list)
+
+    # the state goes last and names the number of songs, so a snapshot cut
+    # short while saving the songs is never restored
+    with open(temp_name, 'w') as state_save:
+      json.dump(state, state_save)
+
+    os.replace(temp_name, self.state_file)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Attaches the saved songs to a TrackTable and returns the saved state
+  #
+  # INPUT PARAMETERS:
+  #   mp3_list - the TrackTable to fill; left alone if nothing is restored
+  #
+  # RETURN:
+  #   dictionary of the saved state, or None if there is no usable snapshot
+  # ---------------------------------------------------------------------------
+  def restore(self, mp3_list):
+
+    try: # snapshot might be missing, from another version or damaged...
+      with open(self.state_file) as state_open:
+        state = json.load(state_open)
+
+      if not isinstance(state, dict) or state.get('version') != SNAPSHOT_VERSION:
+        return None
+
+      reader = PlaylistReader(self.rows_file)
+
+    except (OSError, ValueError):
+      return None
+
+    # the songs must be the ones the state was saved with
+    if len(reader) != state.get('songs'):
+      reader.close()
+      return None
+
+    mp3_list.attach(reader)
+
+    return state
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Removes the snapshot, so the next start is empty
+  # ---------------------------------------------------------------------------
+  def discard(self):
+
+    for file_name in (self.state_file, self.rows_file):
+      try:
+        os.remove(file_name)
+      except OSError:
+        pass
+
+    return
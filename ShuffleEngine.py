@@ -0,0 +1,245 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  ShuffleEngine.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file decides the order of songs in random mode. Instead of picking a
+#   random song on every skip, it walks a random permutation of the whole
+#   list, so no song repeats until every song has been played once. The
+#   permutation is a Fisher-Yates shuffle that is worked out one step at a
+#   time: only the positions that have been swapped are stored, so a list of
+#   millions of songs costs nothing until songs are actually played. Songs
+#   that have been played are kept in a history, and songs gone back over
+#   with the previous button in a second list to come again, so the previous
+#   button goes back to the song that really played before and the next
+#   button goes forward again over the same songs. The same seed always
+#   gives the same order.
+#
+# *****************************************************************************
+
+# modules used by this file
+import random
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# number of random bits in a generated seed
+SEED_BITS = 64
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class hands out song indexes in shuffled order with O(1) next and
+#   previous
+# -----------------------------------------------------------------------------
+class ShuffleEngine:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an engine for an empty list
+  #
+  # INPUT PARAMETERS:
+  #   seed - seed for the shuffle order, or None for a random seed
+  # ---------------------------------------------------------------------------
+  def __init__(self, seed=None):
+
+    if seed is None:
+      seed = random.SystemRandom().getrandbits(SEED_BITS)
+
+    self.seed = seed
+    self.size = 0
+    self.generation = None
+    self._random = random.Random(seed)
+    self._swaps = {}
+    self._places = {}
+    self._drawn = 0
+    self._history = []
+    self._ahead = []
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts a new shuffle of a list, with the current song as the first one
+  #   played
+  #
+  # INPUT PARAMETERS:
+  #   size - number of songs in the list
+  #   current - index of the song playing now, or None
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def reset(self, size, current=None):
+
+    self.size = size
+    self._random = random.Random(self.seed)
+    self._swaps = {}
+    self._places = {}
+    self._drawn = 0
+    self._history = []
+    self._ahead = []
+
+    # move the current song to the front of the permutation
+    if current is not None and 0 <= current < size:
+      self._history.append(self._take(current))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Keeps the engine in step with the song list and the current song. A new
+  #   list starts a new shuffle, a list that only grew keeps its shuffle (new
+  #   songs join the part not played yet), and a current song picked some
+  #   other way is added to the history and taken out of the songs still to
+  #   draw in this round.
+  #
+  # INPUT PARAMETERS:
+  #   mp3_list - the TrackTable of loaded songs
+  #   current - index of the song playing now
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def sync(self, mp3_list, current):
+
+    # a cleared or replaced list starts over
+    if mp3_list.generation != self.generation or len(mp3_list) < self.size:
+      self.generation = mp3_list.generation
+      self.reset(len(mp3_list), current)
+      return
+
+    # songs added to the end are simply more songs still to draw
+    self.size = len(mp3_list)
+
+    # nothing has changed while the same song is playing
+    if len(self._history) > 0 and self._history[-1] == current:
+      return
+
+    # the next song was picked by hand, so just move on to it
+    if len(self._ahead) > 0 and self._ahead[-1] == current:
+      self._history.append(self._ahead.pop())
+      return
+
+    # the current song was chosen without the shuffle, so remember it here
+    # and swap it out of the songs still to draw in this round
+    self._history.append(current)
+    position = self._places.get(current, current)
+    if (self._drawn <= position < self.size and
+        self._swaps.get(position, position) == current):
+      self._take(position)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Swaps the songs at two positions of the permutation. Only positions
+  #   holding another song than their own are stored, in _swaps, and
+  #   _places holds the position of each of those songs.
+  # ---------------------------------------------------------------------------
+  def _swap(self, first, second):
+
+    # local variables
+    first_song = self._swaps.pop(first, first)
+    second_song = self._swaps.pop(second, second)
+
+    for position, song in ((first, second_song), (second, first_song)):
+      if position != song:
+        self._swaps[position] = song
+        self._places[song] = position
+      else:
+        self._places.pop(song, None)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Moves the song at a position not drawn yet into the next slot and marks
+  #   it drawn. Slots that are done aren't kept.
+  #
+  # INPUT PARAMETERS:
+  #   position - position of the song, at least _drawn
+  #
+  # RETURN:
+  #   index of the song
+  # ---------------------------------------------------------------------------
+  def _take(self, position):
+
+    # local variables
+    slot = self._drawn
+
+    self._swap(slot, position)
+    song = self._swaps.pop(slot, slot)
+    self._places.pop(song, None)
+    self._drawn += 1
+
+    return song
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Draws the next song of the permutation. Positions before _drawn are
+  #   done; any other position p holds _swaps.get(p, p).
+  #
+  # RETURN:
+  #   index of a song that has not been drawn yet in this round
+  # ---------------------------------------------------------------------------
+  def _draw(self):
+
+    # every song has been drawn, start a new round
+    if self._drawn >= self.size:
+      self._swaps = {}
+      self._places = {}
+      self._drawn = 0
+
+    # swap a random position from the rest of the list into the next slot
+    return self._take(self._random.randrange(self._drawn, self.size))
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the next song without moving to it, drawing it from the
+  #   permutation unless the previous button has gone back over it. Used to
+  #   queue the next song ahead of time.
+  #
+  # RETURN:
+  #   index of the next song
+  # ---------------------------------------------------------------------------
+  def peek_next(self):
+
+    if len(self._ahead) == 0:
+      self._ahead.append(self._draw())
+
+    return self._ahead[-1]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Moves forward one song
+  #
+  # RETURN:
+  #   index of the next song
+  # ---------------------------------------------------------------------------
+  def next(self):
+
+    song = self.peek_next()
+    self._history.append(self._ahead.pop())
+
+    return song
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Moves back to the song that was played before the current one
+  #
+  # RETURN:
+  #   index of the previous song, or None at the start of the history
+  # ---------------------------------------------------------------------------
+  def previous(self):
+
+    if len(self._history) <= 1:
+      return None
+
+    self._ahead.append(self._history.pop())
+
+    return self._history[-1]
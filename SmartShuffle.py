@@ -0,0 +1,461 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  SmartShuffle.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file adds a smart shuffle to random mode. Instead of giving every
+#   song the same chance, each song gets a weight from how often it has been
+#   played, how often it has been skipped, its rating and how long ago it was
+#   last played, and songs are drawn in proportion to their weights.
+#
+#   The weights are kept in a Fenwick tree (binary indexed tree), so drawing
+#   a song and changing the weight of one song after it is played, skipped or
+#   rated both take O(log n), even for millions of songs. The tree is built
+#   once per list in O(n) and songs added to the end of the list are appended
+#   to it one at a time; nothing is rebuilt on a skip.
+#
+#   A song that has been drawn, played or skipped rests for a while with a
+#   weight of 0, so even a heavily weighted favourite can't come round again
+#   straight away. Its weight comes back, worked out again from its counts,
+#   after a number of other songs have been drawn. The counts are the totals
+#   of the play history, which keeps them up to date.
+#
+#   With the smart shuffle turned off the order is the plain shuffle of
+#   ShuffleEngine; previous and next move through the history either way.
+#
+# *****************************************************************************
+
+# modules used by this file
+import math
+import time
+from collections import deque
+from ShuffleEngine import ShuffleEngine
+from PlayHistory import PLAYS_COLUMN, SKIPS_COLUMN, LAST_PLAYED_COLUMN
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# ratings run from 1 to 5 stars; a song without one counts as 3 stars, and
+# each star more or less multiplies the weight by RATING_FACTOR
+MIN_RATING = 1
+MAX_RATING = 5
+NEUTRAL_RATING = 3
+RATING_FACTOR = 1.6
+
+# how much playing a song often raises its weight, on a log scale
+PLAY_BOOST = 0.25
+
+# skip rate is skips / (plays + skips + SKIP_PRIOR); a song skipped every time
+# loses SKIP_PENALTY of its weight
+SKIP_PRIOR = 2
+SKIP_PENALTY = 0.8
+
+# a song played this many seconds ago or longer has its full weight; one
+# played just now has RECENT_FACTOR of it
+RECENT_SECONDS = 3 * 24 * 60 * 60
+RECENT_FACTOR = 0.05
+
+# smallest weight of a song that isn't resting
+MIN_WEIGHT = 0.01
+
+# most songs drawn before a rested song comes back; lists shorter than twice
+# this rest songs for half the list
+MAX_REST = 50
+
+# draws tried before falling back to the plain shuffle when rounding picks a
+# resting song
+MAX_TRIES = 4
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out the weight of one song
+#
+# INPUT PARAMETERS:
+#   counts - play history totals of the song, or None
+#   rating - rating of the song from 1 to 5, or None
+#   now - time.time() to measure the time since the last play from
+#
+# RETURN:
+#   weight of the song, at least MIN_WEIGHT
+# -----------------------------------------------------------------------------
+def song_weight(counts, rating, now):
+
+  # local variables
+  weight = 1.0
+
+  if rating is not None:
+    weight *= RATING_FACTOR ** (rating - NEUTRAL_RATING)
+
+  if counts is not None:
+    plays = counts[PLAYS_COLUMN]
+    skips = counts[SKIPS_COLUMN]
+    weight *= 1.0 + PLAY_BOOST * math.log1p(plays)
+    weight *= 1.0 - SKIP_PENALTY * skips / (plays + skips + SKIP_PRIOR)
+
+    # songs played lately come back gradually
+    age = now - counts[LAST_PLAYED_COLUMN]
+    weight *= min(max(age / RECENT_SECONDS, RECENT_FACTOR), 1.0)
+
+  return max(weight, MIN_WEIGHT)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a Fenwick tree of weights. Node i (from 1) holds the sum of
+#   the lowbit(i) weights ending at weight i - 1.
+# -----------------------------------------------------------------------------
+class WeightTree:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Builds the tree in O(n)
+  #
+  # INPUT PARAMETERS:
+  #   weights - list of the weight of each song
+  # ---------------------------------------------------------------------------
+  def __init__(self, weights):
+
+    self.weights = list(weights)
+    self.size = len(self.weights)
+    self._tree = [0.0] + self.weights
+
+    # each node adds itself into its parent once
+    for node in range(1, self.size + 1):
+      parent = node + (node & -node)
+      if parent <= self.size:
+        self._tree[parent] += self._tree[node]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the sum of the first count weights
+  # ---------------------------------------------------------------------------
+  def prefix(self, count):
+
+    # local variables
+    total = 0.0
+
+    while count > 0:
+      total += self._tree[count]
+      count -= count & -count
+
+    return total
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the sum of every weight
+  # ---------------------------------------------------------------------------
+  def total(self):
+
+    return self.prefix(self.size)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Changes the weight of one song
+  #
+  # INPUT PARAMETERS:
+  #   index - index of the song
+  #   weight - its new weight
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def set(self, index, weight):
+
+    # local variables
+    change = weight - self.weights[index]
+    node = index + 1
+
+    self.weights[index] = weight
+    while node <= self.size:
+      self._tree[node] += change
+      node += node & -node
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds the weight of a new song at the end
+  # ---------------------------------------------------------------------------
+  def append(self, weight):
+
+    # local variables
+    node = self.size + 1
+
+    # the new node covers the new weight and the ones before it in its range
+    self.weights.append(weight)
+    self._tree.append(weight + self.prefix(self.size) - self.prefix(node - (node & -node)))
+    self.size = node
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Finds the song a point on the line of all the weights falls on
+  #
+  # INPUT PARAMETERS:
+  #   target - point from 0 up to the total weight
+  #
+  # RETURN:
+  #   index of the first song whose running total is past the point
+  # ---------------------------------------------------------------------------
+  def find(self, target):
+
+    # local variables
+    node = 0
+    step = 1 << (self.size.bit_length() - 1) if self.size > 0 else 0
+
+    # walk down from the largest range, skipping each range the point is past
+    while step > 0:
+      next_node = node + step
+      if next_node <= self.size and self._tree[next_node] <= target:
+        node = next_node
+        target -= self._tree[next_node]
+      step >>= 1
+
+    return min(node, self.size - 1)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a ShuffleEngine that can draw songs by weight
+# -----------------------------------------------------------------------------
+class SmartShuffle(ShuffleEngine):
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an engine for an empty list, with the smart shuffle off
+  #
+  # INPUT PARAMETERS:
+  #   index - LibraryIndex the ratings are kept in, or None
+  #   counts - dictionary of song path -> play history totals, kept up to
+  #            date by the play history, or None
+  #   seed - seed for the shuffle order, or None for a random seed
+  # ---------------------------------------------------------------------------
+  def __init__(self, index=None, counts=None, seed=None):
+
+    ShuffleEngine.__init__(self, seed)
+    self.index = index
+    self.weighted = False
+    self.counts = counts if counts is not None else {}
+    self.ratings = None
+    self._mp3_list = None
+    self._tree = None
+    self._resting = deque()
+    self._rested = set()
+    self._draws = 0
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Keeps the engine in step with the song list, remembering the list so
+  #   weights can be worked out from its paths
+  # ---------------------------------------------------------------------------
+  def sync(self, mp3_list, current):
+
+    self._mp3_list = mp3_list
+    ShuffleEngine.sync(self, mp3_list, current)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts a new shuffle; the weights are worked out again the next time a
+  #   song is drawn by weight
+  # ---------------------------------------------------------------------------
+  def reset(self, size, current=None):
+
+    self._tree = None
+    self._resting = deque()
+    self._rested = set()
+    ShuffleEngine.reset(self, size, current)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Turns the smart shuffle on or off. Songs already drawn stay in the
+  #   history.
+  # ---------------------------------------------------------------------------
+  def set_weighted(self, weighted):
+
+    self.weighted = weighted
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Sets a song's weight to 0 until MAX_REST more songs have been drawn,
+  #   once it has been played to its end or skipped. Its weight is worked
+  #   out again from its play history when it comes back.
+  #
+  # INPUT PARAMETERS:
+  #   mp3_list - the TrackTable of loaded songs
+  #   index - index of the song
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def rest(self, mp3_list, index):
+
+    if (self._tree is None or index >= self._tree.size or
+        mp3_list.generation != self.generation):
+      return
+
+    if index not in self._rested:
+      self._rested.add(index)
+      self._resting.append((self._draws, index))
+      self._tree.set(index, 0.0)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Gives a song a rating and keeps it in the library index
+  #
+  # INPUT PARAMETERS:
+  #   mp3_list - the TrackTable of loaded songs
+  #   index - index of the song
+  #   rating - 1 to 5 stars, or None to take the rating away
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def rate(self, mp3_list, index, rating):
+
+    # local variables
+    path = mp3_list.path(index)
+
+    self._load_ratings()
+    if rating is None:
+      self.ratings.pop(path, None)
+    else:
+      rating = min(max(rating, MIN_RATING), MAX_RATING)
+      self.ratings[path] = rating
+
+    if self.index is not None:
+      self.index.save_ratings([(path, rating)])
+
+    self._reweigh(mp3_list, index)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads the ratings from the library index the first time they are needed
+  # ---------------------------------------------------------------------------
+  def _load_ratings(self):
+
+    if self.ratings is None:
+      self.ratings = self.index.load_ratings() if self.index is not None else {}
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the weight of the song at an index of the list
+  # ---------------------------------------------------------------------------
+  def _weight(self, mp3_list, index, now):
+
+    # local variables
+    path = mp3_list.path(index)
+
+    return song_weight(self.counts.get(path), self.ratings.get(path), now)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Builds the weight tree for the whole list, or adds the songs appended
+  #   to the list since it was built
+  # ---------------------------------------------------------------------------
+  def _grow(self):
+
+    # local variables
+    mp3_list = self._mp3_list
+    now = time.time()
+
+    self._load_ratings()
+
+    if self._tree is None:
+
+      # with nothing counted or rated every song has the same weight
+      if len(self.counts) == 0 and len(self.ratings) == 0:
+        weights = [1.0] * self.size
+      else:
+        counts = self.counts.get
+        ratings = self.ratings.get
+        weights = []
+        for folder, name in mp3_list:
+          path = folder + "/" + name
+          weights.append(song_weight(counts(path), ratings(path), now))
+          if len(weights) == self.size:
+            break
+
+      self._tree = WeightTree(weights)
+
+    while self._tree.size < self.size:
+      self._tree.append(self._weight(mp3_list, self._tree.size, now))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Works out a song's weight again after its rating changed, unless it is
+  #   resting
+  # ---------------------------------------------------------------------------
+  def _reweigh(self, mp3_list, index):
+
+    if (self._tree is None or index >= self._tree.size or
+        mp3_list.generation != self.generation):
+      return
+
+    if index not in self._rested:
+      self._tree.set(index, self._weight(mp3_list, index, time.time()))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Gives back their weights to songs that have rested long enough, or to
+  #   the songs resting longest if every song is resting
+  # ---------------------------------------------------------------------------
+  def _wake(self):
+
+    # local variables
+    rest = min(MAX_REST, self.size // 2)
+    now = time.time()
+
+    while self._resting and (self._resting[0][0] + rest < self._draws or
+                             self._tree.total() <= 0.0):
+      index = self._resting.popleft()[1]
+      self._rested.discard(index)
+      self._tree.set(index, self._weight(self._mp3_list, index, now))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Draws the next song, by weight when the smart shuffle is on
+  #
+  # RETURN:
+  #   index of the next song
+  # ---------------------------------------------------------------------------
+  def _draw(self):
+
+    if not self.weighted or self._mp3_list is None or self.size == 0:
+      return ShuffleEngine._draw(self)
+
+    self._grow()
+    self._draws += 1
+    self._wake()
+
+    # rounding can land on a song of weight 0 at the very end of a range
+    for attempt in range(MAX_TRIES):
+      song = self._tree.find(self._random.random() * self._tree.total())
+      if self._tree.weights[song] > 0.0:
+        self.rest(self._mp3_list, song)
+        return song
+
+    return ShuffleEngine._draw(self)
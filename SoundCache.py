@@ -0,0 +1,363 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  SoundCache.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file keeps songs decoded in memory, so going back and forth between
+#   the last few songs doesn't open and decode each one from disk again.
+#
+#   A SoundCache holds pygame Sound objects (the whole song as PCM) for the
+#   songs played most recently and the ones asked for ahead of time. Songs
+#   are decoded on a background thread, newest request first, and the least
+#   recently used ones are dropped once the cache is over its memory cap. The
+#   cap is set with MP3PLAYER_SOUND_CACHE_MB, which also turns the cache on
+#   at start up; it can be turned on and off from the Options menu.
+#
+#   A SoundPlayer plays those Sound objects on a mixer channel of its own,
+#   behind the same functions as mixer.music, so the playback worker can use
+#   either one for the current song.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import time
+import threading
+from collections import OrderedDict
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# environment variable that sets the memory cap in MB and turns the cache on
+CACHE_SIZE_VARIABLE = 'MP3PLAYER_SOUND_CACHE_MB'
+
+# memory cap used when the cache is turned on from the menu
+DEFAULT_CACHE_MB = 512
+BYTES_PER_MB = 1024 * 1024
+
+# most songs waiting to be decoded; older requests are dropped first
+MAX_WAITING = 4
+
+# mixer channel kept for playing cached songs
+SOUND_CHANNEL = 0
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class keeps decoded songs in memory, up to a memory cap
+# -----------------------------------------------------------------------------
+class SoundCache:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an empty cache, on only if MP3PLAYER_SOUND_CACHE_MB is set
+  # ---------------------------------------------------------------------------
+  def __init__(self):
+
+    try: # variable might be missing or not a number...
+      size_mb = int(os.environ.get(CACHE_SIZE_VARIABLE, ''))
+    except ValueError:
+      size_mb = 0
+
+    self.enabled = size_mb > 0
+    self.max_bytes = (size_mb if size_mb > 0 else DEFAULT_CACHE_MB) * BYTES_PER_MB
+    self.size = 0
+    self._sounds = OrderedDict()
+    self._waiting = []
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._thread = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the decoded song for a path and marks it as recently used
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song
+  #
+  # RETURN:
+  #   the Sound, or None if the song isn't decoded
+  # ---------------------------------------------------------------------------
+  def get(self, path):
+
+    with self._lock:
+      entry = self._sounds.get(path)
+      if entry is None:
+        return None
+      self._sounds.move_to_end(path)
+
+    return entry[0]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Asks for a song to be decoded in the background, if it isn't already
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def prefetch(self, path):
+
+    if not self.enabled:
+      return
+
+    with self._lock:
+      if path in self._sounds:
+        self._sounds.move_to_end(path)
+        return
+
+      if path in self._waiting:
+        self._waiting.remove(path)
+      self._waiting.append(path)
+      del self._waiting[:-MAX_WAITING]
+
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._decode_songs, daemon=True)
+        self._thread.start()
+
+    self._wake.set()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Turns the cache on or off; turning it off frees every decoded song
+  # ---------------------------------------------------------------------------
+  def set_enabled(self, enabled):
+
+    self.enabled = enabled
+    if not enabled:
+      self.clear()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Forgets every decoded song and every song waiting to be decoded
+  # ---------------------------------------------------------------------------
+  def clear(self):
+
+    with self._lock:
+      self._sounds.clear()
+      self._waiting = []
+      self.size = 0
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds a decoded song, dropping the least recently used ones to make room.
+  #   A song bigger than the whole cap isn't kept.
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song
+  #   sound - the decoded Sound
+  #   size - bytes of PCM it holds
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _add(self, path, sound, size):
+
+    if size > self.max_bytes or not self.enabled:
+      return
+
+    with self._lock:
+      if path in self._sounds:
+        return
+
+      while self._sounds and self.size + size > self.max_bytes:
+        self.size -= self._sounds.popitem(last=False)[1][1]
+
+      self._sounds[path] = (sound, size)
+      self.size += size
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Decoding thread: decodes the waiting songs, newest request first
+  # ---------------------------------------------------------------------------
+  def _decode_songs(self):
+
+    import pygame
+    from pygame import mixer
+
+    while True:
+      self._wake.wait()
+
+      with self._lock:
+        if not self._waiting:
+          self._wake.clear()
+          continue
+        path = self._waiting.pop()
+
+      try: # song might be unreadable, or the mixer not open yet...
+        sound = mixer.Sound(path)
+        frequency, sample_format, channels = mixer.get_init()
+      except (pygame.error, OSError, TypeError):
+        continue
+
+      size = int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+      self._add(path, sound, size)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class plays decoded songs on their own mixer channel, with the same
+#   functions as mixer.music. It is only used from the playback worker.
+# -----------------------------------------------------------------------------
+class SoundPlayer:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes a mixer channel for cached songs
+  #
+  # INPUT PARAMETERS:
+  #   cache - the SoundCache songs are played from
+  #   music - pygame's mixer.music, whose end event is posted here as well
+  # ---------------------------------------------------------------------------
+  def __init__(self, cache, music):
+
+    from pygame import mixer
+
+    mixer.set_reserved(SOUND_CHANNEL + 1)
+    self.channel = mixer.Channel(SOUND_CHANNEL)
+    self.cache = cache
+    self.music = music
+    self.sound = None
+    self.whole = None
+    self._ready = None
+    self.volume = 1.0
+    self._started = 0.0
+    self._paused = None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes a song out of the cache, ready for load(), if it is decoded
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song
+  #
+  # RETURN:
+  #   True if the song can be loaded here
+  # ---------------------------------------------------------------------------
+  def ready(self, path):
+
+    self._ready = self.cache.get(path) if self.cache.enabled else None
+
+    return self._ready is not None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Functions named after the mixer.music ones. load() plays the song taken
+  #   by ready(), which holds on to it even if the cache drops it meanwhile.
+  #   The channel only posts the end event while play() has a song playing,
+  #   since stopping it would post one too, as if the song had ended.
+  # ---------------------------------------------------------------------------
+  def load(self, path):
+    self._halt()
+    self.sound = self._ready
+    self.whole = self._ready
+    self._ready = None
+
+  def play(self, loops=0, start=0.0):
+
+    from pygame import mixer
+
+    sound = self.sound
+
+    # a channel always plays a Sound from its start, so starting part way in
+    # plays a copy of the rest of the song
+    if start > 0:
+      frequency, sample_format, channels = mixer.get_init()
+      frame = channels * (abs(sample_format) // 8)
+      raw = sound.get_raw()
+      sound = mixer.Sound(buffer=raw[int(start * frequency) * frame:])
+      self.sound = sound
+
+    self.channel.set_volume(self.volume)
+    self._halt()
+    self.channel.play(sound, loops)
+    self.channel.set_endevent(self.music.get_endevent())
+    self._started = time.perf_counter()
+    self._paused = None
+
+  def pause(self):
+    if self._paused is None:
+      self._paused = time.perf_counter()
+    self.channel.pause()
+
+  def unpause(self):
+    if self._paused is not None:
+      self._started += time.perf_counter() - self._paused
+      self._paused = None
+    self.channel.unpause()
+
+  def stop(self):
+    self._halt()
+
+  def unload(self):
+    self._halt()
+    self.sound = None
+    self.whole = None
+
+  # a channel can't jump within a Sound either, so the rest of the whole song
+  # is played from the new position. The queued song, a pause and the time
+  # counted by get_pos() are kept, like they are by mixer.music
+  def set_pos(self, position):
+    queued = self.channel.get_queue()
+    started, paused = self._started, self._paused
+    self.sound = self.whole
+    self.play(0, position)
+    if queued is not None:
+      self.channel.queue(queued)
+    self._started = started
+    if paused is not None:
+      self.pause()
+      self._paused = paused
+
+  # a channel can only queue a decoded song; otherwise the current one just
+  # ends and the player moves on as if gapless were off
+  def queue(self, path):
+    sound = self.cache.get(path)
+    if sound is not None and self.channel.get_busy():
+      self.channel.queue(sound)
+
+  def _halt(self):
+    self.channel.set_endevent()
+    self.channel.stop()
+
+  def set_volume(self, volume):
+    self.volume = volume
+    self.channel.set_volume(volume)
+
+  def get_busy(self):
+    return self.channel.get_busy() and self._paused is None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns how long the current song has been playing, in ms. A channel
+  #   doesn't keep a position, so it is counted from when play() was called,
+  #   less any time spent paused.
+  # ---------------------------------------------------------------------------
+  def get_pos(self):
+
+    # local variables
+    now = time.perf_counter() if self._paused is None else self._paused
+    playing = self.channel.get_sound()
+
+    # the channel has moved on to the queued song by itself
+    if playing is not None and playing is not self.sound and self._paused is None:
+      self.sound = playing
+      self.whole = playing
+      self._started = now
+
+    return int((now - self._started) * 1000)
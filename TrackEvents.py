@@ -0,0 +1,199 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  TrackEvents.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file tells the GUI when a song has ended. The mixer is asked to post
+#   a pygame event at the end of every song, and a background thread waits
+#   for that event and hands it to the tkinter main loop with after_idle. The
+#   main loop is no longer woken up every 500 ms while nothing is playing, and
+#   the next song starts as soon as the last one ends.
+#
+#   pygame only delivers mixer events when its display module is running, so
+#   the display is started with SDL's dummy video driver (no window is made).
+#   SDL only allows its event queue to be waited on from a thread other than
+#   the one that started the display on Linux; on Windows and macOS events
+#   must be read on the main thread, which belongs to tkinter, so there the
+#   watcher polls. It also falls back to polling if the display can't be
+#   started or tkinter can't be called from another thread. Polling only
+#   runs while a song is actually playing. None of this is set up until the
+#   first song plays, so it doesn't slow down start up, and until the
+#   playback worker has opened the mixer the watcher polls and tries again
+#   with the next song.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import sys
+import threading
+import tkinter
+from PlaybackWorker import playback
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# pygame event posted by the mixer at the end of each song, counted from
+# pygame.USEREVENT
+END_EVENT_OFFSET = 1
+
+# ms the event thread waits before checking if it should shut down
+EVENT_WAIT_TIMEOUT = 1000
+
+# ms between checks when falling back to polling
+POLL_DELAY = 500
+
+# platforms whose SDL events can be waited on from a background thread
+EVENT_PLATFORMS = ('linux',)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class calls back into the GUI when a song ends, from mixer events
+#   when it can and from polling while playing when it can't
+# -----------------------------------------------------------------------------
+class TrackEndWatcher:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates a watcher, nothing is started until start() is called or the
+  #   first song plays
+  #
+  # INPUT PARAMETERS:
+  #   root - the main window
+  #   on_track_end - called in the main loop as on_track_end(generation)
+  #                  each time the mixer ends a song, with the load
+  #                  generation of the playback worker when it did
+  #   on_poll - called in the main loop when polling, returns True to keep
+  #             polling or False once nothing is playing
+  # ---------------------------------------------------------------------------
+  def __init__(self, root, on_track_end, on_poll):
+
+    self.root = root
+    self.on_track_end = on_track_end
+    self.on_poll = on_poll
+    self.event_driven = False
+    self.end_event = None
+    self._poll_id = None
+    self._running = False
+    self._started = False
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Turns on mixer end events and starts the thread that waits for them.
+  #   Does nothing if the playback worker hasn't opened the mixer yet, so
+  #   playing() calls it again.
+  # ---------------------------------------------------------------------------
+  def start(self):
+
+    # pygame is imported here rather than with this file, and the mixer may
+    # not even be open until the playback worker has started
+    import pygame
+    from pygame import mixer
+
+    # the end event can only be set on an open mixer
+    if not mixer.get_init():
+      return
+
+    self._started = True
+
+    # the event queue would be read on the wrong thread
+    if not sys.platform.startswith(EVENT_PLATFORMS):
+      return
+
+    try: # display or event support might be missing...
+
+      # events from another thread can only be passed in to a threaded Tcl
+      if not self.root.tk.call('info', 'exists', 'tcl_platform(threaded)'):
+        return
+
+      # the mixer only posts events when the display module is running
+      os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+      pygame.display.init()
+      pygame.event.set_blocked(None)
+      self.end_event = pygame.USEREVENT + END_EVENT_OFFSET
+      pygame.event.set_allowed(self.end_event)
+      mixer.music.set_endevent(self.end_event)
+
+    # keep polling instead if events can't be used
+    except pygame.error:
+      return
+
+    self.event_driven = True
+    self._running = True
+    waiter = threading.Thread(target=self._wait_for_events, daemon=True)
+    waiter.start()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Stops the event thread and any polling
+  # ---------------------------------------------------------------------------
+  def stop(self):
+
+    self._running = False
+
+    if self._poll_id is not None:
+      self.root.after_cancel(self._poll_id)
+      self._poll_id = None
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Must be called whenever a song starts or resumes playing. Starts the
+  #   watcher the first time the mixer is open, then the fallback polling if
+  #   events are not being used and it isn't running.
+  # ---------------------------------------------------------------------------
+  def playing(self):
+
+    if not self._started:
+      self.start()
+
+    if not self.event_driven and self._poll_id is None:
+      self._poll_id = self.root.after(POLL_DELAY, self._poll)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   One fallback poll, scheduled again only while something is playing
+  # ---------------------------------------------------------------------------
+  def _poll(self):
+
+    self._poll_id = None
+
+    # the callback may have started a new poll through playing() already
+    if self.on_poll() and self._poll_id is None:
+      self._poll_id = self.root.after(POLL_DELAY, self._poll)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Background thread that blocks on the pygame event queue and passes each
+  #   end of song event to the main loop
+  # ---------------------------------------------------------------------------
+  def _wait_for_events(self):
+
+    import pygame
+
+    while self._running:
+      event = pygame.event.wait(EVENT_WAIT_TIMEOUT)
+
+      if event.type == self.end_event:
+        try:
+          self.root.after_idle(self.on_track_end, playback.load_generation())
+
+        # the main window has been closed
+        except (RuntimeError, tkinter.TclError):
+          self._running = False
+
+    return
@@ -0,0 +1,260 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  TrackListView.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file is a scrolling list of every loaded song that stays fast no
+#   matter how big the library is. A tkinter Listbox makes one entry per
+#   song, which takes seconds and hundreds of MB for 100k songs. This view
+#   only draws the rows that fit in the window on a canvas, and reuses the
+#   same few canvas items as the list is scrolled, reading each song from the
+#   TrackTable as its row comes into view. Showing a new or bigger list only
+#   means redrawing those rows, so it takes the same time for any size.
+#
+# *****************************************************************************
+
+# modules used by this file
+import tkinter
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# height of one row and gap before the text, in pixels
+ROW_HEIGHT = 18
+TEXT_PAD = 4
+
+# default size of the view
+VISIBLE_ROWS = 10
+LIST_WIDTH = 460
+
+# pixels moved by one step of the mouse wheel or one scrollbar arrow click
+WHEEL_STEP = ROW_HEIGHT * 3
+ARROW_STEP = ROW_HEIGHT
+
+# colours of the list
+BACKGROUND = 'white'
+CURRENT_FILL = '#cce0ff'
+
+# mouse wheel change of one notch on Windows and macOS
+WHEEL_DELTA = 120
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class draws the visible part of a TrackTable on a canvas with a
+#   scrollbar, and highlights the current song
+# -----------------------------------------------------------------------------
+class TrackListView:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates the view; pack or grid self.frame to show it
+  #
+  # INPUT PARAMETERS:
+  #   parent - widget the view is placed in
+  #   mp3_list - the TrackTable to show
+  #   metadata - MetadataReader the songs' titles come from
+  #   on_pick - called with the index of a song when its row is double clicked
+  #   rows - number of rows shown at the default size
+  #   width - width of the list in pixels
+  # ---------------------------------------------------------------------------
+  def __init__(self, parent, mp3_list, metadata, on_pick, rows=VISIBLE_ROWS,
+               width=LIST_WIDTH):
+
+    self.mp3_list = mp3_list
+    self.metadata = metadata
+    self.on_pick = on_pick
+    self.offset = 0
+    self.current = None
+    self._rows = []
+
+    self.frame = tkinter.Frame(parent)
+    self.canvas = tkinter.Canvas(self.frame, width=width, height=rows * ROW_HEIGHT,
+                                 bg=BACKGROUND, highlightthickness=0)
+    self.scrollbar = tkinter.Scrollbar(self.frame, orient='vertical', command=self._yview)
+    self.canvas.pack(side='left', fill='both', expand=True)
+    self.scrollbar.pack(side='right', fill='y')
+
+    # redraw when resized, scroll with the mouse wheel (X11 sends buttons 4
+    # and 5), and pick a song by double clicking it
+    self.canvas.bind('<Configure>', lambda event: self.refresh())
+    self.canvas.bind('<MouseWheel>', self._wheel)
+    self.canvas.bind('<Button-4>', lambda event: self.scroll_by(-WHEEL_STEP))
+    self.canvas.bind('<Button-5>', lambda event: self.scroll_by(WHEEL_STEP))
+    self.canvas.bind('<Double-Button-1>', self._pick)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Height of the canvas in pixels, before and after it is first shown
+  # ---------------------------------------------------------------------------
+  def _height(self):
+
+    height = self.canvas.winfo_height()
+
+    if height <= 1:
+      height = int(self.canvas['height'])
+
+    return height
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Redraws the rows in view. Call whenever the list or its tags change;
+  #   it costs the same for any size of list.
+  # ---------------------------------------------------------------------------
+  def refresh(self):
+
+    # local variables
+    canvas = self.canvas
+    mp3_list = self.mp3_list
+    metadata = self.metadata
+    count = len(mp3_list)
+    height = self._height()
+    width = canvas.winfo_width()
+    total = count * ROW_HEIGHT
+
+    # keep the view inside the list
+    self.offset = max(0, min(self.offset, total - height))
+    first = self.offset // ROW_HEIGHT
+    needed = height // ROW_HEIGHT + 2
+
+    # rows are only ever added when the view grows, then reused
+    while len(self._rows) < needed:
+      self._rows.append((canvas.create_rectangle(0, 0, 0, 0, width=0),
+                         canvas.create_text(0, 0, anchor='w')))
+
+    # move each row into place and fill it with its song
+    for slot, (box, text) in enumerate(self._rows):
+      index = first + slot
+      if slot < needed and index < count:
+        top = index * ROW_HEIGHT - self.offset
+        canvas.coords(box, 0, top, width, top + ROW_HEIGHT)
+        canvas.coords(text, TEXT_PAD, top + ROW_HEIGHT // 2)
+        canvas.itemconfigure(box, state='normal',
+                             fill=CURRENT_FILL if index == self.current else BACKGROUND)
+        canvas.itemconfigure(text, state='normal', text=mp3_list.title(index, metadata))
+      else:
+        canvas.itemconfigure(box, state='hidden')
+        canvas.itemconfigure(text, state='hidden')
+
+    # show what part of the list is in view on the scrollbar
+    if total > height:
+      self.scrollbar.set(self.offset / total, (self.offset + height) / total)
+    else:
+      self.scrollbar.set(0, 1)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Scrolls the list by a number of pixels
+  # ---------------------------------------------------------------------------
+  def scroll_by(self, pixels):
+
+    self.offset += pixels
+    self.refresh()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Scrolls the list so a song is in view, in the middle if it wasn't
+  #
+  # INPUT PARAMETERS:
+  #   index - index of the song
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def show(self, index):
+
+    # local variables
+    top = index * ROW_HEIGHT
+    height = self._height()
+
+    if top < self.offset or top + ROW_HEIGHT > self.offset + height:
+      self.offset = top - (height - ROW_HEIGHT) // 2
+
+    self.refresh()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Highlights the current song and scrolls to it
+  #
+  # INPUT PARAMETERS:
+  #   index - index of the current song
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def set_current(self, index):
+
+    self.current = index
+
+    if index < len(self.mp3_list):
+      self.show(index)
+    else:
+      self.refresh()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Scrolls back to the current song after the user has scrolled away
+  # ---------------------------------------------------------------------------
+  def show_current(self):
+
+    if self.current is not None and self.current < len(self.mp3_list):
+      self.show(self.current)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Scrollbar command: ('moveto', fraction) or ('scroll', count, 'units' or
+  #   'pages')
+  # ---------------------------------------------------------------------------
+  def _yview(self, action, amount, what=None):
+
+    if action == 'moveto':
+      self.offset = int(float(amount) * len(self.mp3_list) * ROW_HEIGHT)
+    elif what == 'pages':
+      self.offset += int(amount) * (self._height() - ROW_HEIGHT)
+    else:
+      self.offset += int(amount) * ARROW_STEP
+
+    self.refresh()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Mouse wheel on Windows and macOS
+  # ---------------------------------------------------------------------------
+  def _wheel(self, event):
+
+    # one notch is 120 on Windows; macOS sends small steps
+    steps = event.delta // WHEEL_DELTA if abs(event.delta) >= WHEEL_DELTA else event.delta
+    self.scroll_by(-steps * WHEEL_STEP)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Passes the song under the mouse to on_pick
+  # ---------------------------------------------------------------------------
+  def _pick(self, event):
+
+    index = (self.offset + event.y) // ROW_HEIGHT
+
+    if index < len(self.mp3_list):
+      self.on_pick(index)
+
+    return
@@ -0,0 +1,794 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  TrackMetadata.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file reads the artist, title and length of mp3 files. Tags are read
+#   from ID3v2 (versions 2.2 to 2.4) with ID3v1 as a fall back, and the length
+#   is worked out from the MPEG frame headers: from the frame count in a
+#   Xing/Info or VBRI header when the file has one, otherwise from the bit
+#   rate of the first frame. Only the start and end of each file are read, so
+#   memory use doesn't depend on the size of the files.
+#
+#   Files are read in chunks across a pool of processes, with only a few
+#   chunks waiting at a time. Results are kept in the library index under
+#   the path, size and modification time of the file, so reading a library
+#   again only parses the files that are new or have changed. The list of
+#   songs is gone through on the background thread a batch at a time: each
+#   batch is looked up in the index, and what it doesn't answer is read and
+#   written back to the index chunk by chunk, so the memory a read needs
+#   doesn't grow with the size of the library. The length of every song is
+#   also kept in list order as it is read, so the list can be sorted by length
+#   without looking each song up.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import queue
+import struct
+import itertools
+import threading
+import collections
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# columns of the tags kept for each song
+ARTIST_COLUMN = 0
+TITLE_COLUMN = 1
+DURATION_COLUMN = 2
+
+# value kept in list order for songs that haven't been read
+NOT_READ = -1
+
+# songs per job sent to the process pool, and jobs waiting per process
+CHUNK_SIZE = 256
+JOBS_PER_WORKER = 2
+
+# songs looked up in the library index at once
+LOOKUP_BATCH = 2048
+
+# most bytes of an ID3v2 tag read (cover art after the text is skipped) and
+# bytes read after the tag when looking for the first audio frame
+MAX_TAG_READ = 262144
+FRAME_SEARCH = 16384
+
+# ID3 header sizes
+ID3V2_HEADER_SIZE = 10
+ID3V1_SIZE = 128
+
+# ID3v2 frames holding the title, artist and length, by tag version
+TITLE_FRAMES = (b'TIT2', b'TT2')
+ARTIST_FRAMES = (b'TPE1', b'TP1')
+LENGTH_FRAMES = (b'TLEN', b'TLE')
+
+# text encodings of ID3v2 text frames, by encoding byte
+TEXT_ENCODINGS = ('latin-1', 'utf-16', 'utf-16-be', 'utf-8')
+
+# MPEG versions as stored in the frame header
+MPEG_25 = 0
+MPEG_2 = 2
+MPEG_1 = 3
+
+# MPEG layers as stored in the frame header
+LAYER_3 = 1
+LAYER_2 = 2
+LAYER_1 = 3
+
+# bit rates in kbps by [MPEG 1?][layer] and bit rate number
+BIT_RATES = {
+  (True, LAYER_1):  (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+  (True, LAYER_2):  (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+  (True, LAYER_3):  (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+  (False, LAYER_1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+  (False, LAYER_2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+  (False, LAYER_3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# sample rates of MPEG 1; MPEG 2 halves them and MPEG 2.5 quarters them
+SAMPLE_RATES = (44100, 48000, 32000)
+
+# channel mode of a single channel frame
+MONO = 3
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function turns a 4 byte "synchsafe" number, which only uses the low
+#   7 bits of each byte, into an int
+# -----------------------------------------------------------------------------
+def synchsafe(data):
+
+  return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function decodes the body of an ID3v2 text frame
+#
+# INPUT PARAMETERS:
+#   data - frame body, starting with the encoding byte
+#
+# RETURN:
+#   first string of the frame
+# -----------------------------------------------------------------------------
+def decode_text(data):
+
+  if len(data) < 2 or data[0] >= len(TEXT_ENCODINGS):
+    return ''
+
+  text = data[1:].decode(TEXT_ENCODINGS[data[0]], 'replace')
+
+  return text.split('\x00')[0].strip()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads the title, artist and length frames of an ID3v2 tag
+#
+# INPUT PARAMETERS:
+#   version - major version of the tag (2, 3 or 4)
+#   flags - tag header flags
+#   data - tag body, after the 10 byte header
+#
+# RETURN:
+#   artist, title, length in ms (0 if not in the tag)
+# -----------------------------------------------------------------------------
+def parse_id3v2(version, flags, data):
+
+  # local variables
+  artist = ''
+  title = ''
+  length = 0
+  position = 0
+
+  # version 2.3 tags may be unsynchronised as a whole
+  if version == 3 and flags & 0x80:
+    data = data.replace(b'\xff\x00', b'\xff')
+
+  # skip the extended header (its size counts itself in 2.4 but not in 2.3)
+  if version >= 3 and flags & 0x40 and len(data) >= 4:
+    if version == 4:
+      position = synchsafe(data)
+    else:
+      position = struct.unpack_from('>I', data)[0] + 4
+
+  # 2.2 frames have 3 byte ids and sizes and no flags
+  if version == 2:
+    header_size = 6
+  else:
+    header_size = 10
+
+  while position + header_size <= len(data):
+    if version == 2:
+      frame_id = data[position:position + 3]
+      size = int.from_bytes(data[position + 3:position + 6], 'big')
+      frame_flags = 0
+    else:
+      frame_id = data[position:position + 4]
+      if version == 4:
+        size = synchsafe(data[position + 4:position + 8])
+      else:
+        size = struct.unpack_from('>I', data, position + 4)[0]
+      frame_flags = struct.unpack_from('>H', data, position + 8)[0]
+
+    # padding after the last frame
+    if frame_id[:1] == b'\x00' or size == 0:
+      break
+
+    body = data[position + header_size:position + header_size + size]
+    position += header_size + size
+
+    # 2.4 frames may start with a 4 byte data length
+    if version == 4 and frame_flags & 0x0001:
+      body = body[4:]
+
+    # compressed or encrypted frames can't be read as text
+    if (version == 3 and frame_flags & 0x00c0) or (version == 4 and frame_flags & 0x000c):
+      continue
+
+    if frame_id in TITLE_FRAMES:
+      title = decode_text(body)
+    elif frame_id in ARTIST_FRAMES:
+      artist = decode_text(body)
+    elif frame_id in LENGTH_FRAMES:
+      text = decode_text(body)
+      if text.isdigit():
+        length = int(text)
+
+  return artist, title, length
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads an MPEG audio frame header
+#
+# INPUT PARAMETERS:
+#   data - bytes holding the header
+#   position - offset of the header in data
+#
+# RETURN:
+#   (frame length in bytes, samples per frame, sample rate, bit rate in bps,
+#   MPEG 1?, mono?), or None if there is no valid header there
+# -----------------------------------------------------------------------------
+def parse_frame_header(data, position):
+
+  if position + 4 > len(data) or data[position] != 0xff or data[position + 1] & 0xe0 != 0xe0:
+    return None
+
+  version = (data[position + 1] >> 3) & 3
+  layer = (data[position + 1] >> 1) & 3
+  rate_number = data[position + 2] >> 4
+  sample_number = (data[position + 2] >> 2) & 3
+  padding = (data[position + 2] >> 1) & 1
+  mono = (data[position + 3] >> 6) == MONO
+
+  # reserved values, and "free" bit rate which has no fixed frame length
+  if version == 1 or layer == 0 or rate_number in (0, 15) or sample_number == 3:
+    return None
+
+  mpeg1 = (version == MPEG_1)
+  bit_rate = BIT_RATES[(mpeg1, layer)][rate_number] * 1000
+  sample_rate = SAMPLE_RATES[sample_number] >> (0 if mpeg1 else 1 if version == MPEG_2 else 2)
+
+  # frame length from the number of samples it holds
+  if layer == LAYER_1:
+    samples = 384
+    frame_length = (12 * bit_rate // sample_rate + padding) * 4
+  elif layer == LAYER_3 and not mpeg1:
+    samples = 576
+    frame_length = 72 * bit_rate // sample_rate + padding
+  else:
+    samples = 1152
+    frame_length = 144 * bit_rate // sample_rate + padding
+
+  return frame_length, samples, sample_rate, bit_rate, mpeg1, mono
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out the length of the audio from its first frame
+#
+# INPUT PARAMETERS:
+#   data - bytes from the start of the audio
+#   audio_size - size of the audio in bytes, tags left out
+#
+# RETURN:
+#   length in ms, or 0 if no frame could be found
+# -----------------------------------------------------------------------------
+def audio_duration(data, audio_size):
+
+  # find a frame header followed by another one, so a stray 0xff isn't taken
+  # for the start of the audio
+  position = data.find(b'\xff')
+  while position >= 0:
+    header = parse_frame_header(data, position)
+    if header is not None:
+      following = position + header[0]
+      if following + 4 > len(data) or parse_frame_header(data, following) is not None:
+        break
+    position = data.find(b'\xff', position + 1)
+
+  if position < 0:
+    return 0
+
+  frame_length, samples, sample_rate, bit_rate, mpeg1, mono = header
+
+  # a Xing/Info header sits after the side information of the first frame
+  if mpeg1:
+    side_info = 17 if mono else 32
+  else:
+    side_info = 9 if mono else 17
+  xing = position + 4 + side_info
+  vbri = position + 4 + 32
+
+  if data[xing:xing + 4] in (b'Xing', b'Info') and len(data) >= xing + 12:
+    if struct.unpack_from('>I', data, xing + 4)[0] & 1:
+      frames = struct.unpack_from('>I', data, xing + 8)[0]
+      return frames * samples * 1000 // sample_rate
+
+  if data[vbri:vbri + 4] == b'VBRI' and len(data) >= vbri + 18:
+    frames = struct.unpack_from('>I', data, vbri + 14)[0]
+    return frames * samples * 1000 // sample_rate
+
+  # constant bit rate: every byte after the first frame header is audio
+  return max(audio_size - position, 0) * 8000 // bit_rate
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads the tags and length of one mp3 file
+#
+# INPUT PARAMETERS:
+#   path - path of the file
+#   size - size of the file in bytes
+#
+# RETURN:
+#   (artist, title, length in ms); empty strings and 0 for anything missing
+# -----------------------------------------------------------------------------
+def read_metadata(path, size):
+
+  # local variables
+  artist = ''
+  title = ''
+  length = 0
+  audio_start = 0
+  audio_end = size
+
+  with open(path, 'rb') as song:
+    header = song.read(ID3V2_HEADER_SIZE)
+
+    # ID3v2 tag at the start of the file
+    if len(header) == ID3V2_HEADER_SIZE and header[:3] == b'ID3' and header[3] in (2, 3, 4):
+      tag_size = synchsafe(header[6:10])
+      artist, title, length = parse_id3v2(header[3], header[5],
+                                          song.read(min(tag_size, MAX_TAG_READ)))
+      audio_start = ID3V2_HEADER_SIZE + tag_size
+
+      # a footer repeats the header after the tag
+      if header[5] & 0x10:
+        audio_start += ID3V2_HEADER_SIZE
+
+    # ID3v1 tag in the last 128 bytes
+    if size >= ID3V1_SIZE:
+      song.seek(size - ID3V1_SIZE)
+      footer = song.read(ID3V1_SIZE)
+      if footer[:3] == b'TAG':
+        audio_end -= ID3V1_SIZE
+        if title == '':
+          title = footer[3:33].split(b'\x00')[0].decode('latin-1').strip()
+        if artist == '':
+          artist = footer[33:63].split(b'\x00')[0].decode('latin-1').strip()
+
+    # work out the length from the frames, keeping the tag's length if that fails
+    song.seek(audio_start)
+    duration = audio_duration(song.read(FRAME_SEARCH), audio_end - audio_start)
+    if duration > 0:
+      length = duration
+
+  return artist, title, length
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads one chunk of songs inside a worker process
+#
+# INPUT PARAMETERS:
+#   songs - list of (path, size, mtime_ns)
+#
+# RETURN:
+#   list of (path, size, mtime_ns, artist, title, length in ms) for every
+#   song that could be read
+# -----------------------------------------------------------------------------
+def read_metadata_chunk(songs):
+
+  # local variables
+  rows = []
+
+  for path, size, mtime_ns in songs:
+    try:
+      rows.append((path, size, mtime_ns) + read_metadata(path, size))
+
+    # files that vanished or can't be opened are tried again next time
+    except OSError:
+      pass
+
+  return rows
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class reads the tags of a list of songs on a background thread and
+#   a process pool, keeping the results in the library index. Only one read
+#   runs at a time; starting a new one cancels the last one. Other per song
+#   analysis can reuse it by overriding read_chunk, worker_init, keep_pool
+#   and the _has_cache()/_load_cache()/_save_cache() methods.
+# -----------------------------------------------------------------------------
+class MetadataReader:
+
+  # function run on each chunk in the worker processes, and function run
+  # once when each worker process starts (None for nothing)
+  read_chunk = staticmethod(read_metadata_chunk)
+  worker_init = None
+
+  # result column also kept in list order in row_values (None for none)
+  row_column = DURATION_COLUMN
+
+  # True to keep the worker processes between reads instead of starting
+  # them again for each one, for readers started often on a few songs
+  keep_pool = False
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle reader
+  #
+  # INPUT PARAMETERS:
+  #   index - LibraryIndex the results are kept in, or None
+  #   max_workers - number of processes, or None for one per CPU
+  #   chunk_size - number of songs sent to a process at once
+  # ---------------------------------------------------------------------------
+  def __init__(self, index=None, max_workers=None, chunk_size=CHUNK_SIZE):
+
+    self.index = index
+    self.max_workers = max_workers or os.cpu_count() or 1
+    self.chunk_size = chunk_size
+    self.cache = {}
+    self.songs_read = 0
+    self.job_id = 0
+    self.row_values = array('q')
+    self.row_generation = None
+    self._results = queue.Queue()
+    self._cancel = threading.Event()
+    self._pool = None
+    self._pool_lock = threading.Lock()
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Cancels any running read and starts reading a new list of songs
+  #
+  # INPUT PARAMETERS:
+  #   paths - iterable of full song paths, gone through on the background
+  #           thread (see TrackTable.paths())
+  #   generation - generation of the list the paths are of, kept with
+  #                row_values so they are only used while the rows are still
+  #                in the same order
+  #
+  # RETURN:
+  #   id of the new read, to be passed back in to poll()
+  # ---------------------------------------------------------------------------
+  def start(self, paths, generation=None):
+
+    self.cancel()
+    self.songs_read = 0
+    self.row_values = array('q')
+    self.row_generation = generation
+    self._results = queue.Queue()
+    self._cancel = threading.Event()
+
+    reader = threading.Thread(target=self._read, daemon=True,
+                              args=(paths, self._results, self._cancel, self.row_values))
+    reader.start()
+
+    return self.job_id
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Stops the running read. Any poll() for the old id returns None.
+  # ---------------------------------------------------------------------------
+  def cancel(self):
+
+    self._cancel.set()
+    self.job_id += 1
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Checks on a read without blocking
+  #
+  # INPUT PARAMETERS:
+  #   job_id - id returned by start()
+  #
+  # RETURN:
+  #   True if the read is finished, False if not, or None if it has been
+  #   cancelled or replaced by a newer one
+  # ---------------------------------------------------------------------------
+  def poll(self, job_id):
+
+    # local variables
+    finished = False
+
+    if job_id != self.job_id:
+      return None
+
+    try:
+      while not finished:
+        self.songs_read, finished = self._results.get_nowait()
+    except queue.Empty:
+      pass
+
+    return finished
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the (artist, title, length in ms) of a song, or None if it
+  #   hasn't been read yet
+  # ---------------------------------------------------------------------------
+  def lookup(self, path):
+
+    return self.cache.get(path)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the name a song is shown by, "artist - title" or just the title
+  #   if it has no artist, or None if its tags haven't been read or it has no
+  #   title
+  # ---------------------------------------------------------------------------
+  def title(self, path):
+
+    # local variables
+    tags = self.cache.get(path)
+
+    if tags is None or tags[TITLE_COLUMN] == '':
+      return None
+
+    if tags[ARTIST_COLUMN] == '':
+      return tags[TITLE_COLUMN]
+
+    return tags[ARTIST_COLUMN] + ' - ' + tags[TITLE_COLUMN]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns True if results are kept between runs, so _load_cache() and
+  #   _save_cache() are used
+  # ---------------------------------------------------------------------------
+  def _has_cache(self):
+
+    return self.index is not None
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Loads earlier results of some songs from the library index
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of full song paths
+  #
+  # RETURN:
+  #   dictionary of song path -> (size, mtime_ns, result values...)
+  # ---------------------------------------------------------------------------
+  def _load_cache(self, paths):
+
+    return self.index.load_metadata(paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Writes new results to the library index
+  #
+  # INPUT PARAMETERS:
+  #   rows - list of (path, size, mtime_ns, result values...)
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _save_cache(self, rows):
+
+    self.index.save_metadata(rows)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Answers a batch of songs from the index where the files haven't changed,
+  #   and cuts the rest into chunks for the process pool
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of full song paths
+  #
+  # RETURN:
+  #   number of songs answered, list of chunks of (path, size, mtime_ns)
+  # ---------------------------------------------------------------------------
+  def _look_up(self, paths):
+
+    # local variables
+    cached = {}
+    answered = 0
+    songs = []
+
+    if self._has_cache():
+      cached = self._load_cache(paths)
+
+    # files with the same size and modification time as last time are done
+    for path in paths:
+      try:
+        info = os.stat(path)
+      except OSError:
+        continue
+
+      row = cached.get(path)
+      if row is not None and row[0] == info.st_size and row[1] == info.st_mtime_ns:
+        self.cache[path] = row[2:]
+        answered += 1
+      else:
+        songs.append((path, info.st_size, info.st_mtime_ns))
+
+    return answered, [songs[start:start + self.chunk_size]
+                      for start in range(0, len(songs), self.chunk_size)]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Keeps the row_column value of a batch of songs in list order: songs
+  #   answered from the index get theirs now, and the rows of songs sent to
+  #   the process pool are noted so they get theirs once they are read
+  #
+  # INPUT PARAMETERS:
+  #   batch - list of full song paths
+  #   chunks - chunks of the batch sent to the pool
+  #   row_values - array of the values in list order, extended by the batch
+  #   positions - dictionary of song path -> row, for songs being read
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _keep_rows(self, batch, chunks, row_values, positions):
+
+    # local variables
+    start = len(row_values)
+    rows = {}
+
+    row_values.extend(array('q', [NOT_READ]) * len(batch))
+
+    for offset, path in enumerate(batch):
+      values = self.cache.get(path)
+      if values is not None:
+        row_values[start + offset] = values[self.row_column]
+      rows[path] = start + offset
+
+    for chunk in chunks:
+      for song in chunk:
+        positions[song[0]] = rows[song[0]]
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns a process pool for a read: a new one, or with keep_pool the one
+  #   kept from earlier reads. Processes are spawned rather than forked from
+  #   this threaded GUI.
+  # ---------------------------------------------------------------------------
+  def _open_pool(self):
+
+    if not self.keep_pool:
+      return ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=self.worker_init)
+
+    with self._pool_lock:
+      if self._pool is None:
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                         mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=self.worker_init)
+
+      return self._pool
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Finishes with the process pool of a read. A kept pool is left running
+  #   unless one of its processes died, which breaks it for good.
+  #
+  # INPUT PARAMETERS:
+  #   pool - pool returned by _open_pool()
+  #   broken - True if the pool is broken
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def _close_pool(self, pool, broken):
+
+    if not self.keep_pool:
+      pool.shutdown()
+      return
+
+    if broken:
+      with self._pool_lock:
+        if self._pool is pool:
+          self._pool = None
+      pool.shutdown(wait=False)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Background thread that goes through the songs a batch at a time,
+  #   answering what it can from the index and sending the rest to the
+  #   process pool, reading ahead only as far as the pool can keep up with
+  #
+  # INPUT PARAMETERS:
+  #   paths - iterable of full song paths
+  #   results - queue poll() reads progress from
+  #   cancel - event set when this read should stop early
+  #   row_values - array the row_column value of each song is kept in, in
+  #                list order, or None
+  # ---------------------------------------------------------------------------
+  def _read(self, paths, results, cancel, row_values=None):
+
+    # local variables
+    paths = iter(paths)
+    songs_read = 0
+    waiting = collections.deque()
+    pending = set()
+    submitted = {}
+    positions = {}
+    pool = None
+    alone = False
+    more = True
+    most_pending = self.max_workers * JOBS_PER_WORKER
+
+    if self.row_column is None:
+      row_values = None
+
+    try:
+      while (more or len(waiting) > 0 or len(pending) > 0) and not cancel.is_set():
+
+        # go further through the list until there are chunks for every
+        # process, or the list has run out
+        while more and len(waiting) < most_pending and not cancel.is_set():
+          batch = list(itertools.islice(paths, LOOKUP_BATCH))
+          more = len(batch) == LOOKUP_BATCH
+          answered, chunks = self._look_up(batch)
+          if row_values is not None:
+            self._keep_rows(batch, chunks, row_values, positions)
+          songs_read += answered
+          waiting.extend((chunk, False) for chunk in chunks)
+          results.put((songs_read, False))
+
+        # processes are only started once there is something to read
+        if pool is None and len(waiting) > 0:
+          pool = self._open_pool()
+
+        # songs tried again go one at a time with nothing else running, so a
+        # song that fails again is the one at fault
+        while len(waiting) > 0 and len(pending) < most_pending and not alone:
+          chunk, retried = waiting[0]
+          if retried and len(pending) > 0:
+            break
+          waiting.popleft()
+          future = pool.submit(self.read_chunk, chunk)
+          submitted[future] = (chunk, retried)
+          pending.add(future)
+          alone = retried
+
+        if len(pending) == 0:
+          continue
+
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        alone = False
+
+        # a worker that dies breaks the whole pool and fails every chunk in
+        # it, so those are all tried again in a new one
+        if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+          done |= wait(pending)[0]
+          pending = set()
+          self._close_pool(pool, True)
+          pool = None
+
+        # each chunk is kept as soon as it is read, even if the read is
+        # cancelled later
+        for future in done:
+          chunk, retried = submitted.pop(future)
+          try:
+            rows = future.result()
+
+          # a song that raises or crashes its worker fails its whole chunk,
+          # and a crash every other chunk running with it, so they are tried
+          # again a song at a time and only the songs that fail again are
+          # left out
+          except Exception:
+            if not retried:
+              waiting.extend(([song], True) for song in chunk)
+            continue
+
+          for row in rows:
+            self.cache[row[0]] = row[3:]
+            if row[0] in positions:
+              row_values[positions.pop(row[0])] = row[3 + self.row_column]
+          if self._has_cache() and len(rows) > 0:
+            self._save_cache(rows)
+          songs_read += len(rows)
+        results.put((songs_read, False))
+
+    # the read always finishes, even if something went wrong, so the GUI
+    # stops polling and goes on with what was read
+    finally:
+      if pool is not None:
+        for future in pending:
+          future.cancel()
+        self._close_pool(pool, False)
+
+      if not cancel.is_set():
+        results.put((songs_read, True))
+
+    return
@@ -0,0 +1,520 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  TrackTable.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file holds the table of loaded songs. Instead of one small [folder,
+#   song] list per track, the table keeps each folder string once and stores
+#   rows in parallel arrays: a compact array of folder numbers and a list of
+#   song names. The full path of a song is built the first time it is asked
+#   for and cached after that. A table can also be attached to a saved
+#   playlist, in which case rows are read from the playlist file only when
+#   they are asked for, until the table is first changed. The generation
+#   number goes up every time the table is emptied, replaced or rearranged
+#   or has songs taken out of it, so other parts of the player can tell a
+#   list whose indexes have moved from one that only grew. Given a metadata
+#   reader, songs are shown by their artist and title once their tags have
+#   been read. The table can be handed out as columns, which is how
+#   whole-list sorts and merges are done.
+#
+# *****************************************************************************
+
+# modules used by this file
+from array import array
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# columns of a row passed in to append()/extend() or returned by indexing
+FOLDER_COLUMN = 0
+NAME_COLUMN = 1
+
+# array type code for folder numbers (unsigned 32 bit)
+FOLDER_ID_TYPE = 'I'
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function builds the full path of a song from its row. Paths matched
+#   against the ones a table hands out must be built with it.
+#
+# INPUT PARAMETERS:
+#   folder - folder path of the song
+#   name - file name of the song
+#
+# RETURN:
+#   full path of the song
+# -----------------------------------------------------------------------------
+def song_path(folder, name):
+
+  return folder + "/" + name
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a list of songs stored as interned folders plus parallel
+#   arrays of rows
+# -----------------------------------------------------------------------------
+class TrackTable:
+
+  __slots__ = ('_folders', '_folder_ids', '_rows_folder', '_rows_name', '_paths', '_source',
+               '_source_ids', 'generation')
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an empty table
+  # ---------------------------------------------------------------------------
+  def __init__(self):
+
+    self._folders = []
+    self._folder_ids = {}
+    self._rows_folder = array(FOLDER_ID_TYPE)
+    self._rows_name = []
+    self._paths = {}
+    self._source = None
+    self._source_ids = None
+    self.generation = 0
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Number of songs in the table
+  # ---------------------------------------------------------------------------
+  def __len__(self):
+
+    if self._source is not None:
+      return len(self._source)
+
+    return len(self._rows_name)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns one row as a (folder, song name) tuple
+  # ---------------------------------------------------------------------------
+  def __getitem__(self, index):
+
+    if self._source is not None:
+      return self._source.row(index)
+
+    name = self._rows_name[index]
+
+    return self._folders[self._rows_folder[index]], name
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Goes through every row as a (folder, song name) tuple
+  # ---------------------------------------------------------------------------
+  def __iter__(self):
+
+    if self._source is not None:
+      yield from self._source
+      return
+
+    folders = self._folders
+
+    for folder_id, name in zip(self._rows_folder, self._rows_name):
+      yield folders[folder_id], name
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the full path of every song in the table as it is now, one at a
+  #   time. Nothing is built until the paths are asked for, so a background
+  #   thread can go through them while the table changes: rows added later
+  #   are left out, and rows taken out or rearranged keep their old paths.
+  #   An attached playlist is read through a memory map of its own, without
+  #   decoding it into the table.
+  #
+  # RETURN:
+  #   generator of full song paths, in list order
+  # ---------------------------------------------------------------------------
+  def paths(self):
+
+    if self._source is not None:
+      return self._source.paths()
+
+    return self._row_paths(self._folders, self._rows_folder, self._rows_name, len(self))
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Goes through the paths of a snapshot of the rows. Rows are only ever
+  #   added to the end of these columns; anything else puts new columns in
+  #   the table.
+  # ---------------------------------------------------------------------------
+  @staticmethod
+  def _row_paths(folders, rows_folder, rows_name, count):
+
+    for index in range(count):
+      yield song_path(folders[rows_folder[index]], rows_name[index])
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the number for a folder, adding it the first time it is seen
+  #
+  # INPUT PARAMETERS:
+  #   folder - folder path of a song
+  #
+  # RETURN:
+  #   folder number
+  # ---------------------------------------------------------------------------
+  def _intern_folder(self, folder):
+
+    folder_id = self._folder_ids.get(folder)
+
+    if folder_id is None:
+      folder_id = len(self._folders)
+      self._folders.append(folder)
+      self._folder_ids[folder] = folder_id
+
+    return folder_id
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds one song to the end of the table
+  #
+  # INPUT PARAMETERS:
+  #   folder - folder path of the song
+  #   name - file name of the song
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def append(self, folder, name):
+
+    self._materialize()
+    self._own_names()
+    self._rows_folder.append(self._intern_folder(folder))
+    self._rows_name.append(name)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds many songs to the end of the table
+  #
+  # INPUT PARAMETERS:
+  #   rows - iterable of [folder, song name] rows
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def extend(self, rows):
+
+    # local variables
+    last_folder = None
+    folder_id = 0
+
+    self._materialize()
+    self._own_names()
+
+    # rows of one folder usually arrive together, so skip the lookup for repeats
+    for row in rows:
+      folder = row[FOLDER_COLUMN]
+      if folder is not last_folder:
+        folder_id = self._intern_folder(folder)
+        last_folder = folder
+      self._rows_folder.append(folder_id)
+      self._rows_name.append(row[NAME_COLUMN])
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes songs out of the table. The songs after them move up, so the
+  #   generation goes up if any were removed.
+  #
+  # INPUT PARAMETERS:
+  #   paths - set of full paths of the songs to remove
+  #
+  # RETURN:
+  #   list of the indexes the removed songs had, in order
+  # ---------------------------------------------------------------------------
+  def remove(self, paths):
+
+    self._materialize()
+    folders = self._folders
+
+    return self.remove_rows([index for index, (folder_id, name) in
+                             enumerate(zip(self._rows_folder, self._rows_name))
+                             if song_path(folders[folder_id], name) in paths])
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Takes songs out of the table by index, the same way remove() does
+  #
+  # INPUT PARAMETERS:
+  #   indexes - indexes of the songs to remove, in any order
+  #
+  # RETURN:
+  #   list of the indexes removed, in order
+  # ---------------------------------------------------------------------------
+  def remove_rows(self, indexes):
+
+    # local variables
+    removed = sorted(set(indexes))
+    kept_folders = array(FOLDER_ID_TYPE)
+    kept_names = []
+    start = 0
+
+    if len(removed) == 0:
+      return removed
+
+    self._materialize()
+
+    # copy the runs of rows between the removed ones
+    for index in removed + [len(self._rows_name)]:
+      kept_folders.extend(self._rows_folder[start:index])
+      kept_names.extend(self._rows_name[start:index])
+      start = index + 1
+
+    self.generation += 1
+    self._rows_folder = kept_folders
+    self._rows_name = kept_names
+    self._paths = {}
+
+    return removed
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Replaces every row with new ones given as columns, using this table's
+  #   folder numbers. This is how the rows are sorted or filtered as a whole.
+  #   The generation goes up.
+  #
+  # INPUT PARAMETERS:
+  #   folder_ids - array of the folder number of each new row
+  #   names - list of the song name of each new row, or any other sequence
+  #           such as an array; the table makes its own list of it before
+  #           it next changes it
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def replace_rows(self, folder_ids, names):
+
+    self._materialize()
+    self.generation += 1
+    self._rows_folder = folder_ids
+    self._rows_name = names
+    self._paths = {}
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the table as columns, without copying them: the list of
+  #   folders, the folder number of each row and the song name of each row.
+  #   The columns must not be changed.
+  # ---------------------------------------------------------------------------
+  def columns(self):
+
+    self._materialize()
+
+    return self._folders, self._rows_folder, self._rows_name
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Adds many songs to the end of the table given as columns, such as those
+  #   of another table or a playlist file
+  #
+  # INPUT PARAMETERS:
+  #   folders - list of the folders the rows refer to
+  #   folder_ids - folder number of each row, into folders
+  #   names - song name of each row
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def extend_columns(self, folders, folder_ids, names):
+
+    self._materialize()
+    self._own_names()
+
+    # number the folders the way this table does
+    own_ids = [self._intern_folder(folder) for folder in folders]
+    self._rows_folder.extend(array(FOLDER_ID_TYPE, map(own_ids.__getitem__, folder_ids)))
+    self._rows_name.extend(names)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Replaces the contents of the table with a saved playlist. Rows stay in
+  #   the playlist file and are only decoded when they are asked for.
+  #
+  # INPUT PARAMETERS:
+  #   source - open PlaylistReader; the table closes it when done with it
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def attach(self, source):
+
+    self.clear()
+    self._source = source
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the file name of the attached playlist, or None if the table
+  #   holds its own rows
+  # ---------------------------------------------------------------------------
+  def source_name(self):
+
+    if self._source is None:
+      return None
+
+    return self._source.playlist_name
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Copies every row of an attached playlist into the table so it can be
+  #   changed, then lets go of the playlist file
+  # ---------------------------------------------------------------------------
+  def _materialize(self):
+
+    if self._source is not None:
+      self.read_ahead(len(self._source))
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Copies the next rows of an attached playlist into the table, letting go
+  #   of the playlist file once every row has been copied. Until then the
+  #   rows are still read from the playlist, so this can be done a little at
+  #   a time while the player is idle.
+  #
+  # INPUT PARAMETERS:
+  #   count - most rows to copy
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def read_ahead(self, count):
+
+    # local variables
+    source = self._source
+    start = len(self._rows_name)
+
+    if source is None:
+      return
+
+    # number the playlist's folders the way this table does, once
+    if self._source_ids is None:
+      self._source_ids = [self._intern_folder(folder) for folder in source.folders()]
+
+    folder_ids, names = source.column_slice(start, min(start + count, len(source)))
+    self._rows_folder.extend(array(FOLDER_ID_TYPE, map(self._source_ids.__getitem__,
+                                                       folder_ids)))
+    self._rows_name.extend(names)
+
+    if len(self._rows_name) == len(source):
+      self._source = None
+      self._source_ids = None
+      source.close()
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Makes the song names a list of the table's own again if they were
+  #   handed in as some other sequence, so they can be added to
+  # ---------------------------------------------------------------------------
+  def _own_names(self):
+
+    if type(self._rows_name) is not list:
+      self._rows_name = list(self._rows_name)
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Closes an attached playlist without reading its rows
+  # ---------------------------------------------------------------------------
+  def _release(self):
+
+    if self._source is not None:
+      self._source.close()
+      self._source = None
+      self._source_ids = None
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Removes every song from the table
+  # ---------------------------------------------------------------------------
+  def clear(self):
+
+    self._release()
+    self.generation += 1
+    self._folders = []
+    self._folder_ids = {}
+    self._rows_folder = array(FOLDER_ID_TYPE)
+    self._rows_name = []
+    self._paths = {}
+
+    return
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the folder of a song
+  # ---------------------------------------------------------------------------
+  def folder(self, index):
+
+    if self._source is not None:
+      return self._source.row(index)[FOLDER_COLUMN]
+
+    return self._folders[self._rows_folder[index]]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the file name of a song
+  # ---------------------------------------------------------------------------
+  def name(self, index):
+
+    if self._source is not None:
+      return self._source.row(index)[NAME_COLUMN]
+
+    return self._rows_name[index]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the full path of a song, building it only the first time
+  # ---------------------------------------------------------------------------
+  def path(self, index):
+
+    full_path = self._paths.get(index)
+
+    if full_path is None:
+      full_path = song_path(*self[index])
+      self._paths[index] = full_path
+
+    return full_path
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the name a song is shown by: "artist - title" from its tags if
+  #   they have been read, otherwise the file name
+  #
+  # INPUT PARAMETERS:
+  #   index - row of the song
+  #   metadata - MetadataReader holding the tags read so far
+  # ---------------------------------------------------------------------------
+  def title(self, index, metadata):
+
+    # build the path without caching it, titles are asked for every song
+    full_path = self._paths.get(index)
+    if full_path is None:
+      full_path = song_path(*self[index])
+    title = metadata.title(full_path)
+
+    if title is None:
+      return self.name(index)
+
+    return title
+
@@ -0,0 +1,297 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  Waveform.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file works out the waveform drawn on the seek bar. Each song is
+#   decoded once by the pygame mixer and its samples are cut into one chunk
+#   per pixel of the bar; the lowest and highest sample of every chunk are
+#   found with NumPy straight on the 16 bit samples in the mixer's own
+#   buffer, through pygame.sndarray, without converting or copying them.
+#   Songs too big to decode whole are left with a flat seek bar. The peaks
+#   are scaled down to one signed byte each, so a whole song takes under 1 KB.
+#
+#   The peaks of each song are kept on disk in a small file of their own,
+#   named after a hash of the song's path, with the song's size and
+#   modification time in front of them. Showing the waveform of a song that
+#   has been played before only means reading that one file, which takes
+#   microseconds; a song that has changed since is simply worked out again.
+#
+#   Songs are decoded through the same machinery as the loudness analysis,
+#   in one worker process that is started the first time a waveform is
+#   needed and kept for every song after it, so changing songs never waits
+#   for a new process. Without NumPy the seek bar works without a waveform.
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import struct
+import hashlib
+from TrackMetadata import MetadataReader
+from Loudness import init_worker, HAVE_NUMPY, SAMPLE_RATE, CHANNELS, MAX_SONG_BYTES
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+# number of chunks each song is cut into, one per pixel of the seek bar
+PEAK_COLUMNS = 460
+
+# bits a 16 bit sample is shifted by to fit in a signed byte
+PEAK_SHIFT = 8
+
+# header of a peak file: magic, song size, song mtime_ns, length in ms and
+# number of columns, followed by a low and a high byte per column
+PEAK_HEADER = struct.Struct('<4sQqII')
+PEAK_MAGIC = b'PEAK'
+PEAK_SUFFIX = '.peaks'
+
+# size of the hash peak files are named by, in bytes
+NAME_DIGEST_SIZE = 16
+
+# songs are decoded one at a time, only ever the one about to be shown
+MAX_WORKERS = 1
+CHUNK_SIZE = 1
+
+# columns of the values kept for each song
+DURATION_COLUMN = 0
+PEAKS_COLUMN = 1
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out the length and peaks of one song
+#
+# INPUT PARAMETERS:
+#   path - path of the song
+#   columns - number of chunks to cut the song into
+#
+# RETURN:
+#   length in ms, and bytes of the low and high peak of each chunk in turn
+# -----------------------------------------------------------------------------
+def measure_peaks(path, columns=PEAK_COLUMNS):
+
+  import numpy
+  from pygame import mixer, sndarray
+
+  # local variables
+  peaks = numpy.zeros((columns, 2), dtype=numpy.int8)
+
+  # decode the song and look at its samples in the mixer's own buffer, as
+  # one row of CHANNELS samples per frame
+  samples = sndarray.samples(mixer.Sound(path))
+  frames = len(samples)
+  per_column = frames // columns
+
+  # each row is one chunk of the song, so min and max along the rows give
+  # the peaks of every chunk in one pass over the samples
+  if per_column > 0:
+    chunks = samples[:columns * per_column].reshape(columns, per_column * CHANNELS)
+    peaks[:, 0] = chunks.min(axis=1) >> PEAK_SHIFT
+    peaks[:, 1] = chunks.max(axis=1) >> PEAK_SHIFT
+
+  return frames * 1000 // SAMPLE_RATE, peaks.tobytes()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out the peaks of one chunk of songs inside a worker
+#   process
+#
+# INPUT PARAMETERS:
+#   songs - list of (path, size, mtime_ns)
+#
+# RETURN:
+#   list of (path, size, mtime_ns, length_ms, peaks) for every song that
+#   could be decoded
+# -----------------------------------------------------------------------------
+def measure_peaks_chunk(songs):
+
+  import pygame
+
+  # local variables
+  rows = []
+
+  for path, size, mtime_ns in songs:
+
+    # not decoded at all, and checked again cheaply each time they are shown
+    if size > MAX_SONG_BYTES:
+      continue
+
+    try:
+      rows.append((path, size, mtime_ns) + measure_peaks(path))
+
+    # songs that can't be decoded just have a flat seek bar
+    except (pygame.error, OSError, MemoryError):
+      pass
+
+  return rows
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class keeps the peaks of each song in a file of its own
+# -----------------------------------------------------------------------------
+class PeakCache:
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Uses a folder for the peak files; it is made when the first is saved
+  # ---------------------------------------------------------------------------
+  def __init__(self, folder):
+
+    self.folder = folder
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the path of the peak file of a song
+  # ---------------------------------------------------------------------------
+  def _file_name(self, path):
+
+    digest = hashlib.blake2b(path.encode('utf-8', 'surrogateescape'),
+                             digest_size=NAME_DIGEST_SIZE)
+
+    return os.path.join(self.folder, digest.hexdigest() + PEAK_SUFFIX)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Reads the peaks of a song, if they were saved since it last changed
+  #
+  # INPUT PARAMETERS:
+  #   path - path of the song
+  #
+  # RETURN:
+  #   (length in ms, peaks), or None
+  # ---------------------------------------------------------------------------
+  def load(self, path):
+
+    try:
+      info = os.stat(path)
+      with open(self._file_name(path), 'rb') as peak_file:
+        data = peak_file.read()
+    except OSError:
+      return None
+
+    if len(data) < PEAK_HEADER.size:
+      return None
+
+    magic, size, mtime_ns, duration, columns = PEAK_HEADER.unpack_from(data)
+    if (magic != PEAK_MAGIC or size != info.st_size or mtime_ns != info.st_mtime_ns or
+        len(data) != PEAK_HEADER.size + 2 * columns):
+      return None
+
+    return duration, data[PEAK_HEADER.size:]
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Saves the peaks of songs, each file written whole before it replaces
+  #   the old one so a crash never leaves half a file
+  #
+  # INPUT PARAMETERS:
+  #   rows - list of (path, size, mtime_ns, length_ms, peaks)
+  #
+  # RETURN:
+  #   none
+  # ---------------------------------------------------------------------------
+  def save(self, rows):
+
+    try: # folder might not be writable...
+      os.makedirs(self.folder, exist_ok=True)
+
+      for path, size, mtime_ns, duration, peaks in rows:
+        file_name = self._file_name(path)
+        with open(file_name + '.tmp', 'wb') as peak_file:
+          peak_file.write(PEAK_HEADER.pack(PEAK_MAGIC, size, mtime_ns, duration,
+                                           len(peaks) // 2))
+          peak_file.write(peaks)
+        os.replace(file_name + '.tmp', file_name)
+
+    # the peaks are simply worked out again next time
+    except OSError:
+      pass
+
+    return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class works out the waveforms of songs in the background and keeps
+#   them on disk
+# -----------------------------------------------------------------------------
+class WaveformReader(MetadataReader):
+
+  read_chunk = staticmethod(measure_peaks_chunk)
+  worker_init = staticmethod(init_worker)
+  row_column = None
+  keep_pool = True
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Creates an idle reader
+  #
+  # INPUT PARAMETERS:
+  #   folder - folder the peak files are kept in
+  # ---------------------------------------------------------------------------
+  def __init__(self, folder):
+
+    MetadataReader.__init__(self, None, MAX_WORKERS, CHUNK_SIZE)
+
+    self.peaks = PeakCache(folder)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Starts working out the waveforms of songs, unless NumPy is missing
+  #
+  # INPUT PARAMETERS:
+  #   paths - list of full song paths
+  #
+  # RETURN:
+  #   id of the new read, to be passed back in to poll()
+  # ---------------------------------------------------------------------------
+  def start(self, paths):
+
+    if not HAVE_NUMPY:
+      self.cancel()
+      return self.job_id
+
+    return MetadataReader.start(self, paths)
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Returns the (length in ms, peaks) of a song from memory or from its
+  #   peak file, or None if it hasn't been worked out yet. The peaks are a
+  #   low and a high signed byte for each column in turn.
+  # ---------------------------------------------------------------------------
+  def lookup(self, path):
+
+    values = self.cache.get(path)
+
+    if values is None:
+      values = self.peaks.load(path)
+      if values is not None:
+        self.cache[path] = values
+
+    return values
+
+  # ---------------------------------------------------------------------------
+  # DESCRIPTION
+  #   Peaks are kept in their own files rather than the library index. Songs
+  #   are only read once lookup() has missed them on disk, so there is
+  #   nothing to load up front; new peaks are saved to their files.
+  # ---------------------------------------------------------------------------
+  def _has_cache(self):
+
+    return True
+
+  def _load_cache(self, paths):
+
+    return {}
+
+  def _save_cache(self, rows):
+
+    self.peaks.save(rows)
+
+    return
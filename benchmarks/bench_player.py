@@ -0,0 +1,567 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  bench_player.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file times the parts of the player a user waits on, without opening
+#   a window or a sound card:
+#
+#     scan      open_folder() over synthetic artist/album trees, cold (new
+#               library index) and warm (index from the cold scan), timed to
+#               the first playable song and to the end of the scan
+#     playlist  save_playlist() and open_playlist() round trips, plus reading
+#               every row of the opened playlist
+#     m3u       save_playlist() as .m3u of a real tree, and open_playlist()
+#               polled until every song has been checked for on disk
+#     switch    next_song_func() and last_song_func() while playing, in
+#               sequential, random and smart shuffle mode
+#     burst     a burst of next presses, counting the writes to the song
+#               number, now playing, status and button widgets with and
+#               without the player state in between
+#
+#   pygame is replaced by a stub mixer that does nothing, and the Tk
+#   variables, buttons and dialogs by small stand-ins, so only the player's
+#   own code is measured. Results are written to a JSON file; pass the file
+#   of an earlier run with --baseline to print how much each number changed.
+#
+#   usage: python benchmarks/bench_player.py [--output FILE] [--baseline FILE]
+#                                            [--sizes 1000,10000,100000]
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+DEFAULT_SIZES = '1000,10000,100000'
+DEFAULT_OUTPUT = 'bench_player.json'
+SONGS_PER_ALBUM = 12
+ALBUMS_PER_ARTIST = 5
+
+# number of next/last presses timed in each mode
+SWITCHES = 2000
+
+# number of next presses in one burst, all before the window is idle again
+BURST_PRESSES = 50
+
+# percentile reported along with the median
+TAIL_PERCENTILE = 95
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class stands in for pygame.mixer.music: every call returns at once
+# -----------------------------------------------------------------------------
+class StubMusic:
+
+  def __init__(self):
+    self.busy = False
+
+  def load(self, path):
+    self.busy = False
+
+  def play(self, *args):
+    self.busy = True
+
+  def stop(self):
+    self.busy = False
+
+  def get_busy(self):
+    return self.busy
+
+  def get_pos(self):
+    return 0
+
+  def __getattr__(self, name):
+    return lambda *args: None
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function puts a stub pygame module in place before the player
+#   modules are imported, so nothing touches SDL or the sound card
+# -----------------------------------------------------------------------------
+def install_stub_pygame():
+
+  pygame = types.ModuleType('pygame')
+  pygame.USEREVENT = 32768
+  pygame.error = type('error', (RuntimeError,), {})
+  pygame.mixer = types.SimpleNamespace(music=StubMusic(), init=lambda *args, **kw: None,
+                                       set_reserved=lambda count: None,
+                                       Channel=lambda number: StubMusic())
+  pygame.display = types.SimpleNamespace(init=lambda: None)
+  pygame.event = types.SimpleNamespace()
+  sys.modules['pygame'] = pygame
+  sys.modules['pygame.mixer'] = pygame.mixer
+
+  return
+
+install_stub_pygame()
+
+# let the benchmark import the player modules from the folder above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import MP3Player
+from PlaybackWorker import playback
+from LibraryScanner import LibraryScanner
+from LibraryIndex import LibraryIndex
+from SmartShuffle import SmartShuffle
+from PlayerState import PlayerState
+from TrackTable import TrackTable
+from PlaylistText import PlaylistImport
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   These classes stand in for tkinter variables, buttons, the main window and
+#   the song and folder watchers. The window runs scheduled callbacks straight
+#   away when pumped.
+# -----------------------------------------------------------------------------
+class StubVar:
+
+  def __init__(self, value=None):
+    self.value = value
+
+  def get(self):
+    return self.value
+
+  def set(self, value):
+    self.value = value
+
+# Tk variable and button that count every write that would reach Tk
+class CountingVar(StubVar):
+
+  writes = 0
+
+  def set(self, value):
+    CountingVar.writes += 1
+    self.value = value
+
+class CountingButton(dict):
+
+  def __setitem__(self, option, value):
+    CountingVar.writes += 1
+    dict.__setitem__(self, option, value)
+
+  def cget(self, option):
+    return self.get(option, '')
+
+  def configure(self, options):
+    for option, value in options.items():
+      self[option] = value
+
+class StubRoot:
+
+  def __init__(self):
+    self.callbacks = []
+
+  def after(self, delay, callback=None, *args):
+    self.callbacks.append((callback, args))
+    return len(self.callbacks)
+
+  def after_idle(self, callback, *args):
+    return self.after(0, callback, *args)
+
+  def pump(self):
+    callbacks = self.callbacks
+    self.callbacks = []
+    for callback, args in callbacks:
+      callback(*args)
+
+class StubWatcher:
+
+  def playing(self):
+    pass
+
+  def start(self, folder_name, mp3_list):
+    pass
+
+  def stop(self):
+    pass
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class stands in for the tag reader, loudness analyzer and duplicate
+#   finder, which run in their own processes and aren't part of what is
+#   measured here
+# -----------------------------------------------------------------------------
+class StubReader:
+
+  job_id = 0
+  copies = {}
+
+  def start(self, paths, generation=None):
+    return self.job_id
+
+  def cancel(self):
+    pass
+
+  def poll(self, job_id):
+    return True
+
+  def lookup(self, path):
+    return None
+
+  def title(self, path):
+    return None
+
+  def gain(self, path):
+    return 0.0
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function makes the dialogs answer without a window: folder and file
+#   dialogs return the given path, questions are answered no, and any message
+#   box stops the benchmark since it means something failed
+# -----------------------------------------------------------------------------
+def answer_dialogs(path):
+
+  dialog = MP3Player.tkinter.filedialog
+  dialog.askdirectory = lambda *args, **kw: path
+  dialog.askopenfilename = lambda *args, **kw: path
+  dialog.asksaveasfilename = lambda *args, **kw: path
+  MP3Player.tkinter.messagebox.askyesno = lambda *args, **kw: False
+
+  def fail(title, message):
+    raise RuntimeError(title + ': ' + message)
+
+  MP3Player.tkinter.messagebox.showinfo = fail
+
+  return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function builds a tree of empty mp3 files laid out as
+#   artist/album/song
+#
+# INPUT PARAMETERS:
+#   folder - top folder of the tree
+#   tracks - number of songs
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def make_tree(folder, tracks):
+
+  for number in range(tracks):
+    album = number // SONGS_PER_ALBUM
+    if number % SONGS_PER_ALBUM == 0:
+      album_folder = os.path.join(folder, 'Artist %05d' % (album // ALBUMS_PER_ARTIST),
+                                  'Album %06d' % album)
+      os.makedirs(album_folder)
+    open(os.path.join(album_folder, '%02d - Song %07d.mp3' %
+                      (number % SONGS_PER_ALBUM, number)), 'wb').close()
+
+  return
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function runs open_folder() on a tree and polls the scan until it is
+#   done, the way the main loop does
+#
+# INPUT PARAMETERS:
+#   folder - top folder of the tree
+#   index_file - library index to scan with
+#
+# RETURN:
+#   dictionary of seconds to the first playable song and to the end, and
+#   the number of songs found
+# -----------------------------------------------------------------------------
+def time_scan(folder, index_file):
+
+  # local variables
+  root = StubRoot()
+  scanner = LibraryScanner(MP3Player.MP3_SUFFIX, LibraryIndex(index_file))
+  search_index = types.SimpleNamespace(catch_up=lambda: None, retag=lambda: None)
+  mp3_list = TrackTable()
+  first_song = None
+
+  answer_dialogs(folder)
+  start = time.perf_counter()
+  MP3Player.open_folder(root, scanner, search_index, StubWatcher(), StubReader(),
+                        PlaylistImport(), None, StubReader(), StubReader(), mp3_list,
+                        StubVar(0), StubVar(''), StubVar(''), StubVar(MP3Player.NO_QUEUE))
+
+  # poll until the scan is done, noting when enough songs arrived to play
+  while len(root.callbacks) > 0:
+    root.pump()
+    if first_song is None and len(mp3_list) >= MP3Player.MIN_SONGS:
+      first_song = time.perf_counter() - start
+    time.sleep(0)
+
+  return {'first_song_s': first_song, 'total_s': time.perf_counter() - start,
+          'songs': len(mp3_list)}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function saves a list as a playlist and opens it again
+#
+# INPUT PARAMETERS:
+#   folder - scratch folder for the playlist file
+#   tracks - number of songs
+#
+# RETURN:
+#   dictionary of seconds to save, open and read every row, and file size
+# -----------------------------------------------------------------------------
+def time_playlist(folder, tracks):
+
+  # local variables
+  playlist_name = os.path.join(folder, 'bench' + MP3Player.PLAYLIST_SUFFIX)
+  mp3_list = TrackTable()
+  search_index = types.SimpleNamespace(catch_up=lambda: None, retag=lambda: None)
+
+  for number in range(tracks):
+    album = number // SONGS_PER_ALBUM
+    mp3_list.append('/music/Artist %05d/Album %06d' % (album // ALBUMS_PER_ARTIST, album),
+                    '%02d - Song %07d.mp3' % (number % SONGS_PER_ALBUM, number))
+
+  answer_dialogs(playlist_name)
+
+  start = time.perf_counter()
+  MP3Player.save_playlist(StubReader(), mp3_list)
+  saved = time.perf_counter() - start
+
+  opened_list = TrackTable()
+  start = time.perf_counter()
+  MP3Player.open_playlist(StubRoot(), types.SimpleNamespace(cancel=lambda: None), search_index,
+                          StubWatcher(), StubReader(), PlaylistImport(), None, StubReader(),
+                          StubReader(), opened_list, StubVar(''), StubVar(''), StubVar(0),
+                          StubVar(MP3Player.NO_QUEUE))
+  opened = time.perf_counter() - start
+
+  start = time.perf_counter()
+  for row in opened_list:
+    pass
+  read_all = time.perf_counter() - start
+  opened_list.clear()
+
+  return {'save_s': saved, 'open_s': opened, 'read_all_s': read_all,
+          'bytes': os.path.getsize(playlist_name)}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function saves the songs of a tree as an M3U playlist and opens it
+#   again, polling the import until every song has been checked for
+#
+# INPUT PARAMETERS:
+#   folder - scratch folder for the playlist file
+#   tree - top folder of the songs
+#
+# RETURN:
+#   dictionary of seconds to save, to the first playable song and to the
+#   end of the import, the songs loaded and file size
+# -----------------------------------------------------------------------------
+def time_text_playlist(folder, tree):
+
+  # local variables
+  playlist_name = os.path.join(folder, 'bench.m3u')
+  mp3_list = TrackTable()
+  opened_list = TrackTable()
+  root = StubRoot()
+  search_index = types.SimpleNamespace(catch_up=lambda: None, retag=lambda: None)
+  first_song = None
+
+  for path, folders, names in os.walk(tree):
+    folders.sort()
+    mp3_list.extend([(path, name) for name in sorted(names)])
+
+  answer_dialogs(playlist_name)
+
+  start = time.perf_counter()
+  MP3Player.save_playlist(StubReader(), mp3_list)
+  saved = time.perf_counter() - start
+
+  start = time.perf_counter()
+  MP3Player.open_playlist(root, types.SimpleNamespace(cancel=lambda: None), search_index,
+                          StubWatcher(), StubReader(), PlaylistImport(), None, StubReader(),
+                          StubReader(), opened_list, StubVar(''), StubVar(''), StubVar(0),
+                          StubVar(MP3Player.NO_QUEUE))
+
+  while len(root.callbacks) > 0:
+    root.pump()
+    if first_song is None and len(opened_list) >= MP3Player.MIN_SONGS:
+      first_song = time.perf_counter() - start
+    time.sleep(0)
+
+  return {'save_s': saved, 'first_song_s': first_song, 'total_s': time.perf_counter() - start,
+          'songs': len(opened_list), 'bytes': os.path.getsize(playlist_name)}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function times pressing next and then last while a song is playing
+#
+# INPUT PARAMETERS:
+#   tracks - number of songs in the list
+#   random_mode - True for random mode, False for sequential
+#   smart - True to draw random songs by weight
+#
+# RETURN:
+#   dictionary of median and tail microseconds per press for next and last
+# -----------------------------------------------------------------------------
+def time_switches(tracks, random_mode, smart=False):
+
+  # local variables
+  shuffle = SmartShuffle(seed=1)
+  mp3_list = TrackTable()
+  mp3_list.extend([('/music', 'Song %07d.mp3' % number) for number in range(tracks)])
+  song_index = StubVar(0)
+  random_var = StubVar(MP3Player.RANDOM if random_mode else MP3Player.NOT_RAND)
+  arguments = (StubReader(), mp3_list, song_index, StubVar(''), random_var, shuffle,
+               StubVar(False), StubVar(False), {}, StubVar(''), StubVar(False),
+               StubVar(MP3Player.NO_QUEUE), StubVar(0), StubWatcher())
+  results = {}
+
+  shuffle.set_weighted(smart)
+
+  for name, function in (('next', MP3Player.next_song_func),
+                         ('last', MP3Player.last_song_func)):
+    times = []
+    for press in range(SWITCHES):
+      start = time.perf_counter()
+      function(*arguments)
+      times.append((time.perf_counter() - start) * 1e6)
+    times.sort()
+    results[name + '_median_us'] = statistics.median(times)
+    results[name + '_p%d_us' % TAIL_PERCENTILE] = times[len(times) * TAIL_PERCENTILE // 100]
+
+  return results
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function presses next many times in a row while a song is playing,
+#   then lets the main loop go idle, writing to the widgets directly and
+#   through the player state
+#
+# INPUT PARAMETERS:
+#   tracks - number of songs in the list
+#
+# RETURN:
+#   dictionary of widget writes and ms for the whole burst, both ways
+# -----------------------------------------------------------------------------
+def time_burst(tracks):
+
+  # local variables
+  mp3_list = TrackTable()
+  mp3_list.extend([('/music', 'Song %07d.mp3' % number) for number in range(tracks)])
+  results = {}
+
+  for name in ('direct', 'state'):
+    root = StubRoot()
+    playing_var, player_status_info = CountingVar(''), CountingVar('STOPPED')
+    song_index = CountingVar(0)
+    pause_play = CountingButton()
+    if name == 'state':
+      state = PlayerState(root)
+      song_index = state.variable('song_index', song_index, repeat=True)
+      playing_var = state.variable('playing', playing_var)
+      player_status_info = state.variable('status', player_status_info)
+      pause_play = state.widget('pause_play', pause_play)
+
+    arguments = (StubReader(), mp3_list, song_index, playing_var, StubVar(MP3Player.NOT_RAND),
+                 SmartShuffle(seed=1), StubVar(False), StubVar(False), pause_play,
+                 player_status_info, StubVar(False), StubVar(MP3Player.NO_QUEUE), StubVar(0),
+                 StubWatcher())
+
+    CountingVar.writes = 0
+    start = time.perf_counter()
+    for press in range(BURST_PRESSES):
+      MP3Player.next_song_func(*arguments)
+    root.pump()
+    results[name + '_ms'] = (time.perf_counter() - start) * 1000
+    results[name + '_writes'] = CountingVar.writes
+
+  return results
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function prints how much each number changed since an earlier run
+#
+# INPUT PARAMETERS:
+#   results - results of this run
+#   baseline - results of the earlier run
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+def compare(results, baseline):
+
+  print('\nchange since baseline (negative is faster/smaller)')
+
+  for name, values in sorted(results.items()):
+    old_values = baseline.get(name, {})
+    for key, value in sorted(values.items()):
+      old = old_values.get(key)
+      if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old > 0:
+        print('  %-28s %-16s %+7.1f%%' % (name, key, 100.0 * (value - old) / old))
+
+  return
+
+#---------------------------------------------------------------------
+# main function of benchmark
+#---------------------------------------------------------------------
+def main():
+
+  # local variables
+  parser = argparse.ArgumentParser(description='MP3 player benchmarks')
+  parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON file to write')
+  parser.add_argument('--baseline', help='JSON file of an earlier run to compare with')
+  parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated track counts')
+  options = parser.parse_args()
+  sizes = [int(size) for size in options.sizes.split(',')]
+  results = {}
+  scratch = tempfile.mkdtemp(prefix='mp3bench')
+
+  # mixer commands run on the playback worker thread against the stub mixer
+  playback.start(StubRoot(), lambda command, error: None)
+
+  try:
+    for tracks in sizes:
+      tree = os.path.join(scratch, 'tree%d' % tracks)
+      index_file = os.path.join(scratch, 'index%d.db' % tracks)
+      make_tree(tree, tracks)
+
+      results['scan_cold_%d' % tracks] = time_scan(tree, index_file)
+      results['scan_warm_%d' % tracks] = time_scan(tree, index_file)
+      results['playlist_%d' % tracks] = time_playlist(scratch, tracks)
+      results['m3u_%d' % tracks] = time_text_playlist(scratch, tree)
+      results['switch_sequential_%d' % tracks] = time_switches(tracks, False)
+      results['switch_random_%d' % tracks] = time_switches(tracks, True)
+      results['switch_smart_%d' % tracks] = time_switches(tracks, True, True)
+      results['burst_%d' % tracks] = time_burst(tracks)
+
+      for name in sorted(results):
+        if name.endswith('_%d' % tracks):
+          print('%-28s %s' % (name, ', '.join('%s=%.4g' % item
+                                              for item in sorted(results[name].items()))))
+
+  finally:
+    shutil.rmtree(scratch, ignore_errors=True)
+
+  # write the results along with what they were measured on
+  report = {'python': platform.python_version(), 'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+  with open(options.output, 'w') as output:
+    json.dump(report, output, indent=2, sort_keys=True)
+  print('\nresults written to ' + options.output)
+
+  if options.baseline:
+    with open(options.baseline) as baseline:
+      compare(results, json.load(baseline)['results'])
+
+# Call the main function.
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,321 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kris Meehan
+#
+#       FILE NAME:  bench_track_table.py
+#
+#            DATE:  10/18/2026
+#
+# DESCRIPTION
+#   This file measures how much memory the TrackTable saves compared with the
+#   old list of [folder, song] lists. Both layouts are filled with the same
+#   synthetic library (artist/album folders with a fixed number of songs each)
+#   and measured with tracemalloc. Two cases are shown: folder strings shared
+#   per folder, as the folder scanner produces them, and a separate copy of
+#   the folder text for every song, as happens when rows are built one path
+#   at a time. It also times sorting the table by folder and name as NumPy
+#   columns against sorting the rows in Python, when NumPy is installed.
+#
+#   usage: python benchmarks/bench_track_table.py [tracks] [songs per folder]
+#
+# *****************************************************************************
+
+# modules used by this file
+import os
+import sys
+import random
+import time
+import tracemalloc
+import importlib.util
+from array import array
+
+# let the benchmark import the player modules from the folder above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from TrackTable import TrackTable
+
+#---------------------------------------------------
+# Global constants to be used in this file
+#---------------------------------------------------
+
+DEFAULT_TRACKS = 100000
+DEFAULT_SONGS_PER_FOLDER = 12
+ROOT_FOLDER = '/music/library'
+PER_TRACKS = 100000
+
+# seed of the order the songs are in before sorting
+SHUFFLE_SEED = 1
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function builds the synthetic rows of the library, with one folder
+#   string shared by every song in the folder
+#
+# INPUT PARAMETERS:
+#   tracks - number of songs
+#   songs_per_folder - number of songs in each album folder
+#
+# RETURN:
+#   list of (folder, song name) tuples
+# -----------------------------------------------------------------------------
+def make_rows(tracks, songs_per_folder):
+
+  # local variables
+  rows = []
+  folder = ''
+
+  for number in range(tracks):
+    album = number // songs_per_folder
+    if number % songs_per_folder == 0:
+      folder = ROOT_FOLDER + '/Artist %05d/Album %06d' % (album // 10, album)
+    rows.append((folder, '%02d - Song Title Number %07d.mp3' % (number % songs_per_folder, number)))
+
+  return rows
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns a new string with the same text, the way a path is
+#   rebuilt when rows are created one file at a time
+# -----------------------------------------------------------------------------
+def copy_text(text):
+
+  return text.encode().decode()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function measures the memory used while building one layout
+#
+# INPUT PARAMETERS:
+#   build - function that takes the rows and returns the finished layout
+#   rows - rows to store
+#
+# RETURN:
+#   bytes still allocated by the layout, seconds taken to build it
+# -----------------------------------------------------------------------------
+def measure(build, rows):
+
+  tracemalloc.start()
+  start = time.perf_counter()
+  layout = build(rows)
+  seconds = time.perf_counter() - start
+  allocated = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+
+  # keep the layout alive until it has been measured
+  del layout
+
+  return allocated, seconds
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   These functions build the old list of [folder, song] lists and the
+#   TrackTable, either reusing the scanner's folder strings or copying the
+#   folder text for every song
+# -----------------------------------------------------------------------------
+def build_list(rows):
+
+  return [[folder, name] for folder, name in rows]
+
+def build_list_copied(rows):
+
+  return [[copy_text(folder), name] for folder, name in rows]
+
+def build_table(rows):
+
+  table = TrackTable()
+  table.extend(rows)
+
+  return table
+
+def build_table_copied(rows):
+
+  table = TrackTable()
+  table.extend((copy_text(folder), name) for folder, name in rows)
+
+  return table
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function times building the path of every song. The old layout joins
+#   the strings each time; the table does it once and caches the result.
+#
+# INPUT PARAMETERS:
+#   rows - rows to store
+#
+# RETURN:
+#   seconds for the old join, seconds for the table's first and second pass
+# -----------------------------------------------------------------------------
+def time_paths(rows):
+
+  old_list = [[folder, name] for folder, name in rows]
+  table = build_table(rows)
+
+  start = time.perf_counter()
+  for index in range(len(old_list)):
+    old_list[index][0] + "/" + old_list[index][1]
+  joined = time.perf_counter() - start
+
+  start = time.perf_counter()
+  for index in range(len(table)):
+    table.path(index)
+  first_pass = time.perf_counter() - start
+
+  start = time.perf_counter()
+  for index in range(len(table)):
+    table.path(index)
+  cached_pass = time.perf_counter() - start
+
+  return joined, first_pass, cached_pass
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class stands in for the main window, running the idle callbacks the
+#   column view schedules one at a time and timing each of them
+# -----------------------------------------------------------------------------
+class IdleRoot:
+
+  def __init__(self):
+    self.callbacks = []
+
+  def after_idle(self, callback, *args):
+    self.callbacks.append((callback, args))
+    return len(self.callbacks)
+
+  def run(self):
+    longest = 0.0
+    steps = 0
+    while len(self.callbacks) > 0:
+      callback, args = self.callbacks.pop(0)
+      start = time.perf_counter()
+      callback(*args)
+      longest = max(longest, time.perf_counter() - start)
+      steps += 1
+    return steps, longest
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function times sorting shuffled songs by folder, then by name. The rows
+#   are sorted with Python's sort, and the table as NumPy columns once the
+#   column view has taken the rows in while idle, first by folder and name
+#   and then again with the name first. It also times sorting by length,
+#   with every song's tags read, and by plays, with every tenth song played,
+#   and sorting straight away, before any idle time, for comparison.
+#
+# INPUT PARAMETERS:
+#   rows - rows to store
+#
+# RETURN:
+#   dictionary of case -> seconds, and the number and longest of the idle
+#   steps
+# -----------------------------------------------------------------------------
+def time_sorts(rows):
+
+  from PlaylistColumns import TrackColumns, sort_rows
+  from TrackMetadata import MetadataReader
+  from PlayHistory import PlayHistory
+
+  # local variables
+  shuffled = list(rows)
+  random.Random(SHUFFLE_SEED).shuffle(shuffled)
+  old_list = [[folder, name] for folder, name in shuffled]
+  table = build_table(shuffled)
+  keys = [('folder', False), ('name', False)]
+  history = PlayHistory()
+  root = IdleRoot()
+  times = {}
+  history.counts = {folder + '/' + name: [number % 50, 0]
+                    for number, (folder, name) in enumerate(shuffled) if number % 10 == 0}
+
+  # a tag reader that has read every song, keeping their lengths in list order
+  metadata = MetadataReader()
+  metadata.row_values = array('q', range(len(shuffled), 0, -1))
+  metadata.row_generation = table.generation
+
+  start = time.perf_counter()
+  sorted(old_list)
+  times['python'] = time.perf_counter() - start
+
+  # the rows are taken in while idle
+  start = time.perf_counter()
+  columns = TrackColumns(root, table, history, metadata)
+  columns.catch_up()
+  steps, longest = root.run()
+  times['idle'] = time.perf_counter() - start
+
+  for case, sort_keys in (('first', keys), ('kept', [('name', True)] + keys),
+                          ('length', [('duration', False)]), ('plays', [('plays', True)]),
+                          ('plays again', [('plays', False)])):
+    start = time.perf_counter()
+    columns.finish()
+    sort_rows(columns, sort_keys)
+    times[case] = time.perf_counter() - start
+
+  # sorting before the player has been idle takes every row in at once
+  table = build_table(shuffled)
+  start = time.perf_counter()
+  columns = TrackColumns(root, table, history, metadata)
+  columns.catch_up()
+  columns.finish()
+  sort_rows(columns, keys)
+  times['not idle'] = time.perf_counter() - start
+  root.callbacks = []
+
+  return times, steps, longest
+
+#---------------------------------------------------------------------
+# main function of benchmark
+#---------------------------------------------------------------------
+def main():
+
+  # read optional track count and folder size from the command line
+  tracks = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TRACKS
+  songs_per_folder = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SONGS_PER_FOLDER
+
+  print('TrackTable memory benchmark: %d tracks, %d songs per folder' %
+        (tracks, songs_per_folder))
+
+  # the song name strings are shared by both layouts, so only the row storage
+  # and folder strings are measured
+  rows = make_rows(tracks, songs_per_folder)
+  cases = (('folder strings shared per folder (folder scanner)', build_list, build_table),
+           ('folder text copied for every song (rows built one path at a time)',
+            build_list_copied, build_table_copied))
+
+  for title, old_build, new_build in cases:
+    old_bytes, old_seconds = measure(old_build, rows)
+    new_bytes, new_seconds = measure(new_build, rows)
+    saved = old_bytes - new_bytes
+
+    print('\n' + title)
+    print('  list of lists : %10d bytes  %6.1f bytes/track  %.3f s' %
+          (old_bytes, old_bytes / tracks, old_seconds))
+    print('  TrackTable    : %10d bytes  %6.1f bytes/track  %.3f s' %
+          (new_bytes, new_bytes / tracks, new_seconds))
+    print('  saved         : %10d bytes per %d tracks (%.0f%%)' %
+          (saved * PER_TRACKS // tracks, PER_TRACKS, 100.0 * saved / old_bytes))
+
+  # path building cost
+  joined, first_pass, cached_pass = time_paths(rows)
+  print('\npath of every song')
+  print('  folder + "/" + song each time : %.3f s' % joined)
+  print('  TrackTable.path() first pass  : %.3f s' % first_pass)
+  print('  TrackTable.path() cached      : %.3f s' % cached_pass)
+
+  # sorting cost, only with NumPy
+  if importlib.util.find_spec('numpy') is not None:
+    times, steps, longest = time_sorts(rows)
+    print('\nsort by folder, then name')
+    print('  sorted() of the rows           : %.3f s' % times['python'])
+    print('  columns, rows taken in idle    : %.3f s in %d steps, longest %.3f s' %
+          (times['idle'], steps, longest))
+    print('  columns, first sort            : %.3f s' % times['first'])
+    print('  columns, name first (3 keys)   : %.3f s' % times['kept'])
+    print('  columns, by length             : %.3f s' % times['length'])
+    print('  columns, by plays              : %.3f s' % times['plays'])
+    print('  columns, by plays again        : %.3f s' % times['plays again'])
+    print('  columns, sorted before idle    : %.3f s' % times['not idle'])
+
+# Call the main function.
+if __name__ == '__main__':
+  main()